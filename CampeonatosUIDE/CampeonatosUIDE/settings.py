@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir también las consultas del resto de middlewares
+    "core.instrumentacion.InstrumentacionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -57,7 +59,8 @@ ROOT_URLCONF = "CampeonatosUIDE.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # Igual a DjangoTemplates, pero mide el tiempo de renderizado (Server-Timing)
+        "BACKEND": "core.instrumentacion.PlantillasInstrumentadas",
         "DIRS": [TEMPLATES_DIR],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -84,6 +87,88 @@ DATABASES = {
 }
 
 
+# Caché
+# Las páginas públicas se guardan bajo la versión de cada campeonato (core/versiones.py).
+# Con varios procesos o servidores la caché debe ser compartida: definir REDIS_URL. Con una
+# caché local cada proceso tiene sus propias versiones y las páginas de los otros quedan viejas,
+# así que no se arranca con varios procesos (WEB_CONCURRENCY, que leen uvicorn y gunicorn)
+# sin REDIS_URL.
+
+PROCESOS_SERVIDOR = int(os.environ.get('WEB_CONCURRENCY') or 1)
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ['REDIS_URL'],
+        }
+    }
+else:
+    if PROCESOS_SERVIDOR > 1:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured(
+            f"WEB_CONCURRENCY={PROCESOS_SERVIDOR} sin REDIS_URL: con varios procesos la caché tiene que ser compartida."
+        )
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
+# Eventos de partidos (core/eventos.py)
+# Los eventos se acumulan en las estadísticas y el marcador en un hilo del proceso, fuera de la
+# petición que los registra. False: se acumulan al confirmar la transacción, en el mismo hilo.
+
+ACUMULAR_EVENTOS_EN_SEGUNDO_PLANO = True
+
+
+# Instrumentación (core/instrumentacion.py)
+# Máximo de consultas SQL por vista (nombre de la URL); al superarlo se registra una advertencia
+
+PRESUPUESTO_CONSULTAS = {
+    "inicio_publico": 3,
+    "inicio": 6,
+    "tabla_campeonato": 6,
+    "clasificaciones": 8,
+    "detalle_equipo": 10,
+    "api_tabla": 3,
+    "api_partidos": 3,
+    "api_goleadores": 3,
+    "api_clasificaciones": 6,
+    "api_jornadas": 3,
+    "api_tabla_jornada": 4,
+    "api_llave": 3,
+    "api_grupos": 3,
+    "calendario_campeonato": 2,
+    "calendario_equipo": 2,
+    "calendario_arbitro": 2,
+    "calendario_lugar": 1,
+}
+PRESUPUESTO_CONSULTAS_POR_DEFECTO = 30
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        # Mensaje seguido de las métricas de la petición en JSON
+        "instrumentacion": {"()": "core.instrumentacion.FormatoInstrumentacion", "format": "%(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+        "instrumentacion": {"class": "logging.StreamHandler", "formatter": "instrumentacion"},
+    },
+    "loggers": {
+        # INFO registra las métricas de cada petición; WARNING solo los presupuestos superados
+        "core.instrumentacion": {
+            "handlers": ["instrumentacion"],
+            "level": os.environ.get("INSTRUMENTACION_NIVEL_LOG", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
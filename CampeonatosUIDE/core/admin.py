@@ -1,5 +1,17 @@
+import random
+
 from django.contrib import admin  
-from .forms import EquipoForm
+from django.contrib import messages
+from django.db import IntegrityError
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from .arbitrajes import asignar_arbitros, guardar_arbitros
+from .fixture import ErrorFixture, generar_fixture, guardar_fixture
+from .forms import EquipoForm, GenerarFixtureForm, GenerarLlaveForm, ImportarEstadisticasForm, SortearGruposForm
+from .grupos import ErrorSorteo, bombos_por_nombre, guardar_grupos, sortear_grupos
+from .importacion import ErrorImportacion, importar_estadisticas, leer_filas
+from .llaves import ErrorLlave, generar_llave, guardar_llave, nombre_ronda, sembrar_desde_grupos, sembrar_por_posiciones
 from .models import *
 from django.contrib.auth.admin import UserAdmin
 
@@ -38,15 +50,21 @@ class UsuarioAdmin(UserAdmin):
 # Registra el modelo Deporte como Fútbol, Básquet, etc.
 
 class DeporteAdmin(admin.ModelAdmin):
-    # Muestra el nombre y descripción en la lista
-    list_display = ('nombre', 'descripcion')
-    # Permite buscar por nombre
-    search_fields = ('nombre',)
+    # Muestra el nombre, código y descripción en la lista
+    list_display = ('nombre', 'codigo', 'descripcion')
+    # Permite buscar por nombre o código
+    search_fields = ('nombre', 'codigo')
     # Ordena alfabéticamente por nombre
     ordering = ('nombre',)
 
 
 
+class ReglaSuspensionInline(admin.TabularInline):
+    # Reglas de suspensión automática por tarjetas del campeonato
+    model = ReglaSuspension
+    extra = 0
+
+
 class CampeonatoAdmin(admin.ModelAdmin):
     # Campos que se muestran en la lista
     list_display = ('nombre', 'deporte', 'tipo_campeonato', 'fecha_inicio', 'fecha_fin', 'estado', 'delegado')
@@ -56,26 +74,161 @@ class CampeonatoAdmin(admin.ModelAdmin):
     list_filter = ('estado', 'deporte', 'tipo_campeonato', 'dias_partido')
     # Orden por defecto
     ordering = ('fecha_inicio',)
+    inlines = [ReglaSuspensionInline]
+    change_form_template = 'admin/core/campeonato_change_form.html'
+
+    def get_urls(self):
+        return [
+            path(
+                '<path:object_id>/fixture/', self.admin_site.admin_view(self.fixture_view),
+                name='core_campeonato_fixture',
+            ),
+            path(
+                '<path:object_id>/llave/', self.admin_site.admin_view(self.llave_view),
+                name='core_campeonato_llave',
+            ),
+            path(
+                '<path:object_id>/grupos/', self.admin_site.admin_view(self.grupos_view),
+                name='core_campeonato_grupos',
+            ),
+        ] + super().get_urls()
+
+    # Genera el fixture de todos contra todos: "Vista previa" solo lo muestra y "Guardar" lo
+    # crea con un solo INSERT
+    def fixture_view(self, request, object_id):
+        campeonato = self.get_object(request, object_id)
+        if campeonato is None or not self.has_change_permission(request, campeonato) or not request.user.has_perm('core.add_partido'):
+            return redirect('admin:index')
+        form = GenerarFixtureForm(request.POST or None)
+        partidos = None
+        if request.method == 'POST' and form.is_valid():
+            datos = form.cleaned_data
+            try:
+                partidos = generar_fixture(
+                    campeonato, datos['lugares'], datos['horas'], datos['ida_y_vuelta'], datos['desde'],
+                    por_grupos=datos['por_grupos'],
+                )
+                if 'guardar' in request.POST:
+                    guardar_fixture(campeonato, partidos)
+            except ErrorFixture as error:
+                messages.error(request, str(error))
+                partidos = None
+            else:
+                if 'guardar' in request.POST:
+                    messages.success(request, f"Se crearon {len(partidos)} partidos para {campeonato}.")
+                    return redirect(f"{reverse('admin:core_partido_changelist')}?campeonato__id__exact={campeonato.pk}")
+        contexto = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'original': campeonato,
+            'title': f'Generar fixture de {campeonato}',
+            'form': form,
+            'partidos': partidos,
+        }
+        return TemplateResponse(request, 'admin/core/generar_fixture.html', contexto)
+
+    # Arma la llave de eliminación directa con la misma mecánica: vista previa y después guardar
+    def llave_view(self, request, object_id):
+        campeonato = self.get_object(request, object_id)
+        if campeonato is None or not self.has_change_permission(request, campeonato) or not request.user.has_perm('core.add_partido'):
+            return redirect('admin:index')
+        form = GenerarLlaveForm(request.POST or None)
+        cruces = partidos = None
+        if request.method == 'POST' and form.is_valid():
+            datos = form.cleaned_data
+            try:
+                if datos['siembra'] == 'grupos':
+                    sembrados = sembrar_desde_grupos(campeonato, datos['clasificados'])
+                else:
+                    sembrados = sembrar_por_posiciones(campeonato)
+                cruces, partidos = generar_llave(campeonato, sembrados, datos['lugares'], datos['horas'], datos['desde'])
+                if 'guardar' in request.POST:
+                    guardar_llave(campeonato, cruces, partidos)
+            except ErrorLlave as error:
+                messages.error(request, str(error))
+                cruces = partidos = None
+            else:
+                if 'guardar' in request.POST:
+                    messages.success(request, f"Llave de {campeonato} armada: {len(partidos)} partidos creados.")
+                    return redirect(f"{reverse('admin:core_partido_changelist')}?campeonato__id__exact={campeonato.pk}")
+        rondas = max((cruce.ronda for cruce in cruces), default=0) if cruces else 0
+        contexto = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'original': campeonato,
+            'title': f'Armar llave de {campeonato}',
+            'form': form,
+            'primera_ronda': nombre_ronda(1, rondas) if cruces else None,
+            'cruces': [cruce for cruce in cruces if cruce.ronda == 1] if cruces else None,
+            'partidos': partidos,
+        }
+        return TemplateResponse(request, 'admin/core/generar_llave.html', contexto)
+
+    # Sortea los grupos: la vista previa fija la semilla para que "Guardar" repita el mismo sorteo
+    def grupos_view(self, request, object_id):
+        campeonato = self.get_object(request, object_id)
+        if campeonato is None or not self.has_change_permission(request, campeonato) or not request.user.has_perm('core.change_equipo'):
+            return redirect('admin:index')
+        datos = None
+        if request.method == 'POST':
+            datos = request.POST.copy()
+            if not datos.get('semilla'):
+                datos['semilla'] = random.randrange(1_000_000)
+        form = SortearGruposForm(datos, initial={'separar_carreras': True})
+        grupos = None
+        if request.method == 'POST' and form.is_valid():
+            datos = form.cleaned_data
+            try:
+                grupos = sortear_grupos(
+                    bombos_por_nombre(campeonato, datos['bombos']), datos['cantidad'],
+                    datos['separar_carreras'], datos['tamanio_maximo'], datos['semilla'],
+                )
+            except ErrorSorteo as error:
+                messages.error(request, str(error))
+            else:
+                if 'guardar' in request.POST:
+                    guardar_grupos(campeonato, grupos)
+                    messages.success(request, f"Grupos de {campeonato} guardados.")
+                    return redirect(f"{reverse('admin:core_equipo_changelist')}?campeonato__id__exact={campeonato.pk}")
+        contexto = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'original': campeonato,
+            'title': f'Sortear grupos de {campeonato}',
+            'form': form,
+            'grupos': grupos,
+        }
+        return TemplateResponse(request, 'admin/core/sortear_grupos.html', contexto)
 
 
 class EquipoAdmin(admin.ModelAdmin):
     form = EquipoForm
     # Mostrar campos clave en la lista
-    list_display = ('nombre', 'campeonato', 'carrera', 'aprobado', 'delegado', 'puede_participar')
+    list_display = ('nombre', 'campeonato', 'carrera', 'grupo', 'aprobado', 'delegado', 'puede_participar', 'puntos')
     # Campos de búsqueda
     search_fields = ('nombre', 'carrera', 'delegado__username', 'campeonato__nombre')
     # Filtros por estado de aprobación y campeonato
-    list_filter = ('aprobado', 'campeonato', 'carrera')
+    list_filter = ('aprobado', 'campeonato', 'carrera', 'grupo')
     # Orden por nombre de equipo
     ordering = ('nombre',)
     # Mostrar el logo como solo lectura para evitar ediciones accidentales
     # readonly_fields = ('logo',)
 
+    # Los puntos se calculan en la misma consulta del listado (ordenables por columna)
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_puntos()
+
+    def puntos(self, obj):
+        return obj.puntos
+    puntos.short_description = 'Puntos'
+    puntos.admin_order_field = 'puntos'
+
 
 
 class JugadorAdmin(admin.ModelAdmin):
     # Muestra en la tabla de administración
     list_display = ('usuario', 'equipo', 'numero_camiseta', 'edad', 'esta_suspendido')
+    list_select_related = ('usuario', 'equipo')
     
     # Campos de búsqueda por nombre de usuario y equipo
     search_fields = ('usuario__username', 'equipo__nombre')
@@ -85,9 +238,15 @@ class JugadorAdmin(admin.ModelAdmin):
     
     # Ordenar por número de camiseta
     ordering = ('equipo', 'numero_camiseta')
+
+    # La suspensión se calcula en la misma consulta del listado (ver JugadorQuerySet.con_suspendido)
+    def get_queryset(self, request):
+        return super().get_queryset(request).con_suspendido()
+
     def esta_suspendido(self, obj):
         return "Sí" if obj.esta_suspendido() else "No"
     esta_suspendido.short_description = '¿Suspendido?'
+    esta_suspendido.admin_order_field = 'suspendido'
 
 
 
@@ -105,6 +264,10 @@ class ArbitroAdmin(admin.ModelAdmin):
     # Orden por apellido
     ordering = ('apellido',)
 
+    # Los deportes de todos los árbitros de la página en una sola consulta
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('deportes')
+
     def mostrar_deportes(self, obj):
         return ", ".join([d.nombre for d in obj.deportes.all()])
     mostrar_deportes.short_description = 'Deportes'
@@ -146,6 +309,135 @@ class PartidoAdmin(admin.ModelAdmin):
         return obj.hora.strftime('%H:%M')
     formatted_hora.short_description = 'Hora'
 
+    actions = ['asignar_arbitros']
+
+    # Asigna árbitro a los partidos seleccionados que no tienen (ver core/arbitrajes.py)
+    @admin.action(description="Asignar árbitros a los partidos seleccionados sin árbitro", permissions=['change'])
+    def asignar_arbitros(self, request, queryset):
+        asignados, sin_asignar = asignar_arbitros(queryset)
+        guardados = guardar_arbitros(asignados)
+        self.message_user(request, f"Se asignó árbitro a {len(guardados)} partidos.", messages.SUCCESS)
+        if len(guardados) < len(asignados):
+            self.message_user(
+                request,
+                f"{len(asignados) - len(guardados)} partidos cambiaron mientras se calculaba la asignación y no se tocaron.",
+                messages.WARNING,
+            )
+        if sin_asignar:
+            self.message_user(
+                request,
+                f"{len(sin_asignar)} partidos quedaron sin árbitro (no hay árbitros activos del deporte libres a esa hora): "
+                + ", ".join(str(partido) for partido in sin_asignar[:10]) + ("..." if len(sin_asignar) > 10 else ""),
+                messages.WARNING,
+            )
+
+    # Los choques de lugar y de horario de los equipos los rechaza la base al guardar
+    # (Partido.save lanza ChoqueHorario): se muestra el motivo en vez de dar un error 500
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except ChoqueHorario as error:
+            messages.error(request, f"{error} Revise los datos y vuelva a guardar.")
+            return redirect(request.get_full_path())
+        except IntegrityError:
+            messages.error(request, "Otro partido ocupó ese horario o lugar mientras se editaba; revise los datos y vuelva a guardar.")
+            return redirect(request.get_full_path())
+
+
+
+class PosicionAdmin(admin.ModelAdmin):
+    # Tabla de posiciones calculada automáticamente (solo lectura)
+    list_display = (
+        'equipo',
+        'campeonato',
+        'puntos',
+        'partidos_jugados',
+        'partidos_ganados',
+        'partidos_empatados',
+        'partidos_perdidos',
+        'goles_favor',
+        'goles_contra',
+        'diferencia_goles',
+    )
+    list_filter = ('campeonato',)
+    search_fields = ('equipo__nombre', 'campeonato__nombre')
+    list_select_related = ('equipo', 'campeonato__deporte')
+
+    # Las filas las mantiene el sistema; para recalcularlas usar "reconstruir_posiciones"
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class TotalesEquipoAdmin(admin.ModelAdmin):
+    # Totales de estadísticas por equipo calculados automáticamente (solo lectura)
+    list_display = ('equipo', 'goles', 'tarjetas_amarillas', 'tarjetas_rojas', 'goles_futbolin')
+    list_filter = ('equipo__campeonato',)
+    search_fields = ('equipo__nombre',)
+    list_select_related = ('equipo',)
+
+    # Las filas las mantiene el sistema; para corregirlas usar "verificar_totales --reparar"
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class EstadisticaJugadorAdmin(admin.ModelAdmin):
+    # Estadísticas de todos los deportes en una tabla (solo lectura: se copian de las tablas por deporte)
+    list_display = ('jugador', 'campeonato', 'jugados', 'ganados', 'empatados', 'perdidos', 'goles', 'canastas', 'sets_ganados')
+    list_filter = ('campeonato__deporte', 'campeonato')
+    search_fields = ('jugador__usuario__username', 'jugador__equipo__nombre')
+    list_select_related = ('jugador__usuario', 'campeonato')
+
+    # Para rehacerla usar "sincronizar_estadisticas"
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class TrayectoriaUsuarioAdmin(admin.ModelAdmin):
+    # Trayectoria de cada usuario en todos sus campeonatos (solo lectura: se recalcula sola)
+    list_display = ('usuario', 'campeonatos', 'titulos', 'jugados', 'ganados', 'goles', 'actualizado')
+    search_fields = ('usuario__username', 'usuario__first_name', 'usuario__last_name')
+    list_select_related = ('usuario',)
+    ordering = ('-titulos', '-ganados')
+
+    # Para rehacerlas usar "actualizar_trayectorias"
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class CruceLlaveAdmin(admin.ModelAdmin):
+    # Llaves de eliminación directa (se arman desde el campeonato y avanzan solas al finalizar los partidos)
+    list_display = ('campeonato', 'ronda', 'posicion', 'equipo_local', 'equipo_visitante', 'ganador', 'partido')
+    list_filter = ('campeonato',)
+    list_select_related = ('campeonato', 'equipo_local', 'equipo_visitante', 'ganador', 'partido__equipo_local', 'partido__equipo_visitante')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class EventoPartidoAdmin(admin.ModelAdmin):
+    # Registro de eventos de los partidos: solo se agregan (se corrigen con un evento de valor negativo)
+    list_display = ('partido', 'jugador', 'tipo', 'valor', 'minuto', 'creado', 'aplicado')
+    list_filter = ('tipo', 'aplicado', 'partido__campeonato')
+    search_fields = ('jugador__usuario__username', 'partido__equipo_local__nombre', 'partido__equipo_visitante__nombre')
+    list_select_related = ('partido__equipo_local', 'partido__equipo_visitante', 'jugador__usuario', 'jugador__equipo')
+    raw_id_fields = ('partido', 'jugador')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 class CodigoQRAdmin(admin.ModelAdmin):
@@ -192,16 +484,17 @@ class PagoAdmin(admin.ModelAdmin):
   
 class SuspensionAdmin(admin.ModelAdmin):
     # Campos visibles en la lista
-    list_display = ('jugador', 'fecha_inicio', 'fecha_fin', 'motivo', 'esta_activa_display')
+    list_display = ('jugador', 'fecha_inicio', 'fecha_fin', 'motivo', 'regla', 'esta_activa_display')
 
     # Filtros para facilitar búsqueda
-    list_filter = ('fecha_inicio', 'fecha_fin')
+    list_filter = ('fecha_inicio', 'fecha_fin', 'regla__campeonato')
 
     # Campos que se pueden buscar
     search_fields = ('jugador__usuario__username', 'motivo')
 
     # Orden por defecto
     ordering = ('-fecha_inicio',)
+    list_select_related = ('jugador__usuario', 'jugador__equipo', 'regla')
 
     # Método para mostrar si está activa con sí/no
     def esta_activa_display(self, obj):
@@ -210,50 +503,91 @@ class SuspensionAdmin(admin.ModelAdmin):
 
 class TipoCampeonatoAdmin(admin.ModelAdmin):
     # Campos que se mostrarán en la tabla del admin
-    list_display = ('nombre', 'descripcion')
+    list_display = ('nombre', 'formato', 'descripcion')
+    list_filter = ('formato',)
     # Permite buscar por nombre
     search_fields = ('nombre',)
     # Ordena por nombre alfabéticamente
     ordering = ('nombre',)
 
 
-class EstadisticaJugadorFutbolAdmin(admin.ModelAdmin):
+# Agrega a los listados de estadísticas el botón "Importar CSV/XLSX"
+class ImportarEstadisticasMixin:
+    change_list_template = 'admin/core/estadisticas_change_list.html'
+
+    def get_urls(self):
+        opciones = self.model._meta
+        return [
+            path(
+                'importar/', self.admin_site.admin_view(self.importar_view),
+                name=f'{opciones.app_label}_{opciones.model_name}_importar',
+            ),
+        ] + super().get_urls()
+
+    def importar_view(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect('admin:index')
+        form = ImportarEstadisticasForm(request.POST or None, request.FILES or None)
+        resultado = None
+        if request.method == 'POST' and form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            try:
+                resultado = importar_estadisticas(leer_filas(archivo.file, archivo.name), form.cleaned_data['campeonato'])
+            except ErrorImportacion as error:
+                messages.error(request, str(error))
+            else:
+                nivel = messages.WARNING if resultado.cantidad_errores else messages.SUCCESS
+                messages.add_message(
+                    request, nivel,
+                    f"{resultado.filas} filas leídas: {resultado.guardadas} guardadas, {resultado.cantidad_errores} con errores.",
+                )
+        contexto = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Importar estadísticas',
+            'form': form,
+            'resultado': resultado,
+        }
+        return TemplateResponse(request, 'admin/core/importar_estadisticas.html', contexto)
+
+
+class EstadisticaJugadorFutbolAdmin(ImportarEstadisticasMixin, admin.ModelAdmin):
     list_display = ('jugador', 'campeonato', 'partidos_jugados', 'goles', 'tarjetas_amarillas', 'tarjetas_rojas')
     search_fields = ('jugador__usuario__username', 'campeonato__nombre')
     list_filter = ('campeonato',)
 
 
-class EstadisticaJugadorBasquetAdmin(admin.ModelAdmin):
+class EstadisticaJugadorBasquetAdmin(ImportarEstadisticasMixin, admin.ModelAdmin):
     list_display = ('jugador', 'campeonato', 'partidos_jugados', 'canastas', 'rebotes', 'asistencias')
     search_fields = ('jugador__usuario__username', 'campeonato__nombre')
     list_filter = ('campeonato',)
 
-class EstadisticaJugadorAjedrezAdmin(admin.ModelAdmin):
+class EstadisticaJugadorAjedrezAdmin(ImportarEstadisticasMixin, admin.ModelAdmin):
     list_display = ('jugador', 'campeonato', 'partidas_jugadas', 'partidas_ganadas', 'partidas_empatadas', 'partidas_perdidas')
     search_fields = ('jugador__usuario__username', 'campeonato__nombre')
     list_filter = ('campeonato',)
 
-class EstadisticaJugadorEcuabolyAdmin(admin.ModelAdmin):
+class EstadisticaJugadorEcuabolyAdmin(ImportarEstadisticasMixin, admin.ModelAdmin):
     list_display = ('jugador', 'campeonato', 'partidos_jugados', 'sets_ganados', 'sets_perdidos')
     search_fields = ('jugador__usuario__username', 'campeonato__nombre')
     list_filter = ('campeonato',)
 
-class EstadisticaJugadorPingPongAdmin(admin.ModelAdmin):
+class EstadisticaJugadorPingPongAdmin(ImportarEstadisticasMixin, admin.ModelAdmin):
     list_display = ('jugador', 'campeonato', 'partidos_jugados', 'partidos_ganados', 'partidos_perdidos')
     search_fields = ('jugador__usuario__username', 'campeonato__nombre')
     list_filter = ('campeonato',)
 
-class EstadisticaJugadorTenisAdmin(admin.ModelAdmin):
+class EstadisticaJugadorTenisAdmin(ImportarEstadisticasMixin, admin.ModelAdmin):
     list_display = ('jugador', 'campeonato', 'partidos_jugados', 'sets_ganados', 'sets_perdidos')
     search_fields = ('jugador__usuario__username', 'campeonato__nombre')
     list_filter = ('campeonato',)
 
-class EstadisticaJugadorVideojuegosAdmin(admin.ModelAdmin):
+class EstadisticaJugadorVideojuegosAdmin(ImportarEstadisticasMixin, admin.ModelAdmin):
     list_display = ('jugador', 'campeonato', 'partidas_jugadas', 'partidas_ganadas', 'partidas_perdidas')
     search_fields = ('jugador__usuario__username', 'campeonato__nombre')
     list_filter = ('campeonato',)
 
-class EstadisticaJugadorFutbolinAdmin(admin.ModelAdmin):
+class EstadisticaJugadorFutbolinAdmin(ImportarEstadisticasMixin, admin.ModelAdmin):
     list_display = ('jugador', 'campeonato', 'partidos_jugados', 'partidos_ganados', 'partidos_perdidos', 'goles')
     search_fields = ('jugador__usuario__username', 'campeonato__nombre')
     list_filter = ('campeonato',)
@@ -274,6 +608,13 @@ admin.site.register(Jugador, JugadorAdmin)
 admin.site.register(Arbitro, ArbitroAdmin)
 # Registra el modelo Partido donde se definen encuentros entre equipos
 admin.site.register(Partido, PartidoAdmin)
+# Tabla de posiciones materializada por campeonato
+admin.site.register(Posicion, PosicionAdmin)
+admin.site.register(TotalesEquipo, TotalesEquipoAdmin)
+admin.site.register(EventoPartido, EventoPartidoAdmin)
+admin.site.register(EstadisticaJugador, EstadisticaJugadorAdmin)
+admin.site.register(TrayectoriaUsuario, TrayectoriaUsuarioAdmin)
+admin.site.register(CruceLlave, CruceLlaveAdmin)
 
 # codigo QR para el pago 
 admin.site.register(CodigoQR, CodigoQRAdmin)
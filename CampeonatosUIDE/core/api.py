@@ -0,0 +1,250 @@
+import datetime
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+
+from .clasificaciones import clasificaciones_campeonato, clasificaciones_para, filas_clasificacion
+from .grupos import posiciones_por_grupo
+from .jornadas import COLUMNAS_JORNADA, evolucion_posiciones, jornadas_campeonato, tabla_en_jornada
+from .llaves import llave_campeonato
+from .models import Campeonato, Partido, Posicion
+from .posiciones import CAMPOS_TABLA
+from .versiones import DURACION_CACHE, version_campeonato
+
+
+# Cantidad de jugadores en la lista de goleadores
+LIMITE_GOLEADORES = 10
+
+
+# ETag y Last-Modified salen de la versión del campeonato (solo se lee la caché, sin consultas).
+# Si el campeonato no existe no hay versión ni cabeceras y la vista responde 404.
+def _etag(request, id, *args, **kwargs):
+    version_actual = version_campeonato(id)
+    return None if version_actual is None else str(version_actual)
+
+
+def _ultima_modificacion(request, id, *args, **kwargs):
+    version_actual = version_campeonato(id)
+    return None if version_actual is None else datetime.datetime.fromtimestamp(version_actual / 1e9, tz=datetime.timezone.utc)
+
+
+# Decorador de los endpoints de solo lectura de un campeonato: "construir" recibe el
+# campeonato (y los demás parámetros de la URL) y devuelve los datos. Responde 304 si el
+# cliente ya tiene la versión actual y guarda los datos en caché bajo esa versión para no
+# recalcularlos en cada consulta.
+def endpoint_campeonato(construir):
+    @require_GET
+    @cache_control(public=True, no_cache=True)
+    @condition(etag_func=_etag, last_modified_func=_ultima_modificacion)
+    @wraps(construir)
+    def vista(request, id, **parametros):
+        version_actual = version_campeonato(id)
+        if version_actual is None:
+            raise Http404("Campeonato no encontrado")
+        extra = ''.join(f":{clave}={valor}" for clave, valor in sorted(parametros.items()))
+        clave = f"api:{construir.__name__}:{id}{extra}:{version_actual}"
+        datos = cache.get(clave)
+        if datos is None:
+            campeonato = get_object_or_404(Campeonato.objects.select_related('deporte'), id=id)
+            datos = {'campeonato': _datos_campeonato(campeonato), **construir(campeonato, **parametros)}
+            cache.set(clave, datos, DURACION_CACHE)
+        return JsonResponse(datos)
+
+    return vista
+
+
+def _datos_campeonato(campeonato):
+    return {
+        'id': campeonato.id,
+        'nombre': campeonato.nombre,
+        'deporte': campeonato.deporte.nombre,
+        'estado': campeonato.estado,
+    }
+
+
+def _datos_equipo(equipo):
+    return {'id': equipo.id, 'nombre': equipo.nombre}
+
+
+@endpoint_campeonato
+def api_tabla(campeonato):
+    posiciones = Posicion.objects.filter(campeonato=campeonato).select_related('equipo')
+    return {
+        'posiciones': [
+            {
+                'posicion': numero,
+                'equipo': _datos_equipo(posicion.equipo),
+                'puntos': float(posicion.puntos),
+                'partidos_jugados': posicion.partidos_jugados,
+                'partidos_ganados': posicion.partidos_ganados,
+                'partidos_empatados': posicion.partidos_empatados,
+                'partidos_perdidos': posicion.partidos_perdidos,
+                'goles_favor': posicion.goles_favor,
+                'goles_contra': posicion.goles_contra,
+                'diferencia_goles': posicion.diferencia_goles,
+            }
+            for numero, posicion in enumerate(posiciones, start=1)
+        ]
+    }
+
+
+@endpoint_campeonato
+def api_partidos(campeonato):
+    partidos = (
+        Partido.objects.filter(campeonato=campeonato)
+        .select_related('equipo_local', 'equipo_visitante', 'arbitro')
+        .order_by('fecha', 'hora')
+    )
+    return {
+        'partidos': [
+            {
+                'id': partido.id,
+                'fecha': partido.fecha.isoformat(),
+                'hora': partido.hora.strftime('%H:%M'),
+                'lugar': partido.lugar,
+                'estado': partido.estado,
+                'local': _datos_equipo(partido.equipo_local),
+                'visitante': _datos_equipo(partido.equipo_visitante),
+                'resultado_local': partido.resultado_local,
+                'resultado_visitante': partido.resultado_visitante,
+                'arbitro': str(partido.arbitro) if partido.arbitro else None,
+            }
+            for partido in partidos
+        ]
+    }
+
+
+@endpoint_campeonato
+def api_goleadores(campeonato):
+    goles = next((c for c in clasificaciones_para(campeonato.deporte) if c.nombre == 'goles'), None)
+    filas = filas_clasificacion(campeonato.pk, goles, LIMITE_GOLEADORES) if goles else []
+    return {
+        'goleadores': [
+            {
+                'jugador_id': fila['jugador_id'],
+                'jugador': fila['jugador'],
+                'equipo': {'id': fila['equipo_id'], 'nombre': fila['equipo']},
+                'goles': fila['valor'],
+            }
+            for fila in filas
+        ]
+    }
+
+
+@endpoint_campeonato
+def api_clasificaciones(campeonato):
+    return {
+        'clasificaciones': [
+            {
+                'nombre': clasificacion.nombre,
+                'titulo': clasificacion.titulo,
+                'jugadores': [
+                    {
+                        'posicion': numero,
+                        'jugador_id': fila['jugador_id'],
+                        'jugador': fila['jugador'],
+                        'equipo': {'id': fila['equipo_id'], 'nombre': fila['equipo']},
+                        'valor': float(fila['valor']),
+                    }
+                    for numero, fila in enumerate(filas, start=1)
+                ],
+            }
+            for clasificacion, filas in clasificaciones_campeonato(campeonato)
+        ]
+    }
+
+
+# Jornadas cerradas y la posición de cada equipo en cada una (para gráficos de evolución)
+@endpoint_campeonato
+def api_jornadas(campeonato):
+    return {
+        'jornadas': [
+            {'numero': jornada['numero'], 'fecha': jornada['fecha'].isoformat()}
+            for jornada in jornadas_campeonato(campeonato.pk)
+        ],
+        'evolucion': [
+            {
+                'equipo_id': equipo_id,
+                'jornadas': [{**punto, 'fecha': punto['fecha'].isoformat()} for punto in puntos],
+            }
+            for equipo_id, puntos in evolucion_posiciones(campeonato.pk).items()
+        ],
+    }
+
+
+# Tabla de posiciones tal como estaba al cerrar la jornada "numero", o en "fecha" (la última
+# jornada cerrada hasta ese día; sirve como enlace fijo aunque se agreguen fechas al calendario)
+@endpoint_campeonato
+def api_tabla_jornada(campeonato, numero=None, fecha=None):
+    tabla = tabla_en_jornada(campeonato.pk, numero=numero, fecha=fecha)
+    if tabla is None:
+        raise Http404("La jornada no existe o todavía no está cerrada.")
+    return {
+        'jornada': {'numero': tabla['numero'], 'fecha': tabla['fecha'].isoformat()},
+        'posiciones': [
+            {
+                'posicion': fila['posicion'],
+                'equipo': {'id': fila['equipo_id'], 'nombre': fila['equipo']},
+                **{campo: fila[campo] for campo in COLUMNAS_JORNADA[1:]},
+            }
+            for fila in tabla['filas']
+        ],
+    }
+
+
+# Llave de eliminación directa por rondas (los cruces sin equipos esperan a los ganadores anteriores)
+@endpoint_campeonato
+def api_llave(campeonato):
+    return {
+        'rondas': [
+            {
+                'ronda': ronda['ronda'],
+                'nombre': ronda['nombre'],
+                'cruces': [
+                    {
+                        'posicion': cruce['posicion'],
+                        'local': cruce['local'] and _datos_equipo(cruce['local']),
+                        'visitante': cruce['visitante'] and _datos_equipo(cruce['visitante']),
+                        'ganador_id': cruce['ganador_id'],
+                        'partido': cruce['partido'] and {
+                            'id': cruce['partido'].pk,
+                            'fecha': cruce['partido'].fecha.isoformat(),
+                            'hora': cruce['partido'].hora.strftime('%H:%M'),
+                            'lugar': cruce['partido'].lugar,
+                            'estado': cruce['partido'].estado,
+                            'resultado_local': cruce['partido'].resultado_local,
+                            'resultado_visitante': cruce['partido'].resultado_visitante,
+                        },
+                    }
+                    for cruce in ronda['cruces']
+                ],
+            }
+            for ronda in llave_campeonato(campeonato.pk)
+        ],
+    }
+
+
+# Tabla de posiciones de cada grupo
+@endpoint_campeonato
+def api_grupos(campeonato):
+    return {
+        'grupos': [
+            {
+                'grupo': grupo,
+                'posiciones': [
+                    {
+                        'posicion': numero,
+                        'equipo': _datos_equipo(posicion.equipo),
+                        'puntos': float(posicion.puntos),
+                        **{campo: getattr(posicion, campo) for campo in CAMPOS_TABLA[1:]},
+                    }
+                    for numero, posicion in enumerate(posiciones, start=1)
+                ],
+            }
+            for grupo, posiciones in posiciones_por_grupo(campeonato.pk).items()
+        ],
+    }
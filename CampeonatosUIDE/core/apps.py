@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        # Registra los chequeos del sistema (manage.py check --deploy)
+        from . import checks
+        from .models import actualizar_puntos_por_estadistica
+        from .puntuacion import ESTRATEGIAS
+
+        # Los deportes que puntúan por estadísticas recalculan la tabla al cambiar sus filas
+        for estrategia in ESTRATEGIAS.values():
+            modelo = getattr(estrategia, 'modelo', None)
+            if modelo is not None:
+                post_save.connect(actualizar_puntos_por_estadistica, sender=modelo)
+                post_delete.connect(actualizar_puntos_por_estadistica, sender=modelo)
@@ -0,0 +1,111 @@
+import datetime
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .models import Arbitro, Partido
+from .versiones import marcar_cambio_campeonato
+
+
+# Tiempo que un árbitro queda ocupado por un partido: dos partidos del mismo día cuyas horas
+# de inicio están a menos de esto se superponen
+DURACION_PARTIDO = datetime.timedelta(hours=2)
+
+# Filas por consulta al guardar
+LOTE_ARBITROS = 500
+
+
+def _minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+
+# True si dos partidos del mismo día que empiezan a esas horas se superponen
+def se_superponen(hora, otra_hora):
+    return abs(_minutos(hora) - _minutos(otra_hora)) < DURACION_PARTIDO.total_seconds() // 60
+
+
+# Asigna árbitro a los partidos programados sin árbitro de "partidos" (un queryset) en una pasada:
+# - solo árbitros activos que arbitran el deporte del campeonato;
+# - un árbitro no tiene dos partidos superpuestos, contando los que ya tenía asignados;
+# - cada partido va al árbitro habilitado y libre con menos partidos en esas fechas, así la
+#   carga queda pareja;
+# - primero se ubican los partidos con menos árbitros posibles, que son los que se quedarían sin.
+# Los árbitros y sus deportes se leen una vez (prefetch_related) y los partidos ya asignados en
+# otra consulta. No guarda nada: devuelve (asignados, sin_asignar) para pasar a guardar_arbitros.
+def asignar_arbitros(partidos):
+    partidos = list(
+        partidos.filter(arbitro__isnull=True, estado='PROGRAMADO')
+        .select_related('campeonato', 'equipo_local', 'equipo_visitante')
+        .order_by('fecha', 'hora', 'pk')
+    )
+    if not partidos:
+        return [], []
+
+    habilitados = defaultdict(list)
+    for arbitro in Arbitro.objects.filter(estado=True).prefetch_related('deportes').order_by('pk'):
+        for deporte in arbitro.deportes.all():
+            habilitados[deporte.pk].append(arbitro)
+
+    ocupados = defaultdict(list)
+    carga = Counter()
+    asignados_antes = Partido.objects.filter(
+        arbitro__isnull=False, fecha__gte=partidos[0].fecha, fecha__lte=partidos[-1].fecha,
+    ).values_list('arbitro_id', 'fecha', 'hora')
+    for arbitro_id, fecha, hora in asignados_antes:
+        ocupados[(arbitro_id, fecha)].append(hora)
+        carga[arbitro_id] += 1
+
+    asignados, sin_asignar = [], []
+    pendientes = sorted(partidos, key=lambda partido: (len(habilitados[partido.campeonato.deporte_id]), partido.fecha, partido.hora, partido.pk))
+    for partido in pendientes:
+        libres = [
+            arbitro for arbitro in habilitados[partido.campeonato.deporte_id]
+            if not any(se_superponen(hora, partido.hora) for hora in ocupados[(arbitro.pk, partido.fecha)])
+        ]
+        if not libres:
+            sin_asignar.append(partido)
+            continue
+        arbitro = min(libres, key=lambda arbitro: (carga[arbitro.pk], len(ocupados[(arbitro.pk, partido.fecha)]), arbitro.pk))
+        partido.arbitro = arbitro
+        ocupados[(arbitro.pk, partido.fecha)].append(partido.hora)
+        carga[arbitro.pk] += 1
+        asignados.append(partido)
+
+    asignados.sort(key=lambda partido: (partido.fecha, partido.hora, partido.pk))
+    sin_asignar.sort(key=lambda partido: (partido.fecha, partido.hora, partido.pk))
+    return asignados, sin_asignar
+
+
+# Guarda los árbitros asignados con bulk_update, volviendo a revisar con los partidos bloqueados
+# (select_for_update) lo que pudo cambiar desde asignar_arbitros: se saltean los partidos que ya
+# tienen árbitro (p. ej. asignado a mano en el admin) y los que dejarían al árbitro con dos
+# partidos superpuestos. Como bulk_update no dispara señales, marca el cambio de los campeonatos
+# y de los calendarios para invalidar la caché. Devuelve los partidos guardados.
+def guardar_arbitros(partidos):
+    from .calendarios import marcar_cambio_calendarios
+    if not partidos:
+        return []
+    with transaction.atomic():
+        sin_arbitro = set(
+            Partido.objects.select_for_update()
+            .filter(pk__in=[partido.pk for partido in partidos], arbitro__isnull=True, estado='PROGRAMADO')
+            .values_list('pk', flat=True)
+        )
+        ocupados = defaultdict(list)
+        asignados_antes = Partido.objects.filter(
+            arbitro_id__in={partido.arbitro_id for partido in partidos}, fecha__in={partido.fecha for partido in partidos},
+        ).values_list('arbitro_id', 'fecha', 'hora')
+        for arbitro_id, fecha, hora in asignados_antes:
+            ocupados[(arbitro_id, fecha)].append(hora)
+
+        guardados = []
+        for partido in partidos:
+            horas = ocupados[(partido.arbitro_id, partido.fecha)]
+            if partido.pk not in sin_arbitro or any(se_superponen(hora, partido.hora) for hora in horas):
+                continue
+            horas.append(partido.hora)
+            guardados.append(partido)
+        Partido.objects.bulk_update(guardados, ['arbitro'], batch_size=LOTE_ARBITROS)
+        marcar_cambio_campeonato(*{partido.campeonato_id for partido in guardados})
+        marcar_cambio_calendarios(*guardados)
+    return guardados
@@ -0,0 +1,234 @@
+import datetime
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+
+from .arbitrajes import DURACION_PARTIDO
+from .models import Arbitro, Campeonato, Equipo, Partido, clave_lugar
+from .versiones import DURACION_CACHE, marcar_cambio, version
+
+
+# Cada cuánto se sugiere a las aplicaciones de calendario volver a consultar
+INTERVALO_ACTUALIZACION = 'PT15M'
+
+# Dominio de los UID de los eventos (identifica al partido entre descargas)
+DOMINIO_UID = 'campeonatos-uide'
+
+
+# Clave del lugar en las versiones de caché (sin espacios ni caracteres raros). Parte de
+# clave_lugar, igual que Partido.lugar_clave, con la que se filtra el calendario del lugar.
+def _clave_version_lugar(lugar):
+    return hashlib.md5(clave_lugar(lugar).encode(), usedforsecurity=False).hexdigest()
+
+
+# Calendarios que muestran un partido según sus valores (Partido.CAMPOS_CALENDARIO):
+# [('campeonato', id), ('equipo', id), ('equipo', id), ('lugar', clave), ('arbitro', id)]
+def calendarios_partido(valores):
+    calendarios = [
+        ('campeonato', valores['campeonato_id']),
+        ('equipo', valores['equipo_local_id']),
+        ('equipo', valores['equipo_visitante_id']),
+        ('lugar', _clave_version_lugar(valores['lugar'])),
+    ]
+    if valores['arbitro_id']:
+        calendarios.append(('arbitro', valores['arbitro_id']))
+    return calendarios
+
+
+# Lo que muestra el evento de un partido: el marcador solo cuenta cuando terminó, así los
+# goles de un partido en curso no invalidan los calendarios
+def contenido_evento(valores):
+    if not valores:
+        return None
+    contenido = {campo: valores[campo] for campo in Partido.CAMPOS_CALENDARIO}
+    if contenido['estado'] != 'FINALIZADO':
+        contenido['resultado_local'] = contenido['resultado_visitante'] = None
+    return contenido
+
+
+# Marca el cambio de los calendarios que muestran los partidos (instancias o diccionarios con
+# Partido.CAMPOS_CALENDARIO). Lo llaman las señales de Partido y los procesos masivos.
+def marcar_cambio_calendarios(*partidos):
+    calendarios = set()
+    for partido in partidos:
+        if partido is None:
+            continue
+        if not isinstance(partido, dict):
+            partido = {campo: getattr(partido, campo) for campo in Partido.CAMPOS_CALENDARIO}
+        calendarios.update(calendarios_partido(partido))
+    for tipo, clave in calendarios:
+        marcar_cambio('calendario', tipo, clave)
+
+
+# Un campeonato, equipo o árbitro cambió de nombre: se invalidan su calendario y los de todos
+# sus partidos (equipos, lugares y árbitros que lo muestran), leyendo los partidos en una consulta
+def marcar_cambio_nombre(modelo, pk):
+    tipo = {Campeonato: 'campeonato', Equipo: 'equipo', Arbitro: 'arbitro'}[modelo]
+    filtro = {
+        Campeonato: Q(campeonato_id=pk),
+        Equipo: Q(equipo_local_id=pk) | Q(equipo_visitante_id=pk),
+        Arbitro: Q(arbitro_id=pk),
+    }[modelo]
+    marcar_cambio('calendario', tipo, pk)
+    marcar_cambio_calendarios(*Partido.objects.filter(filtro).values(*Partido.CAMPOS_CALENDARIO))
+
+
+# Después de guardar o borrar un partido ("anterior" y "actual" son sus valores, None si no
+# existe): solo se invalidan los calendarios si cambió algo que se ve en el evento
+def actualizar_calendarios_partido(anterior, actual):
+    if contenido_evento(anterior) != contenido_evento(actual):
+        marcar_cambio_calendarios(anterior, actual)
+
+
+# Texto de una propiedad iCalendar (RFC 5545, 3.3.11)
+def _texto(valor):
+    return str(valor).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+# Corta las líneas de más de 75 bytes; las continuaciones empiezan con un espacio
+def _plegar(linea):
+    partes, actual = [], ''
+    for caracter in linea:
+        if len((actual + caracter).encode()) > 75:
+            partes.append(actual)
+            actual = ' '
+        actual += caracter
+    partes.append(actual)
+    return '\r\n'.join(partes)
+
+
+def _instante(momento):
+    return momento.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _evento(partido, marca):
+    inicio = timezone.make_aware(datetime.datetime.combine(partido.fecha, partido.hora))
+    if partido.estado == 'FINALIZADO' and partido.resultado_local is not None:
+        resumen = f"{partido.equipo_local} {partido.resultado_local} - {partido.resultado_visitante} {partido.equipo_visitante}"
+    else:
+        resumen = f"{partido.equipo_local} vs {partido.equipo_visitante}"
+    descripcion = [partido.campeonato.nombre, f"Estado: {partido.get_estado_display()}"]
+    if partido.arbitro is not None:
+        descripcion.append(f"Árbitro: {partido.arbitro}")
+    return [
+        'BEGIN:VEVENT',
+        f"UID:partido-{partido.pk}@{DOMINIO_UID}",
+        f"DTSTAMP:{marca}",
+        f"DTSTART:{_instante(inicio)}",
+        f"DTEND:{_instante(inicio + DURACION_PARTIDO)}",
+        f"SUMMARY:{_texto(resumen)}",
+        f"LOCATION:{_texto(partido.lugar)}",
+        f"DESCRIPTION:{_texto(chr(10).join(descripcion))}",
+        'STATUS:CONFIRMED',
+        'END:VEVENT',
+    ]
+
+
+# Arma el archivo .ics con los partidos (una consulta con select_related)
+def generar_calendario(nombre, partidos, version_actual):
+    marca = _instante(datetime.datetime.fromtimestamp(version_actual / 1e9, tz=datetime.timezone.utc))
+    lineas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//UIDE//Campeonatos//ES',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f"X-WR-CALNAME:{_texto(nombre)}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:{INTERVALO_ACTUALIZACION}",
+        f"X-PUBLISHED-TTL:{INTERVALO_ACTUALIZACION}",
+    ]
+    partidos = partidos.select_related('campeonato', 'equipo_local', 'equipo_visitante', 'arbitro').order_by('fecha', 'hora', 'pk')
+    for partido in partidos:
+        lineas += _evento(partido, marca)
+    lineas.append('END:VCALENDAR')
+    return ''.join(_plegar(linea) + '\r\n' for linea in lineas)
+
+
+# Decorador de los calendarios: "construir" recibe el valor de la URL y devuelve
+# (nombre del calendario, queryset de los partidos). El ETag y Last-Modified salen de la versión
+# del calendario (solo se lee la caché), así que las aplicaciones que consultan cada pocos
+# minutos reciben 304 sin tocar la base; el archivo se guarda en caché bajo esa versión.
+# "existe" recibe el mismo valor y se consulta solo si la versión no está en caché: los ids y
+# lugares que no existen responden 404 sin crear una versión.
+def feed_calendario(tipo, existe, clave=str):
+    def decorador(construir):
+        # La URL tiene un solo parámetro (id o lugar)
+        def version_feed(request, **parametros):
+            valor, = parametros.values()
+            return version('calendario', tipo, clave(valor), existe=lambda: existe(valor))
+
+        def etag(request, **parametros):
+            version_actual = version_feed(request, **parametros)
+            return None if version_actual is None else str(version_actual)
+
+        def ultima_modificacion(request, **parametros):
+            version_actual = version_feed(request, **parametros)
+            return None if version_actual is None else datetime.datetime.fromtimestamp(version_actual / 1e9, tz=datetime.timezone.utc)
+
+        @require_GET
+        @cache_control(public=True, no_cache=True)
+        @condition(etag_func=etag, last_modified_func=ultima_modificacion)
+        @wraps(construir)
+        def vista(request, **parametros):
+            valor, = parametros.values()
+            version_actual = version_feed(request, **parametros)
+            if version_actual is None:
+                raise Http404("Calendario no encontrado")
+            clave_cache = f"ics:{tipo}:{clave(valor)}:{version_actual}"
+            contenido = cache.get(clave_cache)
+            if contenido is None:
+                nombre, partidos = construir(valor)
+                contenido = generar_calendario(nombre, partidos, version_actual)
+                cache.set(clave_cache, contenido, DURACION_CACHE)
+            respuesta = HttpResponse(contenido, content_type='text/calendar; charset=utf-8')
+            respuesta['Content-Disposition'] = f'inline; filename="{tipo}.ics"'
+            return respuesta
+
+        return vista
+
+    return decorador
+
+
+# Nombre del calendario leyendo solo esos campos del objeto
+def _nombre_o_404(modelo, pk, *campos):
+    valores = modelo.objects.filter(pk=pk).values_list(*campos).first()
+    if valores is None:
+        raise Http404(f"{modelo._meta.verbose_name.capitalize()} no encontrado")
+    return ' '.join(valores)
+
+
+def _existe(modelo):
+    return lambda pk: modelo.objects.filter(pk=pk).exists()
+
+
+def _existe_lugar(lugar):
+    return Partido.objects.filter(lugar_clave=clave_lugar(lugar)).exists()
+
+
+@feed_calendario('campeonato', _existe(Campeonato))
+def calendario_campeonato(id):
+    return _nombre_o_404(Campeonato, id, 'nombre'), Partido.objects.filter(campeonato_id=id)
+
+
+@feed_calendario('equipo', _existe(Equipo))
+def calendario_equipo(id):
+    return _nombre_o_404(Equipo, id, 'nombre'), Partido.objects.filter(Q(equipo_local_id=id) | Q(equipo_visitante_id=id))
+
+
+@feed_calendario('arbitro', _existe(Arbitro))
+def calendario_arbitro(id):
+    return f"Árbitro {_nombre_o_404(Arbitro, id, 'nombre', 'apellido')}", Partido.objects.filter(arbitro_id=id)
+
+
+# Un lugar no es un modelo: se compara por Partido.lugar_clave (la misma normalización que la
+# versión del calendario y la restricción partido_lugar_unico) y se usan todos los campeonatos.
+# Un lugar sin partidos responde 404.
+@feed_calendario('lugar', _existe_lugar, clave=_clave_version_lugar)
+def calendario_lugar(lugar):
+    return lugar.strip(), Partido.objects.filter(lugar_clave=clave_lugar(lugar))
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+# Aviso de "manage.py check --deploy": con la caché local cada proceso tiene sus propias versiones
+# de los campeonatos (core/versiones.py) y las páginas guardadas por los otros quedan viejas.
+# settings.py ya no arranca con WEB_CONCURRENCY > 1, pero "uvicorn --workers N" no la define.
+@register(Tags.caches, deploy=True)
+def revisar_cache_compartida(app_configs, **kwargs):
+    if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+        return [Warning(
+            "La caché es local al proceso: con más de un worker las páginas en caché no se invalidan en todos.",
+            hint="Definir REDIS_URL si el sitio se sirve con más de un proceso.",
+            id='core.W001',
+        )]
+    return []
@@ -0,0 +1,104 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import DecimalField, F, Sum, Value
+
+from .models import (
+    EstadisticaJugadorAjedrez, EstadisticaJugadorBasquet, EstadisticaJugadorEcuaboly,
+    EstadisticaJugadorFutbol, EstadisticaJugadorFutbolin, EstadisticaJugadorPingPong,
+    EstadisticaJugadorTenis, EstadisticaJugadorVideojuegos,
+)
+from .versiones import DURACION_CACHE, version_campeonato
+
+
+# Cantidad de jugadores por clasificación si no se indica otra
+LIMITE_CLASIFICACION = 10
+
+
+# Una clasificación de jugadores: suma de "expresion" sobre las filas de "modelo"
+class Clasificacion:
+
+    def __init__(self, nombre, titulo, modelo, expresion):
+        self.nombre = nombre
+        self.titulo = titulo
+        self.modelo = modelo
+        self.expresion = expresion
+
+    # Filas ordenadas de un campeonato en una sola consulta agrupada por jugador
+    # (con sus datos de usuario y equipo); el límite se aplica en SQL
+    def consulta(self, campeonato_id, limite):
+        return (
+            self.modelo.objects.filter(campeonato_id=campeonato_id)
+            .values(
+                'jugador_id', 'jugador__usuario__username', 'jugador__usuario__first_name',
+                'jugador__usuario__last_name', 'jugador__equipo_id', 'jugador__equipo__nombre',
+            )
+            .annotate(valor=Sum(self.expresion))
+            .filter(valor__gt=0)
+            .order_by('-valor', 'jugador__usuario__username')[:limite]
+        )
+
+
+# Clasificaciones disponibles por código de deporte (Deporte.codigo)
+CLASIFICACIONES = {
+    'FUTBOL': [
+        Clasificacion('goles', 'Goleadores', EstadisticaJugadorFutbol, F('goles')),
+        Clasificacion('tarjetas', 'Tarjetas', EstadisticaJugadorFutbol, F('tarjetas_amarillas') + F('tarjetas_rojas')),
+    ],
+    'BASQUET': [
+        Clasificacion('canastas', 'Canastas', EstadisticaJugadorBasquet, F('canastas')),
+        Clasificacion('rebotes', 'Rebotes', EstadisticaJugadorBasquet, F('rebotes')),
+        Clasificacion('asistencias', 'Asistencias', EstadisticaJugadorBasquet, F('asistencias')),
+    ],
+    'AJEDREZ': [
+        # Igual que la tabla: 1 punto por partida ganada y medio por empatada
+        Clasificacion(
+            'puntaje', 'Puntaje', EstadisticaJugadorAjedrez,
+            F('partidas_ganadas') + F('partidas_empatadas') * Value(Decimal('0.5'), output_field=DecimalField()),
+        ),
+    ],
+    'ECUABOLY': [Clasificacion('sets', 'Sets ganados', EstadisticaJugadorEcuaboly, F('sets_ganados'))],
+    'TENIS': [Clasificacion('sets', 'Sets ganados', EstadisticaJugadorTenis, F('sets_ganados'))],
+    'PING_PONG': [Clasificacion('ganados', 'Partidos ganados', EstadisticaJugadorPingPong, F('partidos_ganados'))],
+    'FUTBOLIN': [Clasificacion('goles', 'Goleadores', EstadisticaJugadorFutbolin, F('goles'))],
+    'VIDEOJUEGOS': [Clasificacion('ganadas', 'Partidas ganadas', EstadisticaJugadorVideojuegos, F('partidas_ganadas'))],
+}
+
+
+# Clasificaciones del deporte indicado (lista vacía si no tiene)
+def clasificaciones_para(deporte):
+    return CLASIFICACIONES.get(deporte.codigo, [])
+
+
+# Filas de una clasificación de un campeonato, guardadas en caché bajo su versión:
+# [{'jugador_id', 'jugador', 'equipo_id', 'equipo', 'valor'}, ...]
+def filas_clasificacion(campeonato_id, clasificacion, limite=LIMITE_CLASIFICACION):
+    version_actual = version_campeonato(campeonato_id)
+    if version_actual is None:
+        return []
+    clave = f"clasificacion:{campeonato_id}:{clasificacion.modelo.__name__}:{clasificacion.nombre}:{limite}:{version_actual}"
+    filas = cache.get(clave)
+    if filas is None:
+        filas = [
+            {
+                'jugador_id': fila['jugador_id'],
+                'jugador': (
+                    f"{fila['jugador__usuario__first_name']} {fila['jugador__usuario__last_name']}".strip()
+                    or fila['jugador__usuario__username']
+                ),
+                'equipo_id': fila['jugador__equipo_id'],
+                'equipo': fila['jugador__equipo__nombre'],
+                'valor': fila['valor'],
+            }
+            for fila in clasificacion.consulta(campeonato_id, limite)
+        ]
+        cache.set(clave, filas, DURACION_CACHE)
+    return filas
+
+
+# Todas las clasificaciones del deporte de un campeonato: [(clasificacion, filas), ...]
+def clasificaciones_campeonato(campeonato, limite=LIMITE_CLASIFICACION):
+    return [
+        (clasificacion, filas_clasificacion(campeonato.pk, clasificacion, limite))
+        for clasificacion in clasificaciones_para(campeonato.deporte)
+    ]
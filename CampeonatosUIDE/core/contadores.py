@@ -0,0 +1,107 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import Equipo, EstadisticaJugadorFutbol, EstadisticaJugadorFutbolin, TotalesEquipo
+
+
+# Columnas de estadísticas que se acumulan en TotalesEquipo: {modelo: {columna: campo del total}}
+CONTADORES = {
+    EstadisticaJugadorFutbol: {
+        'goles': 'goles',
+        'tarjetas_amarillas': 'tarjetas_amarillas',
+        'tarjetas_rojas': 'tarjetas_rojas',
+    },
+    EstadisticaJugadorFutbolin: {
+        'goles': 'goles_futbolin',
+    },
+}
+CAMPOS_TOTALES = ('goles', 'tarjetas_amarillas', 'tarjetas_rojas', 'goles_futbolin')
+
+
+# Valores contados de una fila de estadísticas tal como están en la base, con su equipo:
+# {'jugador__equipo_id': ..., columna: valor, ...} (None si la fila no existe).
+# Bloquea la fila hasta el final de la transacción para que dos ediciones no lean el mismo valor.
+def valores_contados(modelo, pk):
+    if not pk:
+        return None
+    return (
+        modelo.objects.select_for_update().filter(pk=pk)
+        .values('jugador__equipo_id', *CONTADORES[modelo]).first()
+    )
+
+
+# Valores contados de una instancia en memoria (None si se borró)
+def valores_instancia(instancia, equipo_id):
+    if instancia is None:
+        return None
+    return {'jugador__equipo_id': equipo_id, **{columna: getattr(instancia, columna) for columna in CONTADORES[type(instancia)]}}
+
+
+# Suma a los totales de cada equipo la diferencia entre los valores anteriores y los actuales
+# de una fila de estadísticas, con F() para no pisar cambios concurrentes
+def aplicar_diferencia(modelo, anterior, actual):
+    diferencias = defaultdict(lambda: defaultdict(int))
+    for valores, signo in ((anterior, -1), (actual, 1)):
+        if not valores or not valores['jugador__equipo_id']:
+            continue
+        for columna, campo in CONTADORES[modelo].items():
+            diferencias[valores['jugador__equipo_id']][campo] += signo * valores[columna]
+
+    for equipo_id, campos in diferencias.items():
+        cambios = {campo: F(campo) + valor for campo, valor in campos.items() if valor}
+        if cambios:
+            # Si el equipo no tiene fila (se está borrando) no hay nada que actualizar;
+            # verificar_totales la recrea si hiciera falta
+            TotalesEquipo.objects.filter(equipo_id=equipo_id).update(**cambios)
+
+
+# Calcula desde las estadísticas los totales de los equipos indicados (todos por defecto):
+# {equipo_id: {campo: valor}}, con una consulta agrupada por modelo
+def calcular_totales(equipo_ids=None):
+    equipos = Equipo.objects.all()
+    if equipo_ids is not None:
+        equipos = equipos.filter(pk__in=equipo_ids)
+    totales = {equipo_id: dict.fromkeys(CAMPOS_TOTALES, 0) for equipo_id in equipos.values_list('pk', flat=True)}
+
+    for modelo, columnas in CONTADORES.items():
+        filas = modelo.objects.filter(jugador__equipo_id__in=list(totales)) if equipo_ids is not None else modelo.objects.all()
+        sumas = filas.values('jugador__equipo_id').order_by().annotate(
+            **{campo: Sum(columna) for columna, campo in columnas.items()}
+        )
+        for fila in sumas:
+            equipo_id = fila.pop('jugador__equipo_id')
+            if equipo_id in totales:
+                for campo, valor in fila.items():
+                    totales[equipo_id][campo] = valor or 0
+    return totales
+
+
+# Compara los totales guardados con los calculados y devuelve las diferencias:
+# {equipo_id: {campo: (guardado, calculado)}} (campo None si al equipo le falta la fila).
+# Con reparar=True además corrige las filas que no coinciden.
+def verificar_totales(equipo_ids=None, reparar=False):
+    calculados = calcular_totales(equipo_ids)
+    guardados = {
+        fila.pop('equipo_id'): fila
+        for fila in TotalesEquipo.objects.filter(equipo_id__in=list(calculados)).values('equipo_id', *CAMPOS_TOTALES)
+    }
+
+    diferencias = {}
+    for equipo_id, calculado in calculados.items():
+        guardado = guardados.get(equipo_id)
+        if guardado is None:
+            diferencias[equipo_id] = {None: (None, calculado)}
+            continue
+        distintos = {campo: (guardado[campo], valor) for campo, valor in calculado.items() if guardado[campo] != valor}
+        if distintos:
+            diferencias[equipo_id] = distintos
+
+    if reparar and diferencias:
+        filas = [TotalesEquipo(equipo_id=equipo_id, **calculados[equipo_id]) for equipo_id in diferencias]
+        with transaction.atomic():
+            TotalesEquipo.objects.bulk_create(
+                filas, update_conflicts=True, unique_fields=['equipo'], update_fields=list(CAMPOS_TOTALES), batch_size=1000,
+            )
+    return diferencias
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+
+from .models import Campeonato, Partido, Posicion
+
+
+# Eventos pendientes que se guardan por cliente; si un cliente lento llena su cola
+# se descartan sus eventos más viejos en lugar de acumular memoria
+TAMANO_COLA = 100
+# Segundos sin eventos tras los que se envía un comentario para mantener viva la conexión
+INTERVALO_LATIDO = 15
+
+# Campos del partido que se envían a los clientes
+CAMPOS_PARTIDO = ('id', 'estado', 'resultado_local', 'resultado_visitante', 'equipo_local_id', 'equipo_visitante_id')
+
+
+# Publicación/suscripción en memoria del proceso, por campeonato.
+# Cada cliente conectado tiene una cola asyncio en el event loop que lo atiende;
+# publicar() se puede llamar desde cualquier hilo (p. ej. desde una señal de guardado).
+class CanalEnVivo:
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._suscriptores = defaultdict(set)
+
+    def suscribir(self, campeonato_id):
+        suscripcion = (asyncio.get_running_loop(), asyncio.Queue(maxsize=TAMANO_COLA))
+        with self._candado:
+            self._suscriptores[campeonato_id].add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, campeonato_id, suscripcion):
+        with self._candado:
+            suscriptores = self._suscriptores.get(campeonato_id)
+            if suscriptores is not None:
+                suscriptores.discard(suscripcion)
+                if not suscriptores:
+                    del self._suscriptores[campeonato_id]
+
+    def cantidad_suscriptores(self, campeonato_id):
+        with self._candado:
+            return len(self._suscriptores.get(campeonato_id, ()))
+
+    def publicar(self, campeonato_id, evento):
+        with self._candado:
+            suscriptores = list(self._suscriptores.get(campeonato_id, ()))
+        for suscripcion in suscriptores:
+            loop, cola = suscripcion
+            try:
+                loop.call_soon_threadsafe(_encolar, cola, evento)
+            except RuntimeError:
+                # El event loop del cliente ya se cerró
+                self.desuscribir(campeonato_id, suscripcion)
+
+
+def _encolar(cola, evento):
+    if cola.full():
+        cola.get_nowait()
+    cola.put_nowait(evento)
+
+
+# Canal único del proceso
+canal = CanalEnVivo()
+
+
+# Publica (al confirmar la transacción) el cambio de un partido y, si la tabla cambió,
+# las filas nuevas de los equipos afectados. Se llama desde la señal post_save de Partido.
+def publicar_cambio_partido(anterior, partido, equipos_tabla):
+    actual = {campo: getattr(partido, campo) for campo in Partido.CAMPOS_SEGUIDOS}
+    campeonato_id = partido.campeonato_id
+    if anterior == actual or not canal.cantidad_suscriptores(campeonato_id):
+        return
+
+    def publicar():
+        canal.publicar(campeonato_id, {'tipo': 'partido', **{campo: getattr(partido, campo) for campo in CAMPOS_PARTIDO}})
+        if equipos_tabla:
+            filas = Posicion.objects.filter(campeonato_id=campeonato_id, equipo_id__in=equipos_tabla).values(
+                'equipo_id', 'puntos', 'partidos_jugados', 'partidos_ganados', 'partidos_empatados',
+                'partidos_perdidos', 'goles_favor', 'goles_contra', 'diferencia_goles',
+            )
+            canal.publicar(campeonato_id, {'tipo': 'posiciones', 'filas': [{**fila, 'puntos': float(fila['puntos'])} for fila in filas]})
+
+    transaction.on_commit(publicar)
+
+
+def _formato_sse(evento):
+    return f"event: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+
+
+# Vista asíncrona (Server-Sent Events) con los cambios en vivo de un campeonato.
+# Debe servirse con ASGI: cada cliente conectado solo ocupa una cola en el event loop.
+async def stream_campeonato(request, id):
+    if not await Campeonato.objects.filter(pk=id).aexists():
+        raise Http404("Campeonato no encontrado")
+
+    async def eventos():
+        suscripcion = canal.suscribir(id)
+        cola = suscripcion[1]
+        try:
+            yield f"retry: {INTERVALO_LATIDO * 1000}\n\n"
+            # Estado inicial de los partidos que se están jugando
+            en_curso = Partido.objects.filter(campeonato_id=id, estado='EN_CURSO').values(*CAMPOS_PARTIDO)
+            async for partido in en_curso:
+                yield _formato_sse({'tipo': 'partido', **partido})
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), INTERVALO_LATIDO)
+                except asyncio.TimeoutError:
+                    yield ": latido\n\n"
+                else:
+                    yield _formato_sse(evento)
+        finally:
+            canal.desuscribir(id, suscripcion)
+
+    respuesta = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    # Evita que un proxy (nginx) acumule los eventos antes de enviarlos
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
@@ -0,0 +1,178 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .contadores import verificar_totales
+from .models import (
+    Campeonato, Equipo, EstadisticaJugador, EstadisticaJugadorAjedrez, EstadisticaJugadorBasquet, EstadisticaJugadorEcuaboly,
+    EstadisticaJugadorFutbol, EstadisticaJugadorFutbolin, EstadisticaJugadorPingPong,
+    EstadisticaJugadorTenis, EstadisticaJugadorVideojuegos,
+)
+from .posiciones import reconstruir_posiciones
+from .sanciones import evaluar_suspensiones
+from .trayectorias import actualizar_trayectorias, actualizar_trayectorias_campeonatos
+from .versiones import marcar_cambio_campeonato
+
+
+# Filas que se leen y escriben por consulta al sincronizar
+LOTE_SINCRONIZACION = 1000
+
+# Columnas de la tabla común
+METRICAS = (
+    'jugados', 'ganados', 'empatados', 'perdidos', 'goles', 'tarjetas_amarillas', 'tarjetas_rojas',
+    'canastas', 'rebotes', 'asistencias', 'sets_ganados', 'sets_perdidos',
+)
+
+# Columna de la tabla común que corresponde a cada columna de las tablas por deporte:
+# {modelo: {columna del deporte: columna común}}
+COLUMNAS_COMUNES = {
+    EstadisticaJugadorFutbol: {
+        'partidos_jugados': 'jugados', 'goles': 'goles',
+        'tarjetas_amarillas': 'tarjetas_amarillas', 'tarjetas_rojas': 'tarjetas_rojas',
+    },
+    EstadisticaJugadorBasquet: {
+        'partidos_jugados': 'jugados', 'canastas': 'canastas', 'rebotes': 'rebotes', 'asistencias': 'asistencias',
+    },
+    EstadisticaJugadorAjedrez: {
+        'partidas_jugadas': 'jugados', 'partidas_ganadas': 'ganados',
+        'partidas_empatadas': 'empatados', 'partidas_perdidas': 'perdidos',
+    },
+    EstadisticaJugadorEcuaboly: {
+        'partidos_jugados': 'jugados', 'sets_ganados': 'sets_ganados', 'sets_perdidos': 'sets_perdidos',
+    },
+    EstadisticaJugadorPingPong: {
+        'partidos_jugados': 'jugados', 'partidos_ganados': 'ganados', 'partidos_perdidos': 'perdidos',
+    },
+    EstadisticaJugadorTenis: {
+        'partidos_jugados': 'jugados', 'sets_ganados': 'sets_ganados', 'sets_perdidos': 'sets_perdidos',
+    },
+    EstadisticaJugadorVideojuegos: {
+        'partidas_jugadas': 'jugados', 'partidas_ganadas': 'ganados', 'partidas_perdidas': 'perdidos',
+    },
+    EstadisticaJugadorFutbolin: {
+        'partidos_jugados': 'jugados', 'partidos_ganados': 'ganados', 'partidos_perdidos': 'perdidos', 'goles': 'goles',
+    },
+}
+
+# Campos por los que se pueden agrupar los totales: {agrupación: (id, nombre)}
+AGRUPACIONES = {
+    'jugador': ('jugador_id', 'jugador__usuario__username'),
+    'equipo': ('jugador__equipo_id', 'jugador__equipo__nombre'),
+    'carrera': ('jugador__equipo__carrera_id', 'jugador__equipo__carrera__nombre'),
+    'campeonato': ('campeonato_id', 'campeonato__nombre'),
+}
+
+
+# Copia a la tabla común una fila de estadísticas de un deporte (una sola consulta).
+# Solo se escriben las columnas de ese deporte.
+def copiar_fila(instancia):
+    columnas = COLUMNAS_COMUNES[type(instancia)]
+    EstadisticaJugador.objects.bulk_create(
+        [EstadisticaJugador(
+            campeonato_id=instancia.campeonato_id, jugador_id=instancia.jugador_id,
+            **{comun: getattr(instancia, columna) for columna, comun in columnas.items()},
+        )],
+        update_conflicts=True, unique_fields=['campeonato', 'jugador'], update_fields=list(columnas.values()),
+    )
+
+
+# Copia a la tabla común las filas de un deporte que cumplen "filtros", leyendo y escribiendo
+# por bloques. Devuelve la cantidad de filas copiadas.
+def copiar_filas(modelo, **filtros):
+    columnas = COLUMNAS_COMUNES[modelo]
+    filas = modelo.objects.filter(**filtros).order_by().values('campeonato_id', 'jugador_id', *columnas)
+    copiadas = 0
+    lote = []
+    for fila in filas.iterator(chunk_size=LOTE_SINCRONIZACION):
+        lote.append(EstadisticaJugador(
+            campeonato_id=fila['campeonato_id'], jugador_id=fila['jugador_id'],
+            **{comun: fila[columna] for columna, comun in columnas.items()},
+        ))
+        if len(lote) >= LOTE_SINCRONIZACION:
+            copiadas += _escribir(lote, columnas)
+            lote = []
+    return copiadas + _escribir(lote, columnas)
+
+
+def _escribir(lote, columnas):
+    if lote:
+        EstadisticaJugador.objects.bulk_create(
+            lote, update_conflicts=True, unique_fields=['campeonato', 'jugador'], update_fields=list(columnas.values()),
+        )
+    return len(lote)
+
+
+# Vuelve a armar la tabla común desde las tablas por deporte para los campeonatos indicados
+# (todos por defecto), y las trayectorias de sus jugadores. Se usa después de los cambios
+# masivos que no disparan señales. Devuelve la cantidad de filas escritas.
+def sincronizar_estadisticas(campeonato_ids=None):
+    filtros = {} if campeonato_ids is None else {'campeonato_id__in': list(campeonato_ids)}
+    with transaction.atomic():
+        EstadisticaJugador.objects.filter(**filtros).delete()
+        escritas = sum(copiar_filas(modelo, **filtros) for modelo in COLUMNAS_COMUNES)
+        if campeonato_ids is None:
+            actualizar_trayectorias()
+        else:
+            actualizar_trayectorias_campeonatos(campeonato_ids)
+    return escritas
+
+
+# Lo que mantendrían las señales después de escribir partidos o estadísticas con bulk_create,
+# bulk_update o update(): tabla de posiciones, tabla común, suspensiones, totales de los equipos y
+# versiones de caché de los campeonatos. "tarjetas" ({campeonato_id: jugador_ids}) limita las
+# suspensiones a esos jugadores; None las evalúa para todos los jugadores de los campeonatos.
+def actualizar_tras_carga_masiva(campeonato_ids, tarjetas=None):
+    campeonato_ids = set(campeonato_ids)
+    if not campeonato_ids:
+        return
+    reconstruir_posiciones(Campeonato.objects.filter(pk__in=campeonato_ids).select_related('deporte'))
+    sincronizar_estadisticas(campeonato_ids)
+    for campeonato_id, jugador_ids in (tarjetas.items() if tarjetas is not None else dict.fromkeys(campeonato_ids).items()):
+        evaluar_suspensiones(campeonato_id, jugador_ids)
+    verificar_totales(list(Equipo.objects.filter(campeonato__in=campeonato_ids).values_list('pk', flat=True)), reparar=True)
+    marcar_cambio_campeonato(*campeonato_ids)
+
+
+# Totales de todos los deportes agrupados por jugador, equipo, carrera o campeonato, en una
+# sola consulta sobre la tabla común: [{id, nombre, campeonatos, métrica: suma, ...}, ...].
+# "filtros" se aplica a la tabla común (p. ej. campeonato__deporte__codigo='FUTBOL' o
+# jugador__equipo__carrera=carrera). Ordena por "orden" (una métrica) de mayor a menor.
+def totales_estadisticas(por='jugador', metricas=METRICAS, orden=None, limite=None, **filtros):
+    if por not in AGRUPACIONES:
+        raise ValueError(f"No se puede agrupar por '{por}'.")
+    identificador, nombre = AGRUPACIONES[por]
+    filas = (
+        EstadisticaJugador.objects.filter(**filtros)
+        .values(identificador, nombre)
+        .annotate(campeonatos=Count('campeonato', distinct=True), **{metrica: Sum(metrica) for metrica in metricas})
+        .order_by(f'-{orden}' if orden else nombre, nombre)
+    )
+    if limite:
+        filas = filas[:limite]
+    return [
+        {'id': fila.pop(identificador), 'nombre': fila.pop(nombre), **fila}
+        for fila in filas
+    ]
+
+
+# Todas las estadísticas de un jugador, una fila por campeonato con su deporte (una consulta)
+def estadisticas_jugador(jugador_id):
+    return list(
+        EstadisticaJugador.objects.filter(jugador_id=jugador_id)
+        .values('campeonato_id', 'campeonato__nombre', 'campeonato__deporte__nombre', *METRICAS)
+        .order_by('-campeonato__fecha_inicio', 'campeonato__nombre')
+    )
+
+
+# Totales de varios jugadores a la vez: {jugador_id: {métrica: suma}} (una consulta)
+def totales_jugadores(jugador_ids, metricas=METRICAS):
+    totales = defaultdict(lambda: dict.fromkeys(metricas, 0))
+    filas = (
+        EstadisticaJugador.objects.filter(jugador_id__in=jugador_ids)
+        .values('jugador_id').order_by()
+        .annotate(**{metrica: Sum(metrica) for metrica in metricas})
+    )
+    for fila in filas:
+        totales[fila.pop('jugador_id')].update(fila)
+    return dict(totales)
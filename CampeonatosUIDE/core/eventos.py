@@ -0,0 +1,373 @@
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce, Sign
+
+from .calendarios import marcar_cambio_calendarios
+from .contadores import CONTADORES, aplicar_diferencia
+from .estadisticas import actualizar_tras_carga_masiva, copiar_filas
+from .models import (
+    Campeonato, EventoPartido, Partido,
+    EstadisticaJugadorAjedrez, EstadisticaJugadorBasquet, EstadisticaJugadorEcuaboly, EstadisticaJugadorFutbol,
+    EstadisticaJugadorFutbolin, EstadisticaJugadorPingPong, EstadisticaJugadorTenis, EstadisticaJugadorVideojuegos,
+)
+from .posiciones import actualizar_puntos_equipo
+from .puntuacion import ESTRATEGIAS
+from .sanciones import cambiaron_tarjetas, evaluar_suspensiones
+from .trayectorias import actualizar_trayectorias_jugadores
+from .versiones import marcar_cambio_campeonato
+
+
+logger = logging.getLogger(__name__)
+
+# Eventos que se acumulan por transacción
+LOTE_EVENTOS = 500
+# Filas que se leen por vez al reconstruir desde el registro
+LOTE_LECTURA = 2000
+
+# Datos de cada evento que se necesitan para acumularlo
+CAMPOS_EVENTO = (
+    'partido_id', 'jugador_id', 'tipo', 'valor', 'jugador__equipo_id', 'partido__campeonato_id',
+    'partido__campeonato__deporte__codigo', 'partido__equipo_local_id', 'partido__equipo_visitante_id',
+)
+
+
+# Cómo se acumulan los eventos de un deporte: tabla de estadísticas, columna de partidos
+# jugados, columna de cada tipo de evento y tipos que suman al marcador del partido.
+# En los tipos de "unidades" el valor es solo para el marcador: en su columna cada evento
+# cuenta uno (menos uno si es una corrección).
+class EventosDeporte:
+
+    def __init__(self, modelo, jugados, columnas, marcador=(), unidades=()):
+        self.modelo = modelo
+        self.jugados = jugados
+        self.columnas = columnas
+        self.marcador = set(marcador)
+        self.unidades = set(unidades)
+
+    # Lo que suma un evento a su columna de estadísticas
+    def cantidad(self, tipo, valor):
+        if tipo in self.unidades:
+            return (valor > 0) - (valor < 0)
+        return valor
+
+
+# Reglas por código de deporte (Deporte.codigo)
+EVENTOS = {
+    'FUTBOL': EventosDeporte(
+        EstadisticaJugadorFutbol, 'partidos_jugados',
+        {'GOL': 'goles', 'AMARILLA': 'tarjetas_amarillas', 'ROJA': 'tarjetas_rojas'}, marcador=['GOL'],
+    ),
+    # El valor de una canasta son sus puntos (1, 2 o 3), que van al marcador; en "canastas" cuenta una
+    'BASQUET': EventosDeporte(
+        EstadisticaJugadorBasquet, 'partidos_jugados',
+        {'CANASTA': 'canastas', 'REBOTE': 'rebotes', 'ASISTENCIA': 'asistencias'}, marcador=['CANASTA'], unidades=['CANASTA'],
+    ),
+    'AJEDREZ': EventosDeporte(
+        EstadisticaJugadorAjedrez, 'partidas_jugadas',
+        {'PARTIDA_GANADA': 'partidas_ganadas', 'PARTIDA_EMPATADA': 'partidas_empatadas', 'PARTIDA_PERDIDA': 'partidas_perdidas'},
+        marcador=['PARTIDA_GANADA'],
+    ),
+    'ECUABOLY': EventosDeporte(
+        EstadisticaJugadorEcuaboly, 'partidos_jugados',
+        {'SET_GANADO': 'sets_ganados', 'SET_PERDIDO': 'sets_perdidos'}, marcador=['SET_GANADO'],
+    ),
+    'PING_PONG': EventosDeporte(
+        EstadisticaJugadorPingPong, 'partidos_jugados',
+        {'PARTIDO_GANADO': 'partidos_ganados', 'PARTIDO_PERDIDO': 'partidos_perdidos'}, marcador=['PARTIDO_GANADO'],
+    ),
+    'TENIS': EventosDeporte(
+        EstadisticaJugadorTenis, 'partidos_jugados',
+        {'SET_GANADO': 'sets_ganados', 'SET_PERDIDO': 'sets_perdidos'}, marcador=['SET_GANADO'],
+    ),
+    'VIDEOJUEGOS': EventosDeporte(
+        EstadisticaJugadorVideojuegos, 'partidas_jugadas',
+        {'PARTIDA_GANADA': 'partidas_ganadas', 'PARTIDA_PERDIDA': 'partidas_perdidas'}, marcador=['PARTIDA_GANADA'],
+    ),
+    'FUTBOLIN': EventosDeporte(
+        EstadisticaJugadorFutbolin, 'partidos_jugados',
+        {'GOL': 'goles', 'PARTIDO_GANADO': 'partidos_ganados', 'PARTIDO_PERDIDO': 'partidos_perdidos'}, marcador=['GOL'],
+    ),
+}
+
+
+# Tipos de evento válidos para un deporte: {tipo: columna}
+def columnas_deporte(deporte):
+    reglas = EVENTOS.get(deporte.codigo)
+    return reglas.columnas if reglas else {}
+
+
+# Una corrección (valor negativo) no puede dejar en negativo lo que suman los eventos de ese
+# jugador y tipo en el partido, ni su columna ni su marcador. Con esta regla la acumulación y la
+# reconstrucción desde el registro dan lo mismo sin recortar nada. Con "bloquear" se bloquea el
+# partido hasta el final de la transacción, así dos correcciones simultáneas no pasan las dos.
+def validar_correccion(evento, bloquear=False):
+    if evento.valor >= 0:
+        return
+    partidos = Partido.objects.filter(pk=evento.partido_id)
+    if bloquear:
+        partidos = partidos.select_for_update(of=('self',))
+    reglas = EVENTOS.get(partidos.values_list('campeonato__deporte__codigo', flat=True).first())
+    if reglas is None or evento.tipo not in reglas.columnas:
+        return
+    registrados = EventoPartido.objects.filter(partido_id=evento.partido_id, jugador_id=evento.jugador_id, tipo=evento.tipo).aggregate(
+        suma=Coalesce(Sum('valor'), 0), cantidad=Coalesce(Sum(Sign('valor')), 0),
+    )
+    if registrados['suma'] + evento.valor < 0 or (evento.tipo in reglas.unidades and registrados['cantidad'] < 1):
+        raise ValidationError(
+            f"La corrección deja en negativo los eventos {evento.get_tipo_display()} del jugador en este partido "
+            f"(suman {registrados['suma']})."
+        )
+
+
+# Acumulado de un conjunto de eventos, listo para escribir en la base
+class Acumulado:
+
+    def __init__(self):
+        # {(modelo, campeonato_id, jugador_id, equipo_id): {columna: suma}}
+        self.estadisticas = defaultdict(lambda: defaultdict(int))
+        # {partido_id: [local, visitante]}
+        self.marcadores = defaultdict(lambda: [0, 0])
+        # {(partido_id, jugador_id): (clave de estadisticas, columna de partidos jugados)}
+        self.participaciones = {}
+        self.campeonatos = set()
+
+    def sumar(self, evento):
+        reglas = EVENTOS.get(evento['partido__campeonato__deporte__codigo'])
+        columna = reglas.columnas.get(evento['tipo']) if reglas else None
+        if columna is None:
+            return
+        clave = (reglas.modelo, evento['partido__campeonato_id'], evento['jugador_id'], evento['jugador__equipo_id'])
+        self.estadisticas[clave][columna] += reglas.cantidad(evento['tipo'], evento['valor'])
+        self.participaciones[(evento['partido_id'], evento['jugador_id'])] = (clave, reglas.jugados)
+        self.campeonatos.add(evento['partido__campeonato_id'])
+
+        if evento['tipo'] in reglas.marcador:
+            if evento['jugador__equipo_id'] == evento['partido__equipo_local_id']:
+                self.marcadores[evento['partido_id']][0] += evento['valor']
+            elif evento['jugador__equipo_id'] == evento['partido__equipo_visitante_id']:
+                self.marcadores[evento['partido_id']][1] += evento['valor']
+
+    # Suma un partido jugado por cada jugador que aparece por primera vez en un partido
+    def contar_participaciones(self, ya_contadas=()):
+        for participacion, (clave, columna) in self.participaciones.items():
+            if participacion not in ya_contadas:
+                self.estadisticas[clave][columna] += 1
+
+
+# Acumula los eventos pendientes (de un partido o de todos) en las estadísticas de los
+# jugadores y en el marcador. Cada lote se procesa en una transacción que bloquea sus
+# eventos, así dos procesos no acumulan el mismo evento. Devuelve los eventos procesados.
+def acumular_eventos(partido_id=None):
+    total = 0
+    while True:
+        procesados = _acumular_lote(partido_id)
+        total += procesados
+        if procesados < LOTE_EVENTOS:
+            return total
+
+
+def _acumular_lote(partido_id):
+    with transaction.atomic():
+        pendientes = EventoPartido.objects.select_for_update(skip_locked=True, of=('self',)).filter(aplicado=False)
+        if partido_id is not None:
+            pendientes = pendientes.filter(partido_id=partido_id)
+        eventos = list(pendientes.order_by('id').values('id', *CAMPOS_EVENTO)[:LOTE_EVENTOS])
+        if not eventos:
+            return 0
+
+        acumulado = Acumulado()
+        for evento in eventos:
+            acumulado.sumar(evento)
+        # Partidos jugados: solo si el jugador no tenía eventos ya acumulados en ese partido
+        ya_contadas = set(
+            EventoPartido.objects.filter(
+                aplicado=True,
+                partido_id__in={partido for partido, _ in acumulado.participaciones},
+                jugador_id__in={jugador for _, jugador in acumulado.participaciones},
+            ).values_list('partido_id', 'jugador_id').distinct()
+        )
+        acumulado.contar_participaciones(ya_contadas)
+
+        _sumar_estadisticas(acumulado.estadisticas)
+        _sumar_marcadores(acumulado.marcadores)
+        EventoPartido.objects.filter(pk__in=[evento['id'] for evento in eventos]).update(aplicado=True)
+        marcar_cambio_campeonato(*acumulado.campeonatos)
+    return len(eventos)
+
+
+# Cola de acumulación del proceso: la señal de EventoPartido solo anota el partido al confirmar
+# la transacción y un hilo acumula después sus eventos, fuera de la petición, juntando los
+# partidos que se anotaron mientras tanto. Los eventos que el proceso no llegue a acumular
+# (p. ej. si se reinicia) siguen con aplicado=False y los toma la próxima acumulación o
+# reconstruir_estadisticas --pendientes. Con ACUMULAR_EVENTOS_EN_SEGUNDO_PLANO = False se
+# acumulan al confirmar, en el mismo hilo.
+class ColaAcumulacion:
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._partidos = set()
+        self._hilo = None
+
+    def agregar(self, partido_id):
+        if not getattr(settings, 'ACUMULAR_EVENTOS_EN_SEGUNDO_PLANO', True):
+            acumular_eventos(partido_id)
+            return
+        with self._candado:
+            self._partidos.add(partido_id)
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._procesar, name='acumulacion-eventos', daemon=True)
+                self._hilo.start()
+
+    # Espera a que el hilo termine con lo anotado (pruebas y apagado ordenado)
+    def esperar(self, segundos=None):
+        with self._candado:
+            hilo = self._hilo
+        if hilo is not None:
+            hilo.join(segundos)
+
+    def _procesar(self):
+        try:
+            while True:
+                with self._candado:
+                    if not self._partidos:
+                        self._hilo = None
+                        return
+                    partidos, self._partidos = self._partidos, set()
+                for partido_id in partidos:
+                    try:
+                        acumular_eventos(partido_id)
+                    except Exception:
+                        logger.exception("No se pudieron acumular los eventos del partido %s", partido_id)
+        finally:
+            # Las conexiones de este hilo no las cierra el ciclo de las peticiones
+            connections.close_all()
+
+
+cola_acumulacion = ColaAcumulacion()
+
+
+# Suma las diferencias a las filas de estadísticas con F() (creando las que falten) y mantiene
+# lo que las señales de esas filas mantendrían: totales del equipo y puntos de la tabla
+def _sumar_estadisticas(estadisticas):
+    por_modelo = defaultdict(list)
+    for clave in estadisticas:
+        por_modelo[clave[0]].append(clave)
+
+    equipos_puntos = set()
+    tarjetas = defaultdict(set)
+    for modelo, claves in por_modelo.items():
+        modelo.objects.bulk_create(
+            [modelo(campeonato_id=campeonato_id, jugador_id=jugador_id) for _, campeonato_id, jugador_id, _ in claves],
+            ignore_conflicts=True,
+        )
+        puntua = any(getattr(estrategia, 'modelo', None) is modelo for estrategia in ESTRATEGIAS.values())
+        # Valores actuales de las filas, bloqueadas hasta el final de la transacción
+        columnas = {columna for clave in claves for columna in estadisticas[clave]}
+        actuales = {
+            (fila.pop('campeonato_id'), fila.pop('jugador_id')): fila
+            for fila in modelo.objects.select_for_update().filter(
+                campeonato_id__in={campeonato_id for _, campeonato_id, _, _ in claves},
+                jugador_id__in={jugador_id for _, _, jugador_id, _ in claves},
+            ).values('campeonato_id', 'jugador_id', *columnas)
+        }
+        for clave in claves:
+            _, campeonato_id, jugador_id, equipo_id = clave
+            actual = actuales[(campeonato_id, jugador_id)]
+            # validar_correccion no deja que los eventos resten más de lo que sumaron, pero la fila
+            # se pudo editar a mano: ninguna columna queda en negativo y a los totales del equipo
+            # se les suma exactamente lo que cambió la fila
+            diferencias = {
+                columna: max(actual[columna] + valor, 0) - actual[columna]
+                for columna, valor in estadisticas[clave].items()
+            }
+            diferencias = {columna: valor for columna, valor in diferencias.items() if valor}
+            if not diferencias:
+                continue
+            modelo.objects.filter(campeonato_id=campeonato_id, jugador_id=jugador_id).update(
+                **{columna: F(columna) + valor for columna, valor in diferencias.items()}
+            )
+            if modelo in CONTADORES:
+                aplicar_diferencia(modelo, None, {
+                    'jugador__equipo_id': equipo_id,
+                    **{columna: diferencias.get(columna, 0) for columna in CONTADORES[modelo]},
+                })
+            if puntua:
+                equipos_puntos.add(equipo_id)
+            if cambiaron_tarjetas(None, diferencias):
+                tarjetas[campeonato_id].add(jugador_id)
+        copiar_filas(
+            modelo,
+            campeonato_id__in={campeonato_id for _, campeonato_id, _, _ in claves},
+            jugador_id__in={jugador_id for _, _, jugador_id, _ in claves},
+        )
+        actualizar_trayectorias_jugadores({jugador_id for _, _, jugador_id, _ in claves})
+
+    for equipo_id in equipos_puntos:
+        actualizar_puntos_equipo(equipo_id)
+    for campeonato_id, jugador_ids in tarjetas.items():
+        evaluar_suspensiones(campeonato_id, jugador_ids)
+
+
+# Suma los tantos al marcador; se guarda el partido para que sus señales actualicen
+# la tabla (si ya está finalizado) y avisen a los clientes en vivo
+def _sumar_marcadores(marcadores):
+    for partido in Partido.objects.select_for_update().filter(pk__in=list(marcadores)):
+        local, visitante = marcadores[partido.pk]
+        if not local and not visitante:
+            continue
+        partido.resultado_local = max((partido.resultado_local or 0) + local, 0)
+        partido.resultado_visitante = max((partido.resultado_visitante or 0) + visitante, 0)
+        partido.save(update_fields=['resultado_local', 'resultado_visitante'])
+
+
+# Recalcula desde el registro de eventos (en una sola lectura por lotes) las estadísticas de
+# los jugadores y el marcador de los partidos de los campeonatos indicados (por defecto, todos
+# los que tienen eventos). En las filas de los jugadores con eventos las columnas que llenan los
+# eventos pasan a ser exactamente su suma; las filas de los jugadores sin eventos (cargadas a mano
+# o importadas) no se tocan. Devuelve (eventos leídos, campeonatos reconstruidos).
+def reconstruir_desde_eventos(campeonato_ids=None):
+    eventos = EventoPartido.objects.order_by()
+    if campeonato_ids is not None:
+        eventos = eventos.filter(partido__campeonato_id__in=campeonato_ids)
+
+    acumulado = Acumulado()
+    leidos = 0
+    for evento in eventos.values(*CAMPOS_EVENTO).iterator(chunk_size=LOTE_LECTURA):
+        acumulado.sumar(evento)
+        leidos += 1
+    acumulado.contar_participaciones()
+
+    campeonatos = list(Campeonato.objects.filter(pk__in=acumulado.campeonatos | set(campeonato_ids or ())).select_related('deporte'))
+    with transaction.atomic():
+        eventos.filter(aplicado=False).update(aplicado=True)
+
+        for campeonato in campeonatos:
+            reglas = EVENTOS.get(campeonato.deporte.codigo)
+            if reglas is None:
+                continue
+            # Las columnas que no aparecen en las sumas quedan en 0 (valor por defecto del modelo)
+            columnas = [*reglas.columnas.values(), reglas.jugados]
+            filas = [
+                reglas.modelo(campeonato_id=campeonato_id, jugador_id=jugador_id, **sumas)
+                for (modelo, campeonato_id, jugador_id, _), sumas in acumulado.estadisticas.items()
+                if modelo is reglas.modelo and campeonato_id == campeonato.pk
+            ]
+            reglas.modelo.objects.bulk_create(
+                filas, update_conflicts=True, unique_fields=['campeonato', 'jugador'], update_fields=columnas, batch_size=LOTE_LECTURA,
+            )
+
+        partidos = list(Partido.objects.filter(pk__in=list(acumulado.marcadores)))
+        for partido in partidos:
+            partido.resultado_local, partido.resultado_visitante = acumulado.marcadores[partido.pk]
+        Partido.objects.bulk_update(partidos, ['resultado_local', 'resultado_visitante'], batch_size=LOTE_LECTURA)
+
+        # bulk_create/bulk_update no disparan señales: tabla, totales y cachés se actualizan aquí
+        actualizar_tras_carga_masiva(campeonato.pk for campeonato in campeonatos)
+        marcar_cambio_calendarios(*(partido for partido in partidos if partido.estado == 'FINALIZADO'))
+    return leidos, len(campeonatos)
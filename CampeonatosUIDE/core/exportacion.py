@@ -0,0 +1,169 @@
+import csv
+import tempfile
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from .importacion import INICIO_FORMULA, columnas_estadisticas
+from .models import ESTADISTICAS_POR_DEPORTE, Equipo, Jugador, Partido, Posicion
+
+
+# Filas que se leen de la base por consulta al recorrer cada tabla
+TAMANO_BLOQUE = 2000
+# Bytes que se guardan en memoria al armar un XLSX antes de pasar a un archivo temporal
+MEMORIA_XLSX = 5 * 1024 * 1024
+
+
+class ErrorExportacion(Exception):
+    pass
+
+
+# Valor de una celda: el texto que empieza como una fórmula lleva un apóstrofo adelante para
+# que la hoja de cálculo lo muestre como texto (los números negativos quedan como están)
+def _celda(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+# Cada tabla se genera fila por fila: la primera fila son los encabezados y el resto se lee
+# con .iterator() (sin guardar el resultado en el queryset), así la memoria no depende del
+# tamaño del campeonato. select_related trae los datos relacionados en la misma consulta.
+
+def _filas_posiciones(campeonato):
+    yield [
+        'posicion', 'equipo_id', 'equipo', 'carrera', 'puntos', 'partidos_jugados', 'partidos_ganados',
+        'partidos_empatados', 'partidos_perdidos', 'goles_favor', 'goles_contra', 'diferencia_goles',
+    ]
+    posiciones = Posicion.objects.filter(campeonato=campeonato).select_related('equipo__carrera')
+    for numero, fila in enumerate(posiciones.iterator(chunk_size=TAMANO_BLOQUE), start=1):
+        yield [
+            numero, fila.equipo_id, fila.equipo.nombre, fila.equipo.carrera.nombre, fila.puntos,
+            fila.partidos_jugados, fila.partidos_ganados, fila.partidos_empatados, fila.partidos_perdidos,
+            fila.goles_favor, fila.goles_contra, fila.diferencia_goles,
+        ]
+
+
+def _filas_equipos(campeonato):
+    yield ['equipo_id', 'equipo', 'carrera', 'aprobado', 'delegado']
+    equipos = Equipo.objects.filter(campeonato=campeonato).select_related('carrera', 'delegado').order_by('nombre', 'pk')
+    for equipo in equipos.iterator(chunk_size=TAMANO_BLOQUE):
+        yield [
+            equipo.pk, equipo.nombre, equipo.carrera.nombre, 'si' if equipo.aprobado else 'no',
+            equipo.delegado.username if equipo.delegado else '',
+        ]
+
+
+def _filas_jugadores(campeonato):
+    yield ['jugador_id', 'jugador', 'nombres', 'apellidos', 'equipo_id', 'equipo', 'numero_camiseta', 'edad', 'suspendido']
+    jugadores = (
+        Jugador.objects.filter(equipo__campeonato=campeonato)
+        .select_related('usuario', 'equipo')
+        .con_suspendido()
+        .order_by('equipo__nombre', 'equipo_id', 'numero_camiseta')
+    )
+    for jugador in jugadores.iterator(chunk_size=TAMANO_BLOQUE):
+        yield [
+            jugador.pk, jugador.usuario.username, jugador.usuario.first_name, jugador.usuario.last_name,
+            jugador.equipo_id, jugador.equipo.nombre, jugador.numero_camiseta, jugador.edad,
+            'si' if jugador.suspendido else 'no',
+        ]
+
+
+def _filas_partidos(campeonato):
+    yield [
+        'partido_id', 'fecha', 'hora', 'lugar', 'local', 'visitante',
+        'resultado_local', 'resultado_visitante', 'estado', 'arbitro',
+    ]
+    partidos = (
+        Partido.objects.filter(campeonato=campeonato)
+        .select_related('equipo_local', 'equipo_visitante', 'arbitro')
+        .order_by('fecha', 'hora', 'pk')
+    )
+    for partido in partidos.iterator(chunk_size=TAMANO_BLOQUE):
+        yield [
+            partido.pk, partido.fecha, partido.hora, partido.lugar, partido.equipo_local.nombre,
+            partido.equipo_visitante.nombre, partido.resultado_local, partido.resultado_visitante,
+            partido.estado, str(partido.arbitro) if partido.arbitro else '',
+        ]
+
+
+# Estadísticas de los jugadores en la tabla del deporte del campeonato. Las columnas
+# campeonato y jugador son las que espera importar_estadisticas, así el archivo se puede
+# corregir y volver a importar.
+def _filas_estadisticas(campeonato):
+    modelo = ESTADISTICAS_POR_DEPORTE.get(campeonato.deporte.codigo)
+    columnas = columnas_estadisticas(modelo) if modelo is not None else []
+    yield ['campeonato', 'jugador', 'equipo', *columnas]
+    if modelo is None:
+        return
+    filas = (
+        modelo.objects.filter(campeonato=campeonato)
+        .select_related('jugador__usuario', 'jugador__equipo')
+        .order_by('jugador__equipo__nombre', 'jugador__usuario__username')
+    )
+    for fila in filas.iterator(chunk_size=TAMANO_BLOQUE):
+        yield [
+            campeonato.pk, fila.jugador.usuario.username, fila.jugador.equipo.nombre,
+            *(getattr(fila, columna) for columna in columnas),
+        ]
+
+
+# Tablas que se pueden exportar: {nombre: función que genera sus filas}
+EXPORTACIONES = {
+    'posiciones': _filas_posiciones,
+    'equipos': _filas_equipos,
+    'jugadores': _filas_jugadores,
+    'partidos': _filas_partidos,
+    'estadisticas': _filas_estadisticas,
+}
+
+
+# Archivo de solo escritura para csv.writer: devuelve la línea en lugar de guardarla
+class _Linea:
+
+    def write(self, texto):
+        return texto
+
+
+# Genera el CSV de una tabla línea por línea (con BOM para que Excel lea bien los acentos)
+def lineas_csv(campeonato, tabla):
+    escritor = csv.writer(_Linea())
+    yield '\ufeff'
+    for fila in EXPORTACIONES[tabla](campeonato):
+        yield escritor.writerow([_celda(valor) for valor in fila])
+
+
+# Versión asíncrona de lineas_csv para ASGI. Con un iterador síncrono, StreamingHttpResponse lo
+# leería entero (sync_to_async(list)) antes de enviar el primer byte; así cada bloque de líneas
+# se lee de la base en el hilo de Django y se envía antes de leer el siguiente.
+async def lineas_csv_async(campeonato, tabla):
+    lineas = lineas_csv(campeonato, tabla)
+    leer_bloque = sync_to_async(lambda: list(islice(lineas, TAMANO_BLOQUE)), thread_sensitive=True)
+    while bloque := await leer_bloque():
+        yield ''.join(bloque)
+
+
+# Escribe en "destino" (archivo binario) un libro XLSX con una hoja por tabla.
+# openpyxl en modo de solo escritura va pasando las filas a disco en lugar de guardarlas en memoria.
+def escribir_xlsx(campeonato, destino, tablas=None):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ErrorExportacion("Para exportar a XLSX hay que instalar openpyxl.")
+    libro = Workbook(write_only=True)
+    for tabla in tablas or EXPORTACIONES:
+        hoja = libro.create_sheet(title=tabla)
+        for fila in EXPORTACIONES[tabla](campeonato):
+            hoja.append([_celda(valor) for valor in fila])
+    libro.save(destino)
+
+
+# XLSX completo de un campeonato en un archivo temporal (en memoria si es chico), listo para leer
+def archivo_xlsx(campeonato, tablas=None):
+    archivo = tempfile.SpooledTemporaryFile(max_size=MEMORIA_XLSX)
+    escribir_xlsx(campeonato, archivo, tablas)
+    archivo.seek(0)
+    return archivo
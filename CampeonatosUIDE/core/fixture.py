@@ -0,0 +1,160 @@
+import datetime
+from itertools import zip_longest
+
+from django.db import IntegrityError, transaction
+
+from .jornadas import reconstruir_jornadas
+from .models import Campeonato, Equipo, FranjaEquipo, Partido, clave_lugar
+from .versiones import marcar_cambio_campeonato
+
+
+# Código de Campeonato.DIAS_SEMANA de cada día (posición = date.weekday(), 0 = lunes)
+DIAS_POR_NUMERO = [codigo for codigo, _ in Campeonato.DIAS_SEMANA]
+
+
+class ErrorFixture(Exception):
+    pass
+
+
+# Rondas de un todos contra todos por el método del círculo: [[(local, visitante), ...], ...].
+# Con cantidad impar de equipos, en cada ronda uno descansa (el lugar fijo queda vacío, así
+# todos son locales la misma cantidad de veces). Con ida y vuelta se repiten las rondas con la
+# localía invertida. La localía se alterna para que nadie sea local siempre.
+def rondas_todos_contra_todos(equipos, ida_y_vuelta=False):
+    lista = list(equipos)
+    if len(lista) % 2:
+        lista.insert(0, None)
+    cantidad = len(lista)
+    rondas = []
+    for numero in range(cantidad - 1):
+        ronda = []
+        for posicion in range(cantidad // 2):
+            local, visitante = lista[posicion], lista[cantidad - 1 - posicion]
+            if (posicion == 0 and numero % 2) or (posicion > 0 and posicion % 2):
+                local, visitante = visitante, local
+            if local is not None and visitante is not None:
+                ronda.append((local, visitante))
+        rondas.append(ronda)
+        lista.insert(1, lista.pop())
+    if ida_y_vuelta:
+        rondas += [[(visitante, local) for local, visitante in ronda] for ronda in rondas]
+    return rondas
+
+
+# Fechas entre "desde" (o el inicio del campeonato) y el fin del campeonato que caen en sus días de partido
+def fechas_disponibles(campeonato, desde=None):
+    fecha = max(desde or campeonato.fecha_inicio, campeonato.fecha_inicio)
+    fechas = []
+    while fecha <= campeonato.fecha_fin:
+        if DIAS_POR_NUMERO[fecha.weekday()] in campeonato.dias_partido:
+            fechas.append(fecha)
+        fecha += datetime.timedelta(days=1)
+    return fechas
+
+
+# Ubica las rondas en las fechas, horas y lugares disponibles y devuelve los partidos sin guardar.
+# Cada ronda empieza en una fecha nueva; los partidos que no entran en esa fecha pasan a la siguiente.
+# Los choques se revisan en memoria con las mismas reglas de Partido.clean (un equipo o un lugar
+# no pueden tener dos partidos en la misma fecha y hora) y, además, un equipo juega una vez por día.
+# Los partidos que ya tiene el campeonato se leen en una sola consulta.
+def ubicar_partidos(campeonato, rondas, lugares, horas, desde=None):
+    lugares = list(dict.fromkeys(lugar.strip() for lugar in lugares if lugar.strip()))
+    horas = sorted(set(horas))
+    if not lugares or not horas:
+        raise ErrorFixture("Hay que indicar al menos un lugar y una hora.")
+    fechas = fechas_disponibles(campeonato, desde)
+    if not fechas:
+        raise ErrorFixture("El campeonato no tiene fechas disponibles en sus días de partido.")
+
+    equipo_hora, lugar_hora, equipo_dia = set(), set(), set()
+    existentes = Partido.objects.filter(campeonato=campeonato, fecha__gte=fechas[0], fecha__lte=fechas[-1]).values_list(
+        'fecha', 'hora', 'lugar_clave', 'equipo_local_id', 'equipo_visitante_id',
+    )
+    for fecha, hora, lugar_clave, local_id, visitante_id in existentes:
+        lugar_hora.add((lugar_clave, fecha, hora))
+        for equipo_id in (local_id, visitante_id):
+            equipo_hora.add((equipo_id, fecha, hora))
+            equipo_dia.add((equipo_id, fecha))
+
+    partidos = []
+    indice = 0
+    for numero, ronda in enumerate(rondas, start=1):
+        pendientes = list(ronda)
+        while pendientes:
+            if indice >= len(fechas):
+                raise ErrorFixture(
+                    f"No alcanzan las fechas: la ronda {numero} de {len(rondas)} no entra antes del "
+                    f"{campeonato.fecha_fin:%d/%m/%Y}. Agregue lugares, horas o días de partido."
+                )
+            fecha = fechas[indice]
+            sin_ubicar = []
+            for local, visitante in pendientes:
+                if (local.pk, fecha) in equipo_dia or (visitante.pk, fecha) in equipo_dia:
+                    sin_ubicar.append((local, visitante))
+                    continue
+                espacio = next((
+                    (hora, lugar) for hora in horas for lugar in lugares
+                    if (clave_lugar(lugar), fecha, hora) not in lugar_hora
+                    and (local.pk, fecha, hora) not in equipo_hora
+                    and (visitante.pk, fecha, hora) not in equipo_hora
+                ), None)
+                if espacio is None:
+                    sin_ubicar.append((local, visitante))
+                    continue
+                hora, lugar = espacio
+                lugar_hora.add((clave_lugar(lugar), fecha, hora))
+                for equipo in (local, visitante):
+                    equipo_hora.add((equipo.pk, fecha, hora))
+                    equipo_dia.add((equipo.pk, fecha))
+                partidos.append(Partido(
+                    campeonato=campeonato, equipo_local=local, equipo_visitante=visitante,
+                    fecha=fecha, hora=hora, lugar=lugar, lugar_clave=clave_lugar(lugar),
+                ))
+            pendientes = sin_ubicar
+            indice += 1
+    return partidos
+
+
+# Arma el fixture de todos contra todos de un campeonato con sus equipos aprobados (o los
+# indicados), sin guardarlo: devuelve la lista de partidos para revisar o pasar a guardar_fixture.
+# Con "por_grupos" cada grupo (Equipo.grupo) juega su propio todos contra todos y la fecha N de
+# todos los grupos se juega el mismo día.
+def generar_fixture(campeonato, lugares, horas, ida_y_vuelta=False, desde=None, equipos=None, por_grupos=False):
+    if equipos is None:
+        equipos = Equipo.objects.filter(campeonato=campeonato, aprobado=True).order_by('nombre', 'pk')
+    equipos = list(equipos)
+    if not por_grupos:
+        if len(equipos) < 2:
+            raise ErrorFixture("El campeonato necesita al menos dos equipos aprobados.")
+        return ubicar_partidos(campeonato, rondas_todos_contra_todos(equipos, ida_y_vuelta), lugares, horas, desde)
+
+    grupos = {}
+    for equipo in equipos:
+        if equipo.grupo:
+            grupos.setdefault(equipo.grupo, []).append(equipo)
+    if not grupos:
+        raise ErrorFixture("Los equipos del campeonato no tienen grupo asignado.")
+    por_grupo = [rondas_todos_contra_todos(grupos[grupo], ida_y_vuelta) for grupo in sorted(grupos)]
+    rondas = [[cruce for ronda in fecha if ronda for cruce in ronda] for fecha in zip_longest(*por_grupo)]
+    return ubicar_partidos(campeonato, rondas, lugares, horas, desde)
+
+
+# Guarda los partidos generados con un solo INSERT (y otro para los horarios de los equipos).
+# Como bulk_create no dispara señales, se rehacen las jornadas desde la primera fecha nueva (una
+# jornada cerrada deja de estarlo si recibe un partido programado) y se marca el cambio para
+# invalidar la caché y los calendarios. Si mientras tanto alguien ocupó uno de los horarios, las restricciones
+# únicas rechazan todo el lote.
+def guardar_fixture(campeonato, partidos):
+    from .calendarios import marcar_cambio_calendarios
+    if not partidos:
+        return []
+    try:
+        with transaction.atomic():
+            partidos = Partido.objects.bulk_create(partidos)
+            FranjaEquipo.objects.bulk_create([franja for partido in partidos for franja in partido.franjas()])
+            reconstruir_jornadas([campeonato], desde=min(partido.fecha for partido in partidos))
+            marcar_cambio_campeonato(campeonato.pk)
+            marcar_cambio_calendarios(*partidos)
+    except IntegrityError:
+        raise ErrorFixture("Otro partido ocupó uno de los horarios mientras se armaba el fixture; vuelva a generarlo.")
+    return partidos
@@ -1,6 +1,6 @@
 from django import forms
 from django.utils.safestring import mark_safe
-from .models import Equipo, Pago
+from .models import Campeonato, Equipo, Pago
 
 class EquipoForm(forms.ModelForm):
     class Meta:
@@ -41,4 +41,74 @@ class PagoForm(forms.ModelForm):
                     f"<strong>Banco:</strong> {self.instance.codigo_qr.banco}<br>"
                     f"<img src='{self.instance.codigo_qr.imagen_qr.url}' width='200' style='border:1px solid #ccc;'/>"
                 )
-            )
\ No newline at end of file
+            )
+
+
+# Formulario del admin para importar estadísticas de jugadores desde CSV o XLSX
+class ImportarEstadisticasForm(forms.Form):
+    archivo = forms.FileField(help_text="Archivo .csv o .xlsx con las columnas campeonato, jugador y las estadísticas del deporte.")
+    campeonato = forms.ModelChoiceField(
+        queryset=Campeonato.objects.select_related('deporte').order_by('nombre'),
+        required=False,
+        help_text="Opcional: si se elige, todas las filas se asignan a este campeonato.",
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("El archivo debe ser .csv o .xlsx.")
+        return archivo
+
+
+# Formulario del admin para generar el fixture de todos contra todos de un campeonato
+class GenerarFixtureForm(forms.Form):
+    lugares = forms.CharField(widget=forms.Textarea(attrs={'rows': 4}), help_text="Un lugar por línea.")
+    horas = forms.CharField(help_text="Horas de inicio separadas por comas, por ejemplo: 08:00, 10:00, 12:00.")
+    ida_y_vuelta = forms.BooleanField(required=False, label="Ida y vuelta")
+    por_grupos = forms.BooleanField(required=False, label="Por grupos", help_text="Un todos contra todos dentro de cada grupo.")
+    desde = forms.DateField(required=False, help_text="Opcional: primera fecha a usar (por defecto, el inicio del campeonato).")
+
+    def clean_lugares(self):
+        lugares = [lugar.strip() for lugar in self.cleaned_data['lugares'].splitlines() if lugar.strip()]
+        if not lugares:
+            raise forms.ValidationError("Indique al menos un lugar.")
+        return lugares
+
+    def clean_horas(self):
+        campo = forms.TimeField()
+        horas = [campo.clean(hora.strip()) for hora in self.cleaned_data['horas'].split(',') if hora.strip()]
+        if not horas:
+            raise forms.ValidationError("Indique al menos una hora.")
+        return horas
+
+
+# Formulario del admin para armar la llave de eliminación directa de un campeonato
+class GenerarLlaveForm(GenerarFixtureForm):
+    SIEMBRAS = [
+        ('posiciones', 'Equipos aprobados, en el orden de la tabla de posiciones'),
+        ('grupos', 'Clasificados de la fase de grupos'),
+    ]
+
+    ida_y_vuelta = None
+    por_grupos = None
+    siembra = forms.ChoiceField(choices=SIEMBRAS)
+    clasificados = forms.IntegerField(min_value=1, initial=2, help_text="Equipos que pasan de cada grupo (solo con fase de grupos).")
+
+
+# Formulario del admin para sortear los grupos de un campeonato
+class SortearGruposForm(forms.Form):
+    cantidad = forms.IntegerField(min_value=1, max_value=26, label="Cantidad de grupos")
+    bombos = forms.CharField(
+        required=False, widget=forms.Textarea(attrs={'rows': 5}),
+        help_text="Opcional: un bombo por línea, con los nombres de los equipos separados por comas. "
+                  "Los equipos aprobados que no estén en ningún bombo forman el último.",
+    )
+    separar_carreras = forms.BooleanField(required=False, initial=True, label="Separar carreras")
+    tamanio_maximo = forms.IntegerField(required=False, min_value=1, label="Tamaño máximo de grupo")
+    semilla = forms.IntegerField(required=False, help_text="El mismo número repite el mismo sorteo.")
+
+    def clean_bombos(self):
+        return [
+            [nombre for nombre in linea.split(',') if nombre.strip()]
+            for linea in self.cleaned_data['bombos'].splitlines() if linea.strip()
+        ]
@@ -0,0 +1,177 @@
+import math
+import random
+import string
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .models import Equipo, Posicion
+from .versiones import marcar_cambio_campeonato
+
+
+# Nodos que recorre como máximo la búsqueda antes de aflojar la separación por carrera
+LIMITE_BUSQUEDA = 200_000
+
+
+class ErrorSorteo(Exception):
+    pass
+
+
+# Nombres de los grupos: A, B, C, ...
+def nombres_grupos(cantidad):
+    if not 1 <= cantidad <= len(string.ascii_uppercase):
+        raise ErrorSorteo(f"La cantidad de grupos debe estar entre 1 y {len(string.ascii_uppercase)}.")
+    return list(string.ascii_uppercase[:cantidad])
+
+
+# Arma los bombos a partir de nombres de equipos: "bombos" es una lista de listas de nombres.
+# Los equipos aprobados que no aparecen en ningún bombo van a un último bombo.
+def bombos_por_nombre(campeonato, bombos):
+    equipos = {equipo.nombre.casefold(): equipo for equipo in Equipo.objects.filter(campeonato=campeonato, aprobado=True).select_related('carrera')}
+    resultado, usados = [], set()
+    for numero, nombres in enumerate(bombos, start=1):
+        bombo = []
+        for nombre in nombres:
+            equipo = equipos.get(nombre.strip().casefold())
+            if equipo is None:
+                raise ErrorSorteo(f"El equipo '{nombre.strip()}' del bombo {numero} no existe o no está aprobado.")
+            if equipo.pk in usados:
+                raise ErrorSorteo(f"El equipo '{equipo}' está en más de un bombo.")
+            usados.add(equipo.pk)
+            bombo.append(equipo)
+        if bombo:
+            resultado.append(bombo)
+    restantes = [equipo for equipo in equipos.values() if equipo.pk not in usados]
+    if restantes:
+        resultado.append(sorted(restantes, key=lambda equipo: equipo.nombre))
+    return resultado
+
+
+# Reparte los equipos de los bombos en "cantidad" grupos por búsqueda con vuelta atrás:
+# - los grupos quedan del mismo tamaño (a lo sumo uno de diferencia, o "tamanio_maximo");
+# - cada grupo recibe la parte que le toca de cada bombo (uno por bombo si el bombo tiene tantos
+#   equipos como grupos);
+# - con "separar_carreras", dos equipos de la misma carrera no caen en el mismo grupo salvo que
+#   la carrera tenga más equipos que grupos (entonces se reparten parejo). Si así no hay solución,
+#   se permite uno más por grupo y se vuelve a buscar.
+# Los equipos de cada bombo se sortean con "semilla" y se ubican del más restringido al menos.
+# Cada paso descarta el grupo si con él ya no alcanzan los lugares para los equipos que faltan.
+# Devuelve {nombre del grupo: [equipos]}.
+def sortear_grupos(bombos, cantidad, separar_carreras=True, tamanio_maximo=None, semilla=None):
+    azar = random.Random(semilla)
+    nombres = nombres_grupos(cantidad)
+    bombos = [list(bombo) for bombo in bombos if bombo]
+    total = sum(len(bombo) for bombo in bombos)
+    if total < cantidad:
+        raise ErrorSorteo("Hay menos equipos que grupos.")
+    maximo = tamanio_maximo or math.ceil(total / cantidad)
+    if maximo * cantidad < total:
+        raise ErrorSorteo(f"No entran {total} equipos en {cantidad} grupos de {maximo}.")
+    minimo = total // cantidad if tamanio_maximo is None else 0
+
+    por_carrera = Counter(equipo.carrera_id for bombo in bombos for equipo in bombo)
+    orden = []
+    for numero, bombo in enumerate(bombos):
+        azar.shuffle(bombo)
+        bombo.sort(key=lambda equipo: -por_carrera[equipo.carrera_id])
+        orden += [(numero, equipo) for equipo in bombo]
+    limite_bombo = [math.ceil(len(bombo) / cantidad) for bombo in bombos]
+
+    for holgura in range(0, max(por_carrera.values()) + 1):
+        if separar_carreras:
+            limite_carrera = {carrera: math.ceil(cuenta / cantidad) + holgura for carrera, cuenta in por_carrera.items()}
+        else:
+            limite_carrera = dict(por_carrera)
+        asignacion = _buscar(orden, cantidad, maximo, minimo, limite_bombo, limite_carrera, azar)
+        if asignacion is not None:
+            grupos = {nombre: [] for nombre in nombres}
+            for (_, equipo), grupo in zip(orden, asignacion):
+                grupos[nombres[grupo]].append(equipo)
+            return grupos
+        if not separar_carreras:
+            break
+    raise ErrorSorteo("No se encontró un reparto que cumpla las condiciones; revise los bombos o el tamaño de los grupos.")
+
+
+def _buscar(orden, cantidad, maximo, minimo, limite_bombo, limite_carrera, azar):
+    tamanios = [0] * cantidad
+    de_bombo = defaultdict(int)
+    de_carrera = defaultdict(int)
+    faltan_carrera = Counter(equipo.carrera_id for _, equipo in orden)
+    asignacion = []
+    nodos = 0
+
+    # Poda: para cada carrera que falta ubicar tienen que quedar lugares donde ponerla, y los
+    # grupos que no llegan al mínimo tienen que poder llenarse con los equipos que faltan
+    def factible(restantes):
+        if sum(max(0, minimo - tamanio) for tamanio in tamanios) > restantes:
+            return False
+        for carrera, faltan in faltan_carrera.items():
+            if faltan and sum(
+                min(limite_carrera[carrera] - de_carrera[(grupo, carrera)], maximo - tamanios[grupo])
+                for grupo in range(cantidad)
+            ) < faltan:
+                return False
+        return True
+
+    def ubicar(indice):
+        nonlocal nodos
+        if indice == len(orden):
+            return True
+        nodos += 1
+        if nodos > LIMITE_BUSQUEDA:
+            return False
+        bombo, equipo = orden[indice]
+        carrera = equipo.carrera_id
+        candidatos = list(range(cantidad))
+        azar.shuffle(candidatos)
+        for grupo in candidatos:
+            if (
+                tamanios[grupo] >= maximo
+                or de_bombo[(grupo, bombo)] >= limite_bombo[bombo]
+                or de_carrera[(grupo, carrera)] >= limite_carrera[carrera]
+            ):
+                continue
+            tamanios[grupo] += 1
+            de_bombo[(grupo, bombo)] += 1
+            de_carrera[(grupo, carrera)] += 1
+            faltan_carrera[carrera] -= 1
+            asignacion.append(grupo)
+            if factible(len(orden) - indice - 1) and ubicar(indice + 1):
+                return True
+            asignacion.pop()
+            faltan_carrera[carrera] += 1
+            de_carrera[(grupo, carrera)] -= 1
+            de_bombo[(grupo, bombo)] -= 1
+            tamanios[grupo] -= 1
+        return False
+
+    return asignacion if ubicar(0) else None
+
+
+# Guarda el sorteo en Equipo.grupo con bulk_update; los equipos del campeonato que no
+# entraron en el sorteo quedan sin grupo
+def guardar_grupos(campeonato, grupos):
+    equipos = []
+    for nombre, integrantes in grupos.items():
+        for equipo in integrantes:
+            equipo.grupo = nombre
+            equipos.append(equipo)
+    with transaction.atomic():
+        Equipo.objects.filter(campeonato=campeonato).exclude(pk__in=[equipo.pk for equipo in equipos]).update(grupo='')
+        Equipo.objects.bulk_update(equipos, ['grupo'])
+        marcar_cambio_campeonato(campeonato.pk)
+    return equipos
+
+
+# Tabla de posiciones de cada grupo (una consulta): {grupo: [Posicion, ...]}
+def posiciones_por_grupo(campeonato_id):
+    grupos = {}
+    posiciones = (
+        Posicion.objects.filter(campeonato_id=campeonato_id).exclude(equipo__grupo='')
+        .select_related('equipo').order_by('equipo__grupo', '-puntos', '-diferencia_goles', '-goles_favor', 'equipo__nombre')
+    )
+    for posicion in posiciones:
+        grupos.setdefault(posicion.equipo.grupo, []).append(posicion)
+    return grupos
+
@@ -0,0 +1,196 @@
+import csv
+import io
+from collections import defaultdict
+
+from django.db import models, transaction
+
+from .estadisticas import actualizar_tras_carga_masiva
+from .models import Campeonato, ESTADISTICAS_POR_DEPORTE, Jugador
+from .sanciones import cambiaron_tarjetas
+
+
+# Filas que se escriben por consulta
+LOTE_IMPORTACION = 1000
+# Errores que se guardan como máximo (el resto solo se cuentan)
+MAXIMO_ERRORES = 500
+# Caracteres con los que Excel o LibreOffice interpretan una celda de texto como fórmula. Al
+# exportar esas celdas llevan un apóstrofo adelante, que se quita al importar.
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ErrorImportacion(Exception):
+    pass
+
+
+# Resultado de una importación: filas leídas, filas guardadas (las válidas, aunque repitan
+# jugador) y errores por línea
+class ResultadoImportacion:
+
+    def __init__(self):
+        self.filas = 0
+        self.guardadas = 0
+        self.cantidad_errores = 0
+        self.errores = []
+
+    def error(self, linea, mensaje):
+        self.cantidad_errores += 1
+        if len(self.errores) < MAXIMO_ERRORES:
+            self.errores.append((linea, mensaje))
+
+
+# Columnas numéricas de una tabla de estadísticas
+def columnas_estadisticas(modelo):
+    return [campo.name for campo in modelo._meta.concrete_fields if isinstance(campo, models.PositiveIntegerField)]
+
+
+# Texto de una celda sin espacios en los extremos ni el apóstrofo que agrega la exportación
+def _texto(valor):
+    texto = str(valor or '')
+    if texto.startswith("'") and texto[1:].startswith(INICIO_FORMULA):
+        texto = texto[1:]
+    return texto.strip()
+
+
+# Lee un archivo CSV o XLSX fila por fila: genera (número de línea, {columna: valor}).
+# Los encabezados se normalizan a minúsculas; "archivo" es un archivo binario abierto.
+def leer_filas(archivo, nombre):
+    if nombre.lower().endswith('.xlsx'):
+        filas = _filas_xlsx(archivo)
+    else:
+        filas = csv.reader(io.TextIOWrapper(archivo, encoding='utf-8-sig', newline=''))
+
+    encabezados = None
+    for linea, valores in enumerate(filas, start=1):
+        if encabezados is None:
+            encabezados = [str(valor or '').strip().lower() for valor in valores]
+            continue
+        if not any(valor not in (None, '') for valor in valores):
+            continue
+        yield linea, dict(zip(encabezados, valores))
+
+
+def _filas_xlsx(archivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErrorImportacion("Para leer archivos XLSX hay que instalar openpyxl.")
+    # Modo de solo lectura: las filas se leen del archivo a medida que se recorren
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+# Importa estadísticas de jugadores. Cada fila indica el campeonato ("campeonato": ID o nombre),
+# el jugador ("jugador": usuario, o "jugador_id") y columnas de la tabla del deporte del campeonato;
+# las columnas ausentes no se modifican en las filas existentes. Jugadores y campeonatos se cargan
+# una sola vez en memoria; las filas válidas se guardan por lotes con bulk_create(update_conflicts=True)
+# dentro de una transacción y las inválidas se informan sin detener la importación.
+# Con "campeonato" todas las filas se asignan a ese campeonato.
+def importar_estadisticas(filas, campeonato=None):
+    resultado = ResultadoImportacion()
+    campeonatos = Campeonato.objects.select_related('deporte')
+    if campeonato is not None:
+        campeonatos = campeonatos.filter(pk=campeonato.pk)
+    por_id = {c.pk: c for c in campeonatos}
+    por_nombre = {c.nombre.lower(): c for c in por_id.values()}
+
+    jugadores = Jugador.objects.filter(equipo__campeonato__in=list(por_id)).values_list('pk', 'usuario__username', 'equipo__campeonato_id')
+    jugador_por_usuario = {}
+    campeonato_de_jugador = {}
+    for jugador_id, usuario, campeonato_id in jugadores:
+        jugador_por_usuario[usuario.lower()] = jugador_id
+        campeonato_de_jugador[jugador_id] = campeonato_id
+
+    # Filas pendientes por tabla y jugador: {modelo: {(campeonato_id, jugador_id): {columna: valor}}}.
+    # Si un jugador se repite en el archivo se juntan sus columnas y, en las que se repiten, vale
+    # la última fila.
+    pendientes = defaultdict(dict)
+    campeonatos_cambiados = set()
+    # Jugadores con tarjetas importadas, para aplicar las reglas de suspensión
+    tarjetas = defaultdict(set)
+
+    with transaction.atomic():
+        for linea, fila in filas:
+            resultado.filas += 1
+            try:
+                destino, modelo, valores = _validar_fila(fila, campeonato, por_id, por_nombre, jugador_por_usuario, campeonato_de_jugador)
+            except ErrorImportacion as error:
+                resultado.error(linea, str(error))
+                continue
+            pendientes[modelo].setdefault(destino, {}).update(valores)
+            resultado.guardadas += 1
+            campeonatos_cambiados.add(destino[0])
+            if cambiaron_tarjetas(None, valores):
+                tarjetas[destino[0]].add(destino[1])
+            if len(pendientes[modelo]) >= LOTE_IMPORTACION:
+                _guardar(modelo, pendientes.pop(modelo))
+
+        for modelo, lote in pendientes.items():
+            _guardar(modelo, lote)
+
+        # bulk_create no dispara señales: tabla, totales y cachés se actualizan aquí
+        actualizar_tras_carga_masiva(campeonatos_cambiados, tarjetas)
+    return resultado
+
+
+def _validar_fila(fila, campeonato, por_id, por_nombre, jugador_por_usuario, campeonato_de_jugador):
+    if campeonato is None:
+        referencia = fila.get('campeonato')
+        if isinstance(referencia, float) and referencia.is_integer():
+            referencia = int(referencia)
+        referencia = _texto(referencia)
+        if not referencia:
+            raise ErrorImportacion("Falta la columna 'campeonato'.")
+        campeonato = por_id.get(int(referencia)) if referencia.isdigit() else por_nombre.get(referencia.lower())
+        if campeonato is None:
+            raise ErrorImportacion(f"No existe el campeonato '{referencia}'.")
+
+    modelo = ESTADISTICAS_POR_DEPORTE.get(campeonato.deporte.codigo)
+    if modelo is None:
+        raise ErrorImportacion(f"El deporte {campeonato.deporte} no tiene tabla de estadísticas.")
+
+    if fila.get('jugador_id') not in (None, ''):
+        try:
+            jugador_id = int(fila['jugador_id'])
+        except (TypeError, ValueError):
+            raise ErrorImportacion(f"jugador_id inválido: '{fila['jugador_id']}'.")
+    else:
+        usuario = _texto(fila.get('jugador'))
+        if not usuario:
+            raise ErrorImportacion("Falta la columna 'jugador' (usuario) o 'jugador_id'.")
+        jugador_id = jugador_por_usuario.get(usuario.lower())
+        if jugador_id is None:
+            raise ErrorImportacion(f"No existe el jugador '{usuario}' en los campeonatos importados.")
+    if campeonato_de_jugador.get(jugador_id) != campeonato.pk:
+        raise ErrorImportacion(f"El jugador {jugador_id} no juega en {campeonato.nombre}.")
+
+    valores = {}
+    for columna in columnas_estadisticas(modelo):
+        valor = fila.get(columna)
+        if valor in (None, ''):
+            continue
+        # Las celdas numéricas de Excel llegan como float (3.0)
+        if isinstance(valor, float) and valor.is_integer():
+            valor = int(valor)
+        try:
+            numero = int(str(valor).strip())
+        except ValueError:
+            raise ErrorImportacion(f"'{columna}' debe ser un número entero (vino '{valor}').")
+        if numero < 0:
+            raise ErrorImportacion(f"'{columna}' no puede ser negativo.")
+        valores[columna] = numero
+    if not valores:
+        raise ErrorImportacion(f"La fila no tiene ninguna columna de {modelo._meta.verbose_name}.")
+    return (campeonato.pk, jugador_id), modelo, valores
+
+
+# Inserta o actualiza un lote de filas de una tabla, con una consulta por cada combinación de
+# columnas presentes (así una fila nunca pisa con 0 una columna que no trae)
+def _guardar(modelo, lote):
+    por_columnas = defaultdict(list)
+    for (campeonato_id, jugador_id), valores in lote.items():
+        por_columnas[tuple(sorted(valores))].append(modelo(campeonato_id=campeonato_id, jugador_id=jugador_id, **valores))
+    for columnas, objetos in por_columnas.items():
+        modelo.objects.bulk_create(objetos, update_conflicts=True, unique_fields=['campeonato', 'jugador'], update_fields=list(columnas))
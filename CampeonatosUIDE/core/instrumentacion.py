@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+# Medición en curso del contexto actual (petición o bloque medido). Al ser una ContextVar
+# se comparte entre el event loop y los hilos de sync_to_async de la misma petición.
+_medicion_actual = ContextVar('medicion_actual', default=None)
+
+# Listas "IN (%s, %s, ...)" de distinto largo se consideran la misma consulta
+_LISTA_PARAMETROS = re.compile(r'%s(?:\s*,\s*%s)+')
+
+
+# Datos medidos de una petición o de un bloque de código
+class Medicion:
+
+    def __init__(self):
+        self.vista = None
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.huellas = Counter()
+        self.ejemplos = {}
+        self.tiempos = Counter()
+        self.inicio = time.perf_counter()
+
+    def registrar_consulta(self, sql, duracion):
+        self.consultas += 1
+        self.tiempo_sql += duracion
+        normalizada = _LISTA_PARAMETROS.sub('%s...', sql)
+        huella = hashlib.md5(normalizada.encode()).hexdigest()[:10]
+        self.huellas[huella] += 1
+        self.ejemplos.setdefault(huella, normalizada[:200])
+
+    # Consultas repetidas: {huella: (veces, sql)} (suelen delatar un N+1)
+    @property
+    def duplicadas(self):
+        return {huella: (veces, self.ejemplos[huella]) for huella, veces in self.huellas.most_common() if veces > 1}
+
+    @property
+    def tiempo_total(self):
+        return time.perf_counter() - self.inicio
+
+    def como_diccionario(self):
+        return {
+            'vista': self.vista,
+            'consultas': self.consultas,
+            'tiempo_sql_ms': round(self.tiempo_sql * 1000, 2),
+            'tiempos_ms': {nombre: round(segundos * 1000, 2) for nombre, segundos in self.tiempos.items()},
+            'tiempo_total_ms': round(self.tiempo_total * 1000, 2),
+            'duplicadas': {huella: veces for huella, (veces, _) in self.duplicadas.items()},
+        }
+
+    # Valor de la cabecera Server-Timing
+    def server_timing(self):
+        partes = [f'db;dur={self.tiempo_sql * 1000:.1f};desc="{self.consultas} consultas, {len(self.duplicadas)} repetidas"']
+        partes += [f'{nombre};dur={segundos * 1000:.1f}' for nombre, segundos in self.tiempos.items()]
+        partes.append(f'total;dur={self.tiempo_total * 1000:.1f}')
+        return ', '.join(partes)
+
+
+# Medición en curso (None si no se está midiendo)
+def medicion_actual():
+    return _medicion_actual.get()
+
+
+# Mide todo lo que ocurre dentro del bloque (consultas y tiempos):
+#   with medir_bloque() as medicion:
+#       ...
+#   medicion.consultas
+@contextmanager
+def medir_bloque():
+    medicion = Medicion()
+    token = _medicion_actual.set(medicion)
+    try:
+        yield medicion
+    finally:
+        _medicion_actual.reset(token)
+
+
+# Suma el tiempo del bloque al tramo "nombre" de la medición en curso (sale en Server-Timing)
+@contextmanager
+def medir(nombre):
+    medicion = _medicion_actual.get()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if medicion is not None:
+            medicion.tiempos[nombre] += time.perf_counter() - inicio
+
+
+# Envoltorio de ejecución instalado en cada conexión: solo mide si hay una medición en curso
+def _registrar_consulta(execute, sql, params, many, context):
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.registrar_consulta(sql, time.perf_counter() - inicio)
+
+
+def instalar_en_conexion(sender, connection, **kwargs):
+    if _registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_registrar_consulta)
+
+
+connection_created.connect(instalar_en_conexion)
+# Conexiones que ya estaban abiertas al importar el módulo
+for _conexion in connections.all(initialized_only=True):
+    instalar_en_conexion(None, _conexion)
+
+
+# Motor de plantillas de Django que mide el tiempo de renderizado (tramo "render")
+class PlantillasInstrumentadas(DjangoTemplates):
+
+    def from_string(self, template_code):
+        return _PlantillaMedida(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _PlantillaMedida(super().get_template(template_name))
+
+
+class _PlantillaMedida:
+
+    def __init__(self, plantilla):
+        self.plantilla = plantilla
+
+    def __getattr__(self, nombre):
+        return getattr(self.plantilla, nombre)
+
+    def render(self, context=None, request=None):
+        with medir('render'):
+            return self.plantilla.render(context, request)
+
+
+# Formato de log que agrega al mensaje las métricas de la petición (extra "instrumentacion")
+# como JSON en la misma línea, para poder filtrarlas y procesarlas desde la consola o el archivo.
+# Se usa en settings.LOGGING con el logger "core.instrumentacion".
+class FormatoInstrumentacion(logging.Formatter):
+
+    def format(self, record):
+        texto = super().format(record)
+        datos = getattr(record, 'instrumentacion', None)
+        if datos is None:
+            return texto
+        return f"{texto} {json.dumps(datos, ensure_ascii=False, sort_keys=True)}"
+
+
+# Middleware que mide cada petición: cantidad de consultas, tiempo de SQL, consultas
+# repetidas y tiempo de renderizado. Los agrega en la cabecera Server-Timing (con DEBUG o
+# para el staff), los registra en el log "core.instrumentacion" y avisa si la vista supera
+# su presupuesto de consultas (settings.PRESUPUESTO_CONSULTAS). Funciona con WSGI y con ASGI.
+class InstrumentacionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with medir_bloque() as medicion:
+            respuesta = self.get_response(request)
+        # Server-Timing muestra las consultas y tiempos internos: solo con DEBUG o para el staff
+        mostrar = settings.DEBUG or getattr(getattr(request, 'user', None), 'is_staff', False)
+        return self.terminar(medicion, respuesta, mostrar)
+
+    async def __acall__(self, request):
+        with medir_bloque() as medicion:
+            respuesta = await self.get_response(request)
+        # Con ASGI el usuario se carga con auser() (request.user consultaría la base de forma síncrona)
+        usuario = await request.auser() if not settings.DEBUG and hasattr(request, 'auser') else None
+        mostrar = settings.DEBUG or getattr(usuario, 'is_staff', False)
+        return self.terminar(medicion, respuesta, mostrar)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicion = _medicion_actual.get()
+        if medicion is not None:
+            medicion.vista = request.resolver_match.view_name
+
+    def terminar(self, medicion, respuesta, mostrar_server_timing):
+        if mostrar_server_timing:
+            respuesta['Server-Timing'] = medicion.server_timing()
+        datos = medicion.como_diccionario()
+        logger.info(
+            "%s: %d consultas, %.1f ms SQL", medicion.vista, medicion.consultas, medicion.tiempo_sql * 1000,
+            extra={'instrumentacion': datos},
+        )
+
+        presupuestos = getattr(settings, 'PRESUPUESTO_CONSULTAS', {})
+        presupuesto = presupuestos.get(medicion.vista, getattr(settings, 'PRESUPUESTO_CONSULTAS_POR_DEFECTO', None))
+        if presupuesto is not None and medicion.consultas > presupuesto:
+            repetidas = '; '.join(f"{veces}x {sql}" for veces, sql in list(medicion.duplicadas.values())[:3])
+            logger.warning(
+                "%s superó su presupuesto: %d consultas (máximo %d). Repetidas: %s",
+                medicion.vista, medicion.consultas, presupuesto, repetidas or 'ninguna',
+                extra={'instrumentacion': datos},
+            )
+        return respuesta
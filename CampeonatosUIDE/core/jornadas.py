@@ -0,0 +1,129 @@
+from itertools import groupby
+
+from django.db import transaction
+
+from .models import Campeonato, Equipo, JornadaTabla, Partido
+from .posiciones import CAMPOS_TABLA, aporte_partido
+from .puntuacion import estrategia_para
+
+
+# Columnas de cada fila guardada en JornadaTabla.filas, en este orden
+COLUMNAS_JORNADA = ('equipo_id',) + CAMPOS_TABLA
+
+
+# Clave de orden de la tabla (igual que Posicion.Meta.ordering: el nombre del equipo y su id
+# desempatan). "nombres" es {equipo_id: nombre}.
+def _orden(fila, nombres):
+    equipo_id, puntos, *_, goles_favor, _, diferencia = fila
+    return (-puntos, -diferencia, -goles_favor, nombres[equipo_id], equipo_id)
+
+
+# Recorre los partidos de un campeonato por fecha acumulando la tabla y genera (fecha, numero,
+# filas) para cada fecha con todos sus partidos finalizados: una jornada cerrada. El número es
+# el lugar de la fecha entre todas las fechas con partidos, también las que siguen abiertas, así
+# la jornada 1 es siempre la de la primera fecha del calendario. Una sola consulta.
+# En los deportes que puntúan por estadísticas los puntos son los actuales en todas las jornadas.
+def calcular_jornadas(campeonato):
+    estrategia = estrategia_para(campeonato.deporte)
+    nombres = dict(Equipo.objects.filter(campeonato=campeonato).values_list('pk', 'nombre'))
+    acumulado = {equipo_id: dict.fromkeys(CAMPOS_TABLA, 0) for equipo_id in nombres}
+    puntos_fijos = {} if estrategia.por_partidos else estrategia.puntos_campeonato(campeonato, list(acumulado))
+
+    partidos = Partido.objects.filter(campeonato=campeonato).order_by('fecha').values(*Partido.CAMPOS_SEGUIDOS)
+    for numero, (fecha, del_dia) in enumerate(groupby(partidos.iterator(), key=lambda valores: valores['fecha']), start=1):
+        cerrada = True
+        for valores in del_dia:
+            cerrada = cerrada and valores['estado'] == 'FINALIZADO'
+            for (_, equipo_id), aporte in aporte_partido(valores, estrategia).items():
+                if equipo_id in acumulado:
+                    for campo, valor in aporte.items():
+                        acumulado[equipo_id][campo] += valor
+        if not cerrada:
+            continue
+        filas = [
+            [equipo_id, float(puntos_fijos.get(equipo_id, fila['puntos'])), *(fila[campo] for campo in CAMPOS_TABLA[1:])]
+            for equipo_id, fila in acumulado.items()
+        ]
+        yield fecha, numero, sorted(filas, key=lambda fila: _orden(fila, nombres))
+
+
+# Vuelve a escribir las jornadas de los campeonatos indicados (todos por defecto); con "desde"
+# solo las de esa fecha en adelante, que son las únicas que cambian al tocar un partido de esa
+# fecha (tabla y también número, si la fecha es nueva o quedó sin partidos).
+# Devuelve la cantidad de jornadas escritas.
+def reconstruir_jornadas(campeonatos=None, desde=None):
+    if campeonatos is None:
+        campeonatos = Campeonato.objects.select_related('deporte')
+    escritas = 0
+    with transaction.atomic():
+        for campeonato in campeonatos:
+            jornadas = [
+                JornadaTabla(campeonato=campeonato, fecha=fecha, numero=numero, filas=filas)
+                for fecha, numero, filas in calcular_jornadas(campeonato)
+                if desde is None or fecha >= desde
+            ]
+            anteriores = JornadaTabla.objects.filter(campeonato=campeonato)
+            if desde is not None:
+                anteriores = anteriores.filter(fecha__gte=desde)
+            anteriores.delete()
+            JornadaTabla.objects.bulk_create(jornadas)
+            escritas += len(jornadas)
+    return escritas
+
+
+# Actualiza las jornadas afectadas por el cambio de un partido ("anterior" y "actual" son sus
+# valores seguidos, None si no existe). Un partido en curso que cambia el marcador no cierra
+# ni abre ninguna jornada, así que no se recalcula nada.
+def actualizar_jornadas_partido(anterior, actual):
+    if anterior == actual:
+        return
+    existentes = [valores for valores in (anterior, actual) if valores]
+    if (
+        anterior and actual
+        and anterior['estado'] != 'FINALIZADO' and actual['estado'] != 'FINALIZADO'
+        and anterior['fecha'] == actual['fecha'] and anterior['campeonato_id'] == actual['campeonato_id']
+    ):
+        return
+    desde = {}
+    for valores in existentes:
+        campeonato_id = valores['campeonato_id']
+        desde[campeonato_id] = min(desde.get(campeonato_id, valores['fecha']), valores['fecha'])
+    for campeonato in Campeonato.objects.filter(pk__in=list(desde)).select_related('deporte'):
+        reconstruir_jornadas([campeonato], desde[campeonato.pk])
+
+
+# Jornadas cerradas de un campeonato: [{'numero', 'fecha'}, ...]
+def jornadas_campeonato(campeonato_id):
+    return list(JornadaTabla.objects.filter(campeonato_id=campeonato_id).order_by('fecha').values('numero', 'fecha'))
+
+
+# Tabla tal como estaba al cerrar la jornada "numero" o la última jornada cerrada hasta "fecha";
+# None si no existe. Lee una sola fila más los nombres de los equipos.
+def tabla_en_jornada(campeonato_id, numero=None, fecha=None):
+    jornadas = JornadaTabla.objects.filter(campeonato_id=campeonato_id)
+    if numero is not None:
+        jornada = jornadas.filter(numero=numero).first()
+    else:
+        jornada = jornadas.filter(fecha__lte=fecha).order_by('-fecha').first()
+    if jornada is None:
+        return None
+    nombres = dict(Equipo.objects.filter(pk__in=[fila[0] for fila in jornada.filas]).values_list('pk', 'nombre'))
+    return {
+        'numero': jornada.numero,
+        'fecha': jornada.fecha,
+        'filas': [
+            {'posicion': posicion, 'equipo': nombres.get(fila[0]), **dict(zip(COLUMNAS_JORNADA, fila))}
+            for posicion, fila in enumerate(jornada.filas, start=1)
+        ],
+    }
+
+
+# Posición y puntos de cada equipo en cada jornada cerrada, para gráficos de evolución
+# (una consulta): {equipo_id: [{'numero', 'fecha', 'posicion', 'puntos'}, ...]}
+def evolucion_posiciones(campeonato_id):
+    evolucion = {}
+    jornadas = JornadaTabla.objects.filter(campeonato_id=campeonato_id).order_by('fecha').values_list('numero', 'fecha', 'filas')
+    for numero, fecha, filas in jornadas:
+        for posicion, fila in enumerate(filas, start=1):
+            evolucion.setdefault(fila[0], []).append({'numero': numero, 'fecha': fecha, 'posicion': posicion, 'puntos': fila[1]})
+    return evolucion
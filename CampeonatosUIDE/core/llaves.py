@@ -0,0 +1,259 @@
+import datetime
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .fixture import ErrorFixture, guardar_fixture, ubicar_partidos
+from .models import CruceLlave, Equipo, Partido, TipoCampeonato
+
+
+logger = logging.getLogger(__name__)
+
+# Nombre de las últimas rondas, contando desde la final
+NOMBRES_RONDAS = ['Final', 'Semifinal', 'Cuartos de final', 'Octavos de final', 'Dieciseisavos de final']
+
+# Orden de los equipos en la tabla (igual que Posicion.Meta.ordering)
+ORDEN_POSICIONES = (
+    F('posicion__puntos').desc(nulls_last=True), F('posicion__diferencia_goles').desc(nulls_last=True),
+    F('posicion__goles_favor').desc(nulls_last=True), 'nombre',
+)
+
+
+class ErrorLlave(Exception):
+    pass
+
+
+def nombre_ronda(ronda, rondas):
+    faltan = rondas - ronda
+    return NOMBRES_RONDAS[faltan] if faltan < len(NOMBRES_RONDAS) else f"Ronda {ronda}"
+
+
+# Orden de los cabezas de serie en la primera ronda de una llave de "tamanio" lugares (potencia
+# de 2): el 1 y el 2 solo se cruzan en la final, y los pases libres (los números mayores que la
+# cantidad de equipos) le tocan a los mejores sembrados. Para 8: [1, 8, 4, 5, 2, 7, 3, 6].
+def orden_siembra(tamanio):
+    orden = [1]
+    while len(orden) < tamanio:
+        total = len(orden) * 2 + 1
+        orden = [numero for semilla in orden for numero in (semilla, total - semilla)]
+    return orden
+
+
+# Equipos aprobados ordenados por la tabla de posiciones (el primero es el cabeza de serie 1)
+def sembrar_por_posiciones(campeonato):
+    return list(Equipo.objects.filter(campeonato=campeonato, aprobado=True).order_by(*ORDEN_POSICIONES, 'pk'))
+
+
+# Clasificados de la fase de grupos: los "clasificados" primeros de cada grupo según la tabla.
+# Primero van todos los primeros (ordenados entre sí por puntos), después los segundos, etc.
+def sembrar_desde_grupos(campeonato, clasificados=2):
+    por_grupo = {}
+    equipos = Equipo.objects.filter(campeonato=campeonato, aprobado=True).exclude(grupo='').select_related('posicion')
+    for equipo in equipos.order_by('grupo', *ORDEN_POSICIONES, 'pk'):
+        por_grupo.setdefault(equipo.grupo, []).append(equipo)
+    if not por_grupo:
+        raise ErrorLlave("Los equipos del campeonato no tienen grupo asignado.")
+
+    def orden(equipo):
+        posicion = getattr(equipo, 'posicion', None)
+        if posicion is None:
+            return (0, 0, 0, equipo.nombre)
+        return (-posicion.puntos, -posicion.diferencia_goles, -posicion.goles_favor, equipo.nombre)
+
+    sembrados = []
+    for lugar in range(clasificados):
+        sembrados += sorted((grupo[lugar] for grupo in por_grupo.values() if len(grupo) > lugar), key=orden)
+    return sembrados
+
+
+# Cambia rivales entre cruces de la primera ronda para que dos equipos del mismo grupo no se
+# enfrenten de entrada (si hay un cambio que lo evite sin crear otro choque)
+def _separar_grupos(pares):
+    def choca(local, visitante):
+        return local is not None and visitante is not None and local.grupo and local.grupo == visitante.grupo
+
+    for indice, (local, visitante) in enumerate(pares):
+        if not choca(local, visitante):
+            continue
+        for otro, (otro_local, otro_visitante) in enumerate(pares):
+            if otro != indice and not choca(local, otro_visitante) and not choca(otro_local, visitante):
+                pares[indice], pares[otro] = (local, otro_visitante), (otro_local, visitante)
+                break
+    return pares
+
+
+# Cruce siguiente (ronda, posicion) de un cruce y el lado en el que juega su ganador
+def _lugar_siguiente(cruce):
+    return (cruce.ronda + 1, cruce.posicion // 2), 'equipo_local' if cruce.posicion % 2 == 0 else 'equipo_visitante'
+
+
+# Arma en memoria todos los cruces de la llave para los equipos sembrados (el primero es el
+# cabeza de serie 1). Los pases libres se resuelven en el momento. Devuelve {(ronda, posicion): cruce}.
+def armar_llave(campeonato, sembrados):
+    if len(sembrados) < 2:
+        raise ErrorLlave("La llave necesita al menos dos equipos.")
+    tamanio = 1 << (len(sembrados) - 1).bit_length()
+    rondas = tamanio.bit_length() - 1
+    cruces = {
+        (ronda, posicion): CruceLlave(campeonato=campeonato, ronda=ronda, posicion=posicion)
+        for ronda in range(1, rondas + 1) for posicion in range(tamanio >> ronda)
+    }
+    orden = [sembrados[numero - 1] if numero <= len(sembrados) else None for numero in orden_siembra(tamanio)]
+    pares = _separar_grupos([(orden[indice], orden[indice + 1]) for indice in range(0, tamanio, 2)])
+    for posicion, (local, visitante) in enumerate(pares):
+        cruce = cruces[(1, posicion)]
+        cruce.equipo_local, cruce.equipo_visitante = local, visitante
+        if visitante is None or local is None:
+            cruce.ganador = local or visitante
+            clave, campo = _lugar_siguiente(cruce)
+            setattr(cruces[clave], campo, cruce.ganador)
+    return cruces
+
+
+# Arma la llave y ubica los partidos que ya se pueden jugar (la primera ronda y los cruces
+# de la segunda entre dos equipos con pase libre), una ronda por fecha, sin guardar nada.
+# Devuelve (cruces, partidos).
+def generar_llave(campeonato, sembrados, lugares, horas, desde=None):
+    tipo = campeonato.tipo_campeonato
+    if tipo is None or tipo.formato not in TipoCampeonato.FORMATOS_ELIMINACION:
+        raise ErrorLlave("El tipo del campeonato no es de eliminación directa.")
+    if CruceLlave.objects.filter(campeonato=campeonato).exists():
+        raise ErrorLlave("El campeonato ya tiene su llave armada.")
+    cruces = armar_llave(campeonato, sembrados)
+    por_ronda = {}
+    for cruce in cruces.values():
+        if cruce.equipo_local is not None and cruce.equipo_visitante is not None:
+            por_ronda.setdefault(cruce.ronda, []).append((cruce.equipo_local, cruce.equipo_visitante))
+    try:
+        partidos = ubicar_partidos(campeonato, [por_ronda[ronda] for ronda in sorted(por_ronda)], lugares, horas, desde)
+    except ErrorFixture as error:
+        raise ErrorLlave(str(error))
+    return list(cruces.values()), partidos
+
+
+# Guarda los partidos (un INSERT, ver guardar_fixture) y los cruces (otro INSERT)
+def guardar_llave(campeonato, cruces, partidos):
+    with transaction.atomic():
+        try:
+            partidos = guardar_fixture(campeonato, partidos)
+        except ErrorFixture as error:
+            raise ErrorLlave(str(error))
+        por_equipos = {(partido.equipo_local_id, partido.equipo_visitante_id): partido for partido in partidos}
+        for cruce in cruces:
+            if cruce.equipo_local is not None and cruce.equipo_visitante is not None:
+                cruce.partido = por_equipos.get((cruce.equipo_local.pk, cruce.equipo_visitante.pk))
+        return CruceLlave.objects.bulk_create(cruces)
+
+
+# Equipo ganador según los valores seguidos de un partido (Partido.CAMPOS_SEGUIDOS);
+# None si no terminó o quedó empatado
+def ganador(valores):
+    if not valores or valores['estado'] != 'FINALIZADO':
+        return None
+    local, visitante = valores['resultado_local'], valores['resultado_visitante']
+    if local is None or visitante is None or local == visitante:
+        return None
+    return valores['equipo_local_id'] if local > visitante else valores['equipo_visitante_id']
+
+
+# True si guardar "partido" cambiaría el ganador de su cruce cuando el partido del cruce
+# siguiente ya empezó o terminó (Partido.clean lo rechaza)
+def cruce_siguiente_jugado(partido):
+    ganador_id = ganador({campo: getattr(partido, campo) for campo in Partido.CAMPOS_SEGUIDOS})
+    cruce = CruceLlave.objects.filter(partido_id=partido.pk).values('campeonato_id', 'ronda', 'posicion', 'ganador_id').first()
+    if ganador_id is None or cruce is None or cruce['ganador_id'] in (None, ganador_id):
+        return False
+    return CruceLlave.objects.filter(
+        campeonato_id=cruce['campeonato_id'], ronda=cruce['ronda'] + 1, posicion=cruce['posicion'] // 2,
+        partido__isnull=False,
+    ).exclude(partido__estado='PROGRAMADO').exists()
+
+
+# Al finalizar un partido de la llave pasa al ganador al cruce siguiente y, si el otro cruce
+# que lo alimenta ya tiene ganador, crea el partido. Solo se leen y escriben el cruce del
+# partido, el siguiente y el otro que lo alimenta. Si se corrige un resultado y cambia el
+# ganador, se cambia también en el cruce siguiente mientras su partido no haya empezado;
+# si ya empezó no se toca nada, para que la llave siga igual al partido que se jugó.
+def avanzar_llave(anterior, partido):
+    ganador_id = ganador({campo: getattr(partido, campo) for campo in Partido.CAMPOS_SEGUIDOS})
+    if ganador_id is None or ganador(anterior) == ganador_id:
+        return
+    with transaction.atomic():
+        cruce = CruceLlave.objects.select_for_update().filter(partido=partido).first()
+        if cruce is None or cruce.ganador_id == ganador_id:
+            return
+        (ronda, posicion), campo = _lugar_siguiente(cruce)
+        siguiente = (
+            CruceLlave.objects.select_for_update().select_related('partido', 'equipo_local', 'equipo_visitante')
+            .filter(campeonato_id=cruce.campeonato_id, ronda=ronda, posicion=posicion).first()
+        )
+        if siguiente is not None and siguiente.partido is not None and siguiente.partido.estado != 'PROGRAMADO':
+            logger.warning("El cruce %s ya se jugó; no se cambia el equipo que pasó de ronda.", siguiente.pk)
+            return
+
+        cruce.ganador_id = ganador_id
+        cruce.save(update_fields=['ganador'])
+        if siguiente is None:
+            return
+        setattr(siguiente, f'{campo}_id', ganador_id)
+        if siguiente.partido is not None:
+            setattr(siguiente.partido, f'{campo}_id', ganador_id)
+            siguiente.partido.save(update_fields=[campo])
+        elif siguiente.equipo_local_id and siguiente.equipo_visitante_id:
+            siguiente.partido = _crear_partido_siguiente(cruce, partido, siguiente)
+        siguiente.save(update_fields=[campo, 'partido'])
+
+
+# Crea el partido del cruce siguiente en la primera fecha libre después de los dos partidos
+# que lo alimentan, en el lugar y la hora de alguno de ellos
+def _crear_partido_siguiente(cruce, partido, siguiente):
+    otro = (
+        CruceLlave.objects.filter(campeonato_id=cruce.campeonato_id, ronda=cruce.ronda, posicion=cruce.posicion ^ 1)
+        .values('partido__fecha', 'partido__hora', 'partido__lugar').first()
+    ) or {}
+    anteriores = [(partido.fecha, partido.hora, partido.lugar)]
+    if otro.get('partido__fecha'):
+        anteriores.append((otro['partido__fecha'], otro['partido__hora'], otro['partido__lugar']))
+    desde = max(fecha for fecha, _, _ in anteriores) + datetime.timedelta(days=1)
+    equipos = Equipo.objects.in_bulk([siguiente.equipo_local_id, siguiente.equipo_visitante_id])
+    try:
+        nuevo, = ubicar_partidos(
+            partido.campeonato, [[(equipos[siguiente.equipo_local_id], equipos[siguiente.equipo_visitante_id])]],
+            [lugar for _, _, lugar in anteriores], [hora for _, hora, _ in anteriores], desde,
+        )
+    except ErrorFixture as error:
+        logger.warning("No se pudo programar el cruce %s: %s", siguiente.pk, error)
+        return None
+    # Si otro partido ocupó el horario en el medio, el cruce queda para programarlo a mano
+    try:
+        with transaction.atomic():
+            nuevo.save()
+    except IntegrityError:
+        logger.warning("No se pudo programar el cruce %s: el horario elegido ya está ocupado.", siguiente.pk)
+        return None
+    return nuevo
+
+
+# Llave de un campeonato por rondas, para mostrarla:
+# [{'ronda', 'nombre', 'cruces': [{'posicion', 'local', 'visitante', 'ganador_id', 'partido'}]}]
+def llave_campeonato(campeonato_id):
+    cruces = list(
+        CruceLlave.objects.filter(campeonato_id=campeonato_id)
+        .select_related('equipo_local', 'equipo_visitante', 'partido')
+        .order_by('ronda', 'posicion')
+    )
+    rondas = max((cruce.ronda for cruce in cruces), default=0)
+    llave = []
+    for cruce in cruces:
+        if not llave or llave[-1]['ronda'] != cruce.ronda:
+            llave.append({'ronda': cruce.ronda, 'nombre': nombre_ronda(cruce.ronda, rondas), 'cruces': []})
+        partido = cruce.partido
+        llave[-1]['cruces'].append({
+            'posicion': cruce.posicion,
+            'local': cruce.equipo_local,
+            'visitante': cruce.equipo_visitante,
+            'ganador_id': cruce.ganador_id,
+            'partido': partido,
+        })
+    return llave
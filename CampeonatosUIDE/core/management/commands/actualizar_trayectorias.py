@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.trayectorias import actualizar_trayectorias
+
+
+class Command(BaseCommand):
+    help = "Recalcula el resumen de trayectoria (campeonatos, títulos y totales por deporte y año) de los usuarios que juegan."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario', type=int, action='append', dest='usuarios',
+            help="ID del usuario a recalcular (se puede repetir). Por defecto, todos.",
+        )
+
+    def handle(self, *args, **options):
+        filas = actualizar_trayectorias(options['usuarios'])
+        self.stdout.write(self.style.SUCCESS(f"{filas} trayectorias actualizadas."))
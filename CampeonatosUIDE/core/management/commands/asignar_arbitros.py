@@ -0,0 +1,45 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.arbitrajes import asignar_arbitros, guardar_arbitros
+from core.models import Partido
+
+
+def _fecha(valor):
+    return datetime.date.fromisoformat(valor)
+
+
+class Command(BaseCommand):
+    help = (
+        "Asigna árbitro a todos los partidos programados sin árbitro entre dos fechas: solo árbitros "
+        "activos del deporte, sin partidos superpuestos y repartiendo la carga de forma pareja."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('desde', type=_fecha, help="Primera fecha (AAAA-MM-DD)")
+        parser.add_argument('hasta', type=_fecha, help="Última fecha (AAAA-MM-DD)")
+        parser.add_argument('--campeonato', type=int, action='append', dest='campeonatos', help="Solo este campeonato (se puede repetir).")
+        parser.add_argument('--dry-run', action='store_true', help="Solo muestra la asignación, no la guarda.")
+
+    def handle(self, *args, **options):
+        if options['hasta'] < options['desde']:
+            raise CommandError("La fecha final es anterior a la inicial.")
+        partidos = Partido.objects.filter(fecha__gte=options['desde'], fecha__lte=options['hasta'])
+        if options['campeonatos']:
+            partidos = partidos.filter(campeonato_id__in=options['campeonatos'])
+        asignados, sin_asignar = asignar_arbitros(partidos)
+
+        for partido in asignados:
+            self.stdout.write(f"{partido.fecha:%Y-%m-%d} {partido.hora:%H:%M}  {partido}: {partido.arbitro}")
+        for partido in sin_asignar:
+            self.stdout.write(self.style.WARNING(f"{partido.fecha:%Y-%m-%d} {partido.hora:%H:%M}  {partido}: sin árbitro disponible"))
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(asignados)} partidos con árbitro (no se guardaron), {len(sin_asignar)} sin árbitro."))
+        else:
+            guardados = guardar_arbitros(asignados)
+            if len(guardados) < len(asignados):
+                self.stdout.write(self.style.WARNING(
+                    f"{len(asignados) - len(guardados)} partidos cambiaron mientras se calculaba la asignación y no se tocaron."
+                ))
+            self.stdout.write(self.style.SUCCESS(f"{len(guardados)} partidos con árbitro asignado, {len(sin_asignar)} sin árbitro."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.models import ReglaSuspension
+from core.sanciones import evaluar_suspensiones
+
+
+class Command(BaseCommand):
+    help = (
+        "Aplica las reglas de suspensión por tarjetas a todos los jugadores de los campeonatos "
+        "(crea o extiende las suspensiones que falten)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--campeonato', type=int, action='append', dest='campeonatos',
+            help="ID del campeonato a evaluar (se puede repetir). Por defecto, todos los que tienen reglas activas.",
+        )
+
+    def handle(self, *args, **options):
+        campeonatos = options['campeonatos'] or (
+            ReglaSuspension.objects.filter(activa=True).values_list('campeonato_id', flat=True).distinct().order_by('campeonato_id')
+        )
+        for campeonato_id in campeonatos:
+            cambios = evaluar_suspensiones(campeonato_id)
+            self.stdout.write(f"Campeonato {campeonato_id}: {cambios} suspensiones creadas o extendidas")
@@ -0,0 +1,44 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import slugify
+
+from core.exportacion import EXPORTACIONES, ErrorExportacion, escribir_xlsx, lineas_csv
+from core.models import Campeonato
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta un campeonato completo (posiciones, equipos, jugadores, partidos y estadísticas) "
+        "a un CSV por tabla o a un solo XLSX con una hoja por tabla."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('campeonato', type=int, help="ID del campeonato")
+        parser.add_argument('--formato', choices=('csv', 'xlsx'), default='csv')
+        parser.add_argument('--tabla', action='append', choices=list(EXPORTACIONES), help="Tabla a exportar (se puede repetir; por defecto todas).")
+        parser.add_argument('--directorio', default='.', help="Carpeta donde se guardan los archivos.")
+
+    def handle(self, *args, **options):
+        campeonato = Campeonato.objects.select_related('deporte').filter(pk=options['campeonato']).first()
+        if campeonato is None:
+            raise CommandError(f"No existe el campeonato {options['campeonato']}.")
+        tablas = options['tabla'] or list(EXPORTACIONES)
+        prefijo = os.path.join(options['directorio'], slugify(campeonato.nombre))
+
+        try:
+            if options['formato'] == 'xlsx':
+                rutas = [f"{prefijo}.xlsx"]
+                with open(rutas[0], 'wb') as archivo:
+                    escribir_xlsx(campeonato, archivo, tablas)
+            else:
+                rutas = []
+                for tabla in tablas:
+                    rutas.append(f"{prefijo}-{tabla}.csv")
+                    with open(rutas[-1], 'w', encoding='utf-8', newline='') as archivo:
+                        archivo.writelines(lineas_csv(campeonato, tabla))
+        except (OSError, ErrorExportacion) as error:
+            raise CommandError(str(error))
+
+        for ruta in rutas:
+            self.stdout.write(self.style.SUCCESS(f"Exportado {ruta}"))
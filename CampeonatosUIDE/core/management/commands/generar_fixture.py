@@ -0,0 +1,56 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.fixture import ErrorFixture, generar_fixture, guardar_fixture
+from core.models import Campeonato
+
+
+def _hora(valor):
+    return datetime.datetime.strptime(valor, '%H:%M').time()
+
+
+def _fecha(valor):
+    return datetime.date.fromisoformat(valor)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera el fixture de todos contra todos de un campeonato con sus equipos aprobados, en sus "
+        "días de partido y en los lugares y horas indicados, y lo guarda con un solo INSERT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('campeonato', type=int, help="ID del campeonato")
+        parser.add_argument('--lugar', action='append', dest='lugares', required=True, help="Lugar disponible (se puede repetir).")
+        parser.add_argument('--hora', action='append', dest='horas', type=_hora, required=True, help="Hora de inicio HH:MM (se puede repetir).")
+        parser.add_argument('--ida-y-vuelta', action='store_true', help="Cada par de equipos juega dos veces, una de local cada uno.")
+        parser.add_argument('--por-grupos', action='store_true', help="Un todos contra todos dentro de cada grupo (Equipo.grupo).")
+        parser.add_argument('--desde', type=_fecha, help="Primera fecha a usar (AAAA-MM-DD).")
+        parser.add_argument('--dry-run', action='store_true', help="Solo muestra los partidos, no los guarda.")
+
+    def handle(self, *args, **options):
+        campeonato = Campeonato.objects.select_related('deporte').filter(pk=options['campeonato']).first()
+        if campeonato is None:
+            raise CommandError(f"No existe el campeonato {options['campeonato']}.")
+        try:
+            partidos = generar_fixture(
+                campeonato, options['lugares'], options['horas'], options['ida_y_vuelta'], options['desde'],
+                por_grupos=options['por_grupos'],
+            )
+        except ErrorFixture as error:
+            raise CommandError(str(error))
+
+        for partido in partidos:
+            self.stdout.write(
+                f"{partido.fecha:%Y-%m-%d} {partido.hora:%H:%M}  {partido.lugar}: "
+                f"{partido.equipo_local} vs {partido.equipo_visitante}"
+            )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(partidos)} partidos generados (no se guardaron)."))
+        else:
+            try:
+                guardar_fixture(campeonato, partidos)
+            except ErrorFixture as error:
+                raise CommandError(str(error))
+            self.stdout.write(self.style.SUCCESS(f"{len(partidos)} partidos creados."))
@@ -0,0 +1,59 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.llaves import ErrorLlave, generar_llave, guardar_llave, sembrar_desde_grupos, sembrar_por_posiciones
+from core.models import Campeonato
+
+
+def _hora(valor):
+    return datetime.datetime.strptime(valor, '%H:%M').time()
+
+
+def _fecha(valor):
+    return datetime.date.fromisoformat(valor)
+
+
+class Command(BaseCommand):
+    help = (
+        "Arma la llave de eliminación directa de un campeonato (con pases libres si hace falta) y crea "
+        "los partidos de la primera ronda con un solo INSERT. Las rondas siguientes se crean solas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('campeonato', type=int, help="ID del campeonato")
+        parser.add_argument('--lugar', action='append', dest='lugares', required=True, help="Lugar disponible (se puede repetir).")
+        parser.add_argument('--hora', action='append', dest='horas', type=_hora, required=True, help="Hora de inicio HH:MM (se puede repetir).")
+        parser.add_argument('--grupos', type=int, metavar='CLASIFICADOS', help="Siembra con los CLASIFICADOS primeros de cada grupo.")
+        parser.add_argument('--desde', type=_fecha, help="Primera fecha a usar (AAAA-MM-DD).")
+        parser.add_argument('--dry-run', action='store_true', help="Solo muestra la llave, no la guarda.")
+
+    def handle(self, *args, **options):
+        campeonato = Campeonato.objects.select_related('deporte', 'tipo_campeonato').filter(pk=options['campeonato']).first()
+        if campeonato is None:
+            raise CommandError(f"No existe el campeonato {options['campeonato']}.")
+        try:
+            if options['grupos']:
+                sembrados = sembrar_desde_grupos(campeonato, options['grupos'])
+            else:
+                sembrados = sembrar_por_posiciones(campeonato)
+            cruces, partidos = generar_llave(campeonato, sembrados, options['lugares'], options['horas'], options['desde'])
+        except ErrorLlave as error:
+            raise CommandError(str(error))
+
+        for cruce in cruces:
+            if cruce.ronda == 1:
+                self.stdout.write(f"Cruce {cruce.posicion + 1}: {cruce.equipo_local or 'pase libre'} vs {cruce.equipo_visitante or 'pase libre'}")
+        for partido in partidos:
+            self.stdout.write(
+                f"{partido.fecha:%Y-%m-%d} {partido.hora:%H:%M}  {partido.lugar}: "
+                f"{partido.equipo_local} vs {partido.equipo_visitante}"
+            )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(partidos)} partidos generados (no se guardaron)."))
+        else:
+            try:
+                guardar_llave(campeonato, cruces, partidos)
+            except ErrorLlave as error:
+                raise CommandError(str(error))
+            self.stdout.write(self.style.SUCCESS(f"Llave armada: {len(partidos)} partidos creados."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacion import ErrorImportacion, importar_estadisticas, leer_filas
+from core.models import Campeonato
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa estadísticas de jugadores desde un archivo CSV o XLSX (columnas: campeonato, jugador "
+        "y las de la tabla del deporte). Crea o actualiza una fila por jugador y campeonato."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo .csv o .xlsx")
+        parser.add_argument('--campeonato', type=int, help="ID del campeonato de todas las filas (la columna campeonato no hace falta).")
+
+    def handle(self, *args, **options):
+        campeonato = None
+        if options['campeonato']:
+            campeonato = Campeonato.objects.filter(pk=options['campeonato']).first()
+            if campeonato is None:
+                raise CommandError(f"No existe el campeonato {options['campeonato']}.")
+
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_estadisticas(leer_filas(archivo, options['archivo']), campeonato)
+        except (OSError, ErrorImportacion) as error:
+            raise CommandError(str(error))
+
+        for linea, mensaje in resultado.errores:
+            self.stdout.write(self.style.WARNING(f"Línea {linea}: {mensaje}"))
+        if resultado.cantidad_errores > len(resultado.errores):
+            self.stdout.write(self.style.WARNING(f"... y {resultado.cantidad_errores - len(resultado.errores)} errores más."))
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.filas} filas leídas: {resultado.guardadas} guardadas, {resultado.cantidad_errores} con errores."
+        ))
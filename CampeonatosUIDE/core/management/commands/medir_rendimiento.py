@@ -0,0 +1,163 @@
+import datetime
+import json
+import statistics
+
+import django
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+
+from core import views
+from core.instrumentacion import medir_bloque
+from core.models import Campeonato, Equipo, EstadisticaJugadorFutbol, Jugador, Pago, Partido, Posicion, Usuario
+
+
+# Equipos a los que se les calcula puntos_totales en cada repetición
+EQUIPOS_PUNTOS = 20
+# Listados del admin que se miden
+MODELOS_ADMIN = (Campeonato, Equipo, Jugador, Partido, Pago, Posicion, EstadisticaJugadorFutbol)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide tiempo y cantidad de consultas SQL de las vistas y listados más usados "
+        "y guarda los resultados en JSON para comparar entre ejecuciones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5, help="Veces que se ejecuta cada caso.")
+        parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados.")
+        parser.add_argument('--comparar', help="Archivo JSON de una ejecución anterior para mostrar las diferencias.")
+        parser.add_argument(
+            '--sin-cache', action='store_true',
+            help="Vacía la caché antes de cada repetición (mide siempre el camino sin caché).",
+        )
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1:
+            raise CommandError("--repeticiones debe ser al menos 1.")
+        casos = self.casos()
+        if not casos:
+            raise CommandError("La base no tiene datos. Ejecuta antes: python manage.py poblar_datos")
+
+        cache.clear()
+        resultados = {}
+        for nombre, caso in casos.items():
+            mediciones = []
+            for _ in range(options['repeticiones']):
+                if options['sin_cache']:
+                    cache.clear()
+                with medir_bloque() as medicion:
+                    caso()
+                    duracion = medicion.tiempo_total
+                mediciones.append((duracion, medicion))
+            resultados[nombre] = self.resumen(mediciones)
+
+        datos = {
+            'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+            'django': django.get_version(),
+            'base_de_datos': connection.vendor,
+            'repeticiones': options['repeticiones'],
+            'sin_cache': options['sin_cache'],
+            'escala': {
+                'campeonatos': Campeonato.objects.count(),
+                'equipos': Equipo.objects.count(),
+                'jugadores': Jugador.objects.count(),
+                'partidos': Partido.objects.count(),
+            },
+            'resultados': resultados,
+        }
+        anteriores = self.leer_anteriores(options['comparar'])
+        self.mostrar(resultados, anteriores)
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(datos, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+
+    # Casos a medir: {nombre: función sin argumentos}
+    def casos(self):
+        campeonato = Campeonato.objects.annotate(total=Count('equipos')).order_by('-total', 'pk').first()
+        equipo = Equipo.objects.annotate(total=Count('jugadores')).order_by('-total', 'pk').first()
+        if campeonato is None or equipo is None:
+            return {}
+
+        fabrica = RequestFactory()
+        # Superusuario en memoria: los permisos de un superusuario activo no consultan la base
+        administrador = Usuario(username='medicion', rol='ADMIN', is_staff=True, is_superuser=True, is_active=True)
+
+        def peticion(ruta, usuario):
+            request = fabrica.get(ruta)
+            request.user = usuario
+            return request
+
+        def vista(funcion, ruta, usuario, **kwargs):
+            def caso():
+                respuesta = funcion(peticion(ruta, usuario), **kwargs)
+                if hasattr(respuesta, 'render'):
+                    respuesta.render()
+            return caso
+
+        def puntos_totales():
+            for fila in Equipo.objects.select_related('campeonato__deporte').order_by('pk')[:EQUIPOS_PUNTOS]:
+                fila.puntos_totales
+
+        casos = {
+            'vista_inicio': vista(views.vista_inicio, '/panel/', administrador),
+            'vista_inicio_publico': vista(views.vista_inicio_publico, '/', AnonymousUser()),
+            'tabla_campeonato': vista(views.tabla_campeonato, f'/campeonato/{campeonato.pk}/tabla/', AnonymousUser(), id=campeonato.pk),
+            'clasificaciones': vista(views.clasificaciones, f'/campeonato/{campeonato.pk}/estadisticas/', AnonymousUser(), id=campeonato.pk),
+            'detalle_equipo': vista(views.detalle_equipo, f'/equipo/{equipo.pk}/', administrador, id=equipo.pk),
+            f'puntos_totales_x{EQUIPOS_PUNTOS}': puntos_totales,
+        }
+        for modelo in MODELOS_ADMIN:
+            modelo_admin = admin.site._registry[modelo]
+            opciones = modelo._meta
+            ruta = f'/admin/{opciones.app_label}/{opciones.model_name}/'
+            casos[f'admin:{opciones.model_name}_changelist'] = vista(modelo_admin.changelist_view, ruta, administrador)
+        return casos
+
+    def resumen(self, mediciones):
+        tiempos = [duracion * 1000 for duracion, _ in mediciones]
+        ultima = mediciones[-1][1]
+        return {
+            # La primera repetición encuentra la caché vacía; la última, la caché llena
+            'consultas_primera': mediciones[0][1].consultas,
+            'consultas': ultima.consultas,
+            'repetidas': len(ultima.duplicadas),
+            'tiempo_ms': {
+                'min': round(min(tiempos), 2),
+                'mediana': round(statistics.median(tiempos), 2),
+                'max': round(max(tiempos), 2),
+            },
+            'tiempo_sql_ms': round(statistics.median(medicion.tiempo_sql * 1000 for _, medicion in mediciones), 2),
+        }
+
+    def leer_anteriores(self, ruta):
+        if not ruta:
+            return {}
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                return json.load(archivo)['resultados']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f"No se pudo leer {ruta}: {error}")
+
+    def mostrar(self, resultados, anteriores):
+        self.stdout.write(f"{'Caso':<42} {'Consultas':>14} {'Mediana ms':>11} {'SQL ms':>8}  Comparación")
+        for nombre, resultado in resultados.items():
+            consultas = f"{resultado['consultas_primera']}/{resultado['consultas']}"
+            comparacion = ''
+            anterior = anteriores.get(nombre)
+            if anterior:
+                mediana_anterior = anterior['tiempo_ms']['mediana']
+                cambio = (resultado['tiempo_ms']['mediana'] - mediana_anterior) / mediana_anterior * 100 if mediana_anterior else 0
+                comparacion = f"consultas {anterior['consultas_primera']}/{anterior['consultas']}, tiempo {cambio:+.0f}%"
+                if resultado['consultas_primera'] > anterior['consultas_primera'] or resultado['consultas'] > anterior['consultas']:
+                    comparacion = self.style.WARNING(comparacion)
+            self.stdout.write(
+                f"{nombre:<42} {consultas:>14} {resultado['tiempo_ms']['mediana']:>11.2f} {resultado['tiempo_sql_ms']:>8.2f}  {comparacion}"
+            )
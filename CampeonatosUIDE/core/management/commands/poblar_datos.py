@@ -0,0 +1,163 @@
+import datetime
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+
+from core.models import (
+    Arbitro, Campeonato, Carrera, Deporte, Equipo, FranjaEquipo, Jugador, Pago, Partido, Usuario,
+    ESTADISTICAS_POR_DEPORTE, EstadisticaJugadorFutbol, clave_lugar,
+)
+from core.calendarios import marcar_cambio_calendarios
+from core.estadisticas import actualizar_tras_carga_masiva
+from core.fixture import rondas_todos_contra_todos
+from core.versiones import marcar_cambio
+
+
+# Deportes que se crean si la base no tiene ninguno
+DEPORTES = ['Fútbol', 'Básquet', 'Ajedrez', 'Ecuaboly', 'Ping Pong', 'Tenis', 'Futbolín', 'Videojuegos']
+
+# Estados que se reparten entre los campeonatos generados (la mayoría en curso)
+ESTADOS = ['EN_CURSO', 'EN_CURSO', 'FINALIZADO', 'INSCRIPCION']
+CARRERAS = 5
+ARBITROS = 10
+LUGARES = ['Cancha 1', 'Cancha 2', 'Coliseo', 'Sala de juegos']
+# Tamaño de los lotes de bulk_create
+LOTE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Llena la base con datos de prueba a la escala indicada: campeonatos de todos los deportes, "
+        "equipos con plantillas completas, partidos todos contra todos y estadísticas de jugadores."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campeonatos', type=int, default=8, help="Cantidad de campeonatos (se reparten entre los deportes).")
+        parser.add_argument('--equipos', type=int, default=10, help="Equipos por campeonato.")
+        parser.add_argument('--jugadores', type=int, default=11, help="Jugadores por equipo.")
+        parser.add_argument('--prefijo', default='demo', help="Prefijo de nombres y usuarios generados (para poblar varias veces).")
+        parser.add_argument('--semilla', type=int, default=1, help="Semilla aleatoria (misma semilla, mismos datos).")
+
+    def handle(self, *args, **options):
+        prefijo = options['prefijo']
+        if Usuario.objects.filter(username__startswith=f"{prefijo}_").exists():
+            raise CommandError(f"Ya hay datos con el prefijo '{prefijo}'. Usa otro con --prefijo.")
+        self.azar = random.Random(options['semilla'])
+
+        with transaction.atomic():
+            deportes = self.deportes()
+            carreras = [Carrera.objects.get_or_create(nombre=f"Carrera {numero}")[0] for numero in range(1, CARRERAS + 1)]
+            arbitros = self.arbitros(prefijo, deportes)
+
+            delegados = Usuario.objects.bulk_create([
+                Usuario(username=f"{prefijo}_delegado_{numero}", password='!', rol='DELEGADO')
+                for numero in range(options['campeonatos'])
+            ])
+            campeonatos = Campeonato.objects.bulk_create([
+                self.campeonato(prefijo, numero, deportes[numero % len(deportes)], delegados[numero], options['jugadores'])
+                for numero in range(options['campeonatos'])
+            ])
+            equipos = Equipo.objects.bulk_create([
+                Equipo(
+                    campeonato=campeonato, nombre=f"Equipo {numero + 1}", carrera=carreras[numero % len(carreras)],
+                    delegado=campeonato.delegado, aprobado=True,
+                )
+                for campeonato in campeonatos for numero in range(options['equipos'])
+            ], batch_size=LOTE)
+            Pago.objects.bulk_create([Pago(equipo=equipo, metodo='EFECTIVO', estado='APROBADO') for equipo in equipos], batch_size=LOTE)
+
+            jugadores = self.jugadores(prefijo, equipos, options['jugadores'])
+            partidos = self.partidos(campeonatos, equipos, arbitros)
+            estadisticas = self.estadisticas(jugadores)
+
+            # bulk_create no dispara señales: la tabla, los totales y las versiones de caché se actualizan aquí
+            actualizar_tras_carga_masiva(campeonato.pk for campeonato in campeonatos)
+            marcar_cambio('campeonatos')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Creados {len(campeonatos)} campeonatos, {len(equipos)} equipos, {len(jugadores)} jugadores, "
+            f"{partidos} partidos y {estadisticas} filas de estadísticas."
+        ))
+
+    def deportes(self):
+        if not Deporte.objects.exists():
+            for nombre in DEPORTES:
+                Deporte.objects.create(nombre=nombre)
+        return list(Deporte.objects.order_by('nombre'))
+
+    def arbitros(self, prefijo, deportes):
+        arbitros = Arbitro.objects.bulk_create([
+            Arbitro(nombre=prefijo, apellido=f"Árbitro {numero + 1}", experiencia="Generado", contacto="-")
+            for numero in range(ARBITROS)
+        ])
+        Relacion = Arbitro.deportes.through
+        Relacion.objects.bulk_create([Relacion(arbitro=arbitro, deporte=deporte) for arbitro in arbitros for deporte in deportes])
+        return arbitros
+
+    def campeonato(self, prefijo, numero, deporte, delegado, jugadores):
+        inicio = datetime.date.today() - datetime.timedelta(weeks=self.azar.randint(0, 20))
+        return Campeonato(
+            nombre=f"{prefijo} {deporte.nombre} {numero + 1}", descripcion="Campeonato generado para pruebas",
+            fecha_inicio=inicio, fecha_fin=inicio + datetime.timedelta(weeks=30),
+            estado=ESTADOS[numero % len(ESTADOS)], deporte=deporte, delegado=delegado,
+            dias_partido=['SABADO'], max_jugadores_por_equipo=jugadores,
+        )
+
+    def jugadores(self, prefijo, equipos, por_equipo):
+        plantillas = [(equipo, numero) for equipo in equipos for numero in range(1, por_equipo + 1)]
+        usuarios = Usuario.objects.bulk_create([
+            Usuario(
+                username=f"{prefijo}_jugador_{equipo.pk}_{numero}", password='!', rol='JUGADOR',
+                first_name=f"Jugador {numero}", last_name=equipo.nombre, carrera=equipo.carrera,
+            )
+            for equipo, numero in plantillas
+        ], batch_size=LOTE)
+        return Jugador.objects.bulk_create([
+            Jugador(equipo=equipo, usuario=usuario, numero_camiseta=numero, edad=self.azar.randint(17, 30))
+            for (equipo, numero), usuario in zip(plantillas, usuarios)
+        ], batch_size=LOTE)
+
+    # Partidos todos contra todos, una jornada por semana; las jornadas ya pasadas quedan finalizadas
+    def partidos(self, campeonatos, equipos, arbitros):
+        por_campeonato = {}
+        for equipo in equipos:
+            por_campeonato.setdefault(equipo.campeonato_id, []).append(equipo)
+        hoy = datetime.date.today()
+        partidos = []
+        for campeonato in campeonatos:
+            # Primer sábado del campeonato
+            fecha = campeonato.fecha_inicio + datetime.timedelta(days=(5 - campeonato.fecha_inicio.weekday()) % 7)
+            for jornada in rondas_todos_contra_todos(por_campeonato[campeonato.pk]):
+                for turno, (local, visitante) in enumerate(jornada):
+                    jugado = fecha < hoy and campeonato.estado != 'INSCRIPCION'
+                    lugar = LUGARES[turno % len(LUGARES)]
+                    partidos.append(Partido(
+                        campeonato=campeonato, equipo_local=local, equipo_visitante=visitante,
+                        fecha=fecha, hora=datetime.time(8 + turno // len(LUGARES)),
+                        lugar=lugar, lugar_clave=clave_lugar(lugar), arbitro=self.azar.choice(arbitros),
+                        estado='FINALIZADO' if jugado else 'PROGRAMADO',
+                        resultado_local=self.azar.randint(0, 5) if jugado else None,
+                        resultado_visitante=self.azar.randint(0, 5) if jugado else None,
+                    ))
+                fecha += datetime.timedelta(weeks=1)
+        Partido.objects.bulk_create(partidos, batch_size=LOTE)
+        FranjaEquipo.objects.bulk_create([franja for partido in partidos for franja in partido.franjas()], batch_size=LOTE)
+        marcar_cambio_calendarios(*partidos)
+        return len(partidos)
+
+    # Una fila de estadísticas por jugador en la tabla del deporte de su campeonato;
+    # los deportes sin tabla propia (creados a mano) usan la de fútbol
+    def estadisticas(self, jugadores):
+        filas = {}
+        for jugador in jugadores:
+            campeonato = jugador.equipo.campeonato
+            modelo = ESTADISTICAS_POR_DEPORTE.get(campeonato.deporte.codigo, EstadisticaJugadorFutbol)
+            valores = {
+                campo.name: self.azar.randint(0, 10)
+                for campo in modelo._meta.concrete_fields if isinstance(campo, models.PositiveIntegerField)
+            }
+            filas.setdefault(modelo, []).append(modelo(campeonato=campeonato, jugador=jugador, **valores))
+        for modelo, lote in filas.items():
+            modelo.objects.bulk_create(lote, batch_size=LOTE)
+        return sum(len(lote) for lote in filas.values())
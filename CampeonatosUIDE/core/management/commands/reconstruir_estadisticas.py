@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core.eventos import acumular_eventos, reconstruir_desde_eventos
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula las estadísticas de los jugadores y los marcadores a partir del registro de eventos "
+        "de los partidos, leyéndolo una sola vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--campeonato', type=int, action='append', dest='campeonatos',
+            help="ID del campeonato a reconstruir (se puede repetir). Por defecto, todos los que tienen eventos.",
+        )
+        parser.add_argument(
+            '--pendientes', action='store_true',
+            help="Solo acumula los eventos que todavía no se aplicaron, sin reconstruir.",
+        )
+
+    def handle(self, *args, **options):
+        if options['pendientes']:
+            total = acumular_eventos()
+            self.stdout.write(self.style.SUCCESS(f"Eventos pendientes acumulados: {total}."))
+            return
+
+        leidos, campeonatos = reconstruir_desde_eventos(options['campeonatos'])
+        self.stdout.write(self.style.SUCCESS(f"Estadísticas reconstruidas: {leidos} eventos en {campeonatos} campeonatos."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Campeonato
+from core.posiciones import reconstruir_posiciones
+
+
+class Command(BaseCommand):
+    help = "Reconstruye desde cero la tabla de posiciones (y las tablas guardadas por jornada) a partir de los partidos y las estadísticas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--campeonato', type=int, action='append', dest='campeonatos',
+            help="ID del campeonato a reconstruir (se puede repetir). Por defecto se reconstruyen todos.",
+        )
+
+    def handle(self, *args, **options):
+        campeonatos = Campeonato.objects.select_related('deporte')
+        if options['campeonatos']:
+            campeonatos = campeonatos.filter(pk__in=options['campeonatos'])
+
+        total = reconstruir_posiciones(campeonatos)
+        self.stdout.write(self.style.SUCCESS(f"Tabla de posiciones reconstruida: {total} equipos."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.estadisticas import sincronizar_estadisticas
+
+
+class Command(BaseCommand):
+    help = "Vuelve a copiar las estadísticas de las tablas de cada deporte a la tabla común de estadísticas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--campeonato', type=int, action='append', dest='campeonatos',
+            help="ID del campeonato a sincronizar (se puede repetir). Por defecto se sincronizan todos.",
+        )
+
+    def handle(self, *args, **options):
+        filas = sincronizar_estadisticas(options['campeonatos'])
+        self.stdout.write(self.style.SUCCESS(f"{filas} filas de estadísticas copiadas a la tabla común."))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.grupos import ErrorSorteo, bombos_por_nombre, guardar_grupos, sortear_grupos
+from core.models import Campeonato
+
+
+class Command(BaseCommand):
+    help = (
+        "Sortea los equipos aprobados de un campeonato en grupos, con bombos y separando carreras "
+        "cuando se puede, y guarda el grupo de cada equipo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('campeonato', type=int, help="ID del campeonato")
+        parser.add_argument('grupos', type=int, help="Cantidad de grupos")
+        parser.add_argument(
+            '--bombo', action='append', dest='bombos', default=[],
+            help="Nombres de los equipos de un bombo separados por comas (se puede repetir; el orden es el de los bombos).",
+        )
+        parser.add_argument('--sin-separar-carreras', action='store_true', help="Permite equipos de la misma carrera en un grupo.")
+        parser.add_argument('--tamanio-maximo', type=int, help="Equipos por grupo como máximo.")
+        parser.add_argument('--semilla', type=int, help="Semilla del sorteo (la misma semilla repite el sorteo).")
+        parser.add_argument('--dry-run', action='store_true', help="Solo muestra el sorteo, no lo guarda.")
+
+    def handle(self, *args, **options):
+        campeonato = Campeonato.objects.filter(pk=options['campeonato']).first()
+        if campeonato is None:
+            raise CommandError(f"No existe el campeonato {options['campeonato']}.")
+        try:
+            bombos = bombos_por_nombre(campeonato, [bombo.split(',') for bombo in options['bombos']])
+            grupos = sortear_grupos(
+                bombos, options['grupos'], not options['sin_separar_carreras'],
+                options['tamanio_maximo'], options['semilla'],
+            )
+        except ErrorSorteo as error:
+            raise CommandError(str(error))
+
+        for nombre, equipos in grupos.items():
+            self.stdout.write(f"Grupo {nombre}: " + ", ".join(f"{equipo} ({equipo.carrera})" for equipo in equipos))
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("Sorteo sin guardar."))
+        else:
+            guardar_grupos(campeonato, grupos)
+            self.stdout.write(self.style.SUCCESS(f"{sum(len(equipos) for equipos in grupos.values())} equipos asignados a {len(grupos)} grupos."))
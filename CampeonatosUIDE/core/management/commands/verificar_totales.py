@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core.contadores import verificar_totales
+
+
+class Command(BaseCommand):
+    help = "Compara los totales de goles y tarjetas de cada equipo con las estadísticas de sus jugadores y, con --reparar, los corrige."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--equipo', type=int, action='append', dest='equipos',
+            help="ID del equipo a verificar (se puede repetir). Por defecto se verifican todos.",
+        )
+        parser.add_argument('--reparar', action='store_true', help="Corrige los totales que no coinciden.")
+
+    def handle(self, *args, **options):
+        diferencias = verificar_totales(options['equipos'], reparar=options['reparar'])
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS("Los totales de todos los equipos coinciden."))
+            return
+
+        for equipo_id, campos in diferencias.items():
+            if None in campos:
+                self.stdout.write(f"Equipo {equipo_id}: no tiene fila de totales")
+                continue
+            detalle = ', '.join(f"{campo} guardado {guardado}, real {real}" for campo, (guardado, real) in campos.items())
+            self.stdout.write(f"Equipo {equipo_id}: {detalle}")
+
+        if options['reparar']:
+            self.stdout.write(self.style.SUCCESS(f"Totales corregidos en {len(diferencias)} equipos."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(diferencias)} equipos con diferencias. Ejecuta con --reparar para corregirlos."))
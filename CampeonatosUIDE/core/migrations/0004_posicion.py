@@ -0,0 +1,148 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:40
+
+import unicodedata
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copia de las reglas de core/puntuacion.py: (victoria, empate, derrota) de los deportes que
+# puntúan por resultados y (tabla, {columna: factor}) de los que puntúan por estadísticas
+PUNTOS_RESULTADO = {"FUTBOL": (3, 1, 0), "BASQUET": (2, 0, 1)}
+PUNTOS_ESTADISTICAS = {
+    "AJEDREZ": ("EstadisticaJugadorAjedrez", {"partidas_ganadas": 1, "partidas_empatadas": Decimal("0.5")}),
+    "ECUABOLY": ("EstadisticaJugadorEcuaboly", {"sets_ganados": 1}),
+    "PING_PONG": ("EstadisticaJugadorPingPong", {"partidos_ganados": 3}),
+    "TENIS": ("EstadisticaJugadorTenis", {"sets_ganados": 1}),
+    "FUTBOLIN": ("EstadisticaJugadorFutbolin", {"partidos_ganados": 3}),
+    "VIDEOJUEGOS": ("EstadisticaJugadorVideojuegos", {"partidas_ganadas": 3}),
+}
+
+
+def _codigo(nombre):
+    # Misma normalización que core.models.codigo_deporte (Deporte.codigo llega en 0005)
+    sin_tildes = unicodedata.normalize("NFKD", nombre).encode("ascii", "ignore").decode("ascii")
+    return "_".join("".join(c if c.isalnum() else " " for c in sin_tildes).upper().split())
+
+
+def crear_posiciones(apps, schema_editor):
+    # Una fila por equipo existente con la tabla calculada desde sus partidos finalizados
+    # (igual que core.posiciones.calcular_tabla), así las señales solo suman diferencias
+    Equipo = apps.get_model("core", "Equipo")
+    Partido = apps.get_model("core", "Partido")
+    Posicion = apps.get_model("core", "Posicion")
+
+    codigos = {}
+    filas = {}
+    for equipo_id, campeonato_id, deporte in Equipo.objects.values_list("pk", "campeonato_id", "campeonato__deporte__nombre"):
+        codigos[campeonato_id] = _codigo(deporte)
+        filas[equipo_id] = Posicion(equipo_id=equipo_id, campeonato_id=campeonato_id)
+
+    partidos = Partido.objects.filter(
+        estado="FINALIZADO", resultado_local__isnull=False, resultado_visitante__isnull=False,
+    ).values_list("campeonato_id", "equipo_local_id", "equipo_visitante_id", "resultado_local", "resultado_visitante")
+    for campeonato_id, local_id, visitante_id, goles_local, goles_visitante in partidos:
+        puntos = PUNTOS_RESULTADO.get(codigos.get(campeonato_id))
+        for equipo_id, propios, rival in ((local_id, goles_local, goles_visitante), (visitante_id, goles_visitante, goles_local)):
+            fila = filas.get(equipo_id)
+            if fila is None or fila.campeonato_id != campeonato_id:
+                continue
+            fila.partidos_jugados += 1
+            fila.partidos_ganados += propios > rival
+            fila.partidos_empatados += propios == rival
+            fila.partidos_perdidos += propios < rival
+            fila.goles_favor += propios
+            fila.goles_contra += rival
+            fila.diferencia_goles += propios - rival
+            if puntos:
+                fila.puntos += puntos[0] if propios > rival else puntos[1] if propios == rival else puntos[2]
+
+    campeonatos = defaultdict(list)
+    for campeonato_id, codigo in codigos.items():
+        if codigo in PUNTOS_ESTADISTICAS:
+            campeonatos[codigo].append(campeonato_id)
+    for codigo, campeonato_ids in campeonatos.items():
+        modelo, factores = PUNTOS_ESTADISTICAS[codigo]
+        columnas = list(factores)
+        estadisticas = apps.get_model("core", modelo).objects.filter(campeonato_id__in=campeonato_ids)
+        for campeonato_id, equipo_id, *valores in estadisticas.values_list("campeonato_id", "jugador__equipo_id", *columnas):
+            fila = filas.get(equipo_id)
+            if fila is not None and fila.campeonato_id == campeonato_id:
+                fila.puntos += sum(Decimal(factores[columna]) * valor for columna, valor in zip(columnas, valores))
+
+    Posicion.objects.bulk_create(filas.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_alter_estadisticabasquet_unique_together_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Posicion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "puntos",
+                    models.DecimalField(decimal_places=1, default=0, max_digits=7),
+                ),
+                ("partidos_jugados", models.PositiveIntegerField(default=0)),
+                ("partidos_ganados", models.PositiveIntegerField(default=0)),
+                ("partidos_empatados", models.PositiveIntegerField(default=0)),
+                ("partidos_perdidos", models.PositiveIntegerField(default=0)),
+                ("goles_favor", models.PositiveIntegerField(default=0)),
+                ("goles_contra", models.PositiveIntegerField(default=0)),
+                ("diferencia_goles", models.IntegerField(default=0)),
+                (
+                    "campeonato",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="posiciones",
+                        to="core.campeonato",
+                    ),
+                ),
+                (
+                    "equipo",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="posicion",
+                        to="core.equipo",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Posición",
+                "verbose_name_plural": "Tabla de posiciones",
+                "ordering": (
+                    "campeonato",
+                    "-puntos",
+                    "-diferencia_goles",
+                    "-goles_favor",
+                ),
+                "indexes": [
+                    models.Index(
+                        fields=[
+                            "campeonato",
+                            "-puntos",
+                            "-diferencia_goles",
+                            "-goles_favor",
+                        ],
+                        name="posicion_tabla_idx",
+                    )
+                ],
+                "unique_together": {("campeonato", "equipo")},
+            },
+        ),
+        migrations.RunPython(crear_posiciones, migrations.RunPython.noop),
+    ]
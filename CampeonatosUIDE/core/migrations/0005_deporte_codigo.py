@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:43
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def asignar_codigos(apps, schema_editor):
+    # Misma normalización que core.models.codigo_deporte
+    Deporte = apps.get_model("core", "Deporte")
+    for deporte in Deporte.objects.filter(codigo=""):
+        sin_tildes = unicodedata.normalize("NFKD", deporte.nombre).encode("ascii", "ignore").decode("ascii")
+        deporte.codigo = "_".join(
+            "".join(c if c.isalnum() else " " for c in sin_tildes).upper().split()
+        )
+        deporte.save(update_fields=["codigo"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_posicion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="deporte",
+            name="codigo",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="Ej: FUTBOL, AJEDREZ, PING_PONG",
+                max_length=30,
+            ),
+        ),
+        migrations.RunPython(asignar_codigos, migrations.RunPython.noop),
+    ]
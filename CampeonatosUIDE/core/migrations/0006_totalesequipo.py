@@ -0,0 +1,79 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def crear_totales(apps, schema_editor):
+    # Una fila por equipo con la suma de las estadísticas de sus jugadores
+    Equipo = apps.get_model("core", "Equipo")
+    TotalesEquipo = apps.get_model("core", "TotalesEquipo")
+    futbol = apps.get_model("core", "EstadisticaJugadorFutbol")
+    futbolin = apps.get_model("core", "EstadisticaJugadorFutbolin")
+
+    totales = {
+        equipo_id: TotalesEquipo(equipo_id=equipo_id)
+        for equipo_id in Equipo.objects.values_list("pk", flat=True)
+    }
+    for fila in (
+        futbol.objects.values("jugador__equipo_id")
+        .order_by()
+        .annotate(
+            goles=Sum("goles"),
+            tarjetas_amarillas=Sum("tarjetas_amarillas"),
+            tarjetas_rojas=Sum("tarjetas_rojas"),
+        )
+    ):
+        fila_totales = totales[fila["jugador__equipo_id"]]
+        fila_totales.goles = fila["goles"] or 0
+        fila_totales.tarjetas_amarillas = fila["tarjetas_amarillas"] or 0
+        fila_totales.tarjetas_rojas = fila["tarjetas_rojas"] or 0
+    for fila in (
+        futbolin.objects.values("jugador__equipo_id")
+        .order_by()
+        .annotate(goles=Sum("goles"))
+    ):
+        totales[fila["jugador__equipo_id"]].goles_futbolin = fila["goles"] or 0
+    TotalesEquipo.objects.bulk_create(totales.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_deporte_codigo"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TotalesEquipo",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("goles", models.IntegerField(default=0)),
+                ("tarjetas_amarillas", models.IntegerField(default=0)),
+                ("tarjetas_rojas", models.IntegerField(default=0)),
+                ("goles_futbolin", models.IntegerField(default=0)),
+                (
+                    "equipo",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="totales",
+                        to="core.equipo",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Totales del equipo",
+                "verbose_name_plural": "Totales de equipos",
+            },
+        ),
+        migrations.RunPython(crear_totales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_totalesequipo"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventoPartido",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("GOL", "Gol"),
+                            ("AMARILLA", "Tarjeta amarilla"),
+                            ("ROJA", "Tarjeta roja"),
+                            ("CANASTA", "Canasta"),
+                            ("REBOTE", "Rebote"),
+                            ("ASISTENCIA", "Asistencia"),
+                            ("SET_GANADO", "Set ganado"),
+                            ("SET_PERDIDO", "Set perdido"),
+                            ("PARTIDA_GANADA", "Partida ganada"),
+                            ("PARTIDA_EMPATADA", "Partida empatada"),
+                            ("PARTIDA_PERDIDA", "Partida perdida"),
+                            ("PARTIDO_GANADO", "Partido ganado"),
+                            ("PARTIDO_PERDIDO", "Partido perdido"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("valor", models.IntegerField(default=1)),
+                ("minuto", models.PositiveIntegerField(blank=True, null=True)),
+                ("creado", models.DateTimeField(auto_now_add=True)),
+                ("aplicado", models.BooleanField(default=False, editable=False)),
+                (
+                    "jugador",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="eventos",
+                        to="core.jugador",
+                    ),
+                ),
+                (
+                    "partido",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="eventos",
+                        to="core.partido",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Evento de partido",
+                "verbose_name_plural": "Eventos de partidos",
+                "ordering": ("partido", "creado", "id"),
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("aplicado", False)),
+                        fields=["partido"],
+                        name="evento_pendiente_idx",
+                    )
+                ],
+            },
+        ),
+    ]
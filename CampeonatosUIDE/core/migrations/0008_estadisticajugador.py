@@ -0,0 +1,147 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Columnas de cada tabla por deporte en la tabla común (copia fija de core/estadisticas.py
+# al momento de crear la migración)
+COLUMNAS_COMUNES = {
+    "EstadisticaJugadorFutbol": {
+        "partidos_jugados": "jugados",
+        "goles": "goles",
+        "tarjetas_amarillas": "tarjetas_amarillas",
+        "tarjetas_rojas": "tarjetas_rojas",
+    },
+    "EstadisticaJugadorBasquet": {
+        "partidos_jugados": "jugados",
+        "canastas": "canastas",
+        "rebotes": "rebotes",
+        "asistencias": "asistencias",
+    },
+    "EstadisticaJugadorAjedrez": {
+        "partidas_jugadas": "jugados",
+        "partidas_ganadas": "ganados",
+        "partidas_empatadas": "empatados",
+        "partidas_perdidas": "perdidos",
+    },
+    "EstadisticaJugadorEcuaboly": {
+        "partidos_jugados": "jugados",
+        "sets_ganados": "sets_ganados",
+        "sets_perdidos": "sets_perdidos",
+    },
+    "EstadisticaJugadorPingPong": {
+        "partidos_jugados": "jugados",
+        "partidos_ganados": "ganados",
+        "partidos_perdidos": "perdidos",
+    },
+    "EstadisticaJugadorTenis": {
+        "partidos_jugados": "jugados",
+        "sets_ganados": "sets_ganados",
+        "sets_perdidos": "sets_perdidos",
+    },
+    "EstadisticaJugadorVideojuegos": {
+        "partidas_jugadas": "jugados",
+        "partidas_ganadas": "ganados",
+        "partidas_perdidas": "perdidos",
+    },
+    "EstadisticaJugadorFutbolin": {
+        "partidos_jugados": "jugados",
+        "partidos_ganados": "ganados",
+        "partidos_perdidos": "perdidos",
+        "goles": "goles",
+    },
+}
+
+
+def copiar_estadisticas(apps, schema_editor):
+    # Una fila común por cada fila de las tablas por deporte, leídas y escritas por bloques
+    EstadisticaJugador = apps.get_model("core", "EstadisticaJugador")
+    for nombre, columnas in COLUMNAS_COMUNES.items():
+        modelo = apps.get_model("core", nombre)
+        filas = (
+            modelo.objects.order_by()
+            .values("campeonato_id", "jugador_id", *columnas)
+            .iterator(chunk_size=1000)
+        )
+        lote = []
+        for fila in filas:
+            lote.append(
+                EstadisticaJugador(
+                    campeonato_id=fila["campeonato_id"],
+                    jugador_id=fila["jugador_id"],
+                    **{comun: fila[columna] for columna, comun in columnas.items()},
+                )
+            )
+            if len(lote) >= 1000:
+                EstadisticaJugador.objects.bulk_create(
+                    lote,
+                    update_conflicts=True,
+                    unique_fields=["campeonato", "jugador"],
+                    update_fields=list(columnas.values()),
+                )
+                lote = []
+        if lote:
+            EstadisticaJugador.objects.bulk_create(
+                lote,
+                update_conflicts=True,
+                unique_fields=["campeonato", "jugador"],
+                update_fields=list(columnas.values()),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_eventopartido"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EstadisticaJugador",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("jugados", models.PositiveIntegerField(default=0)),
+                ("ganados", models.PositiveIntegerField(default=0)),
+                ("empatados", models.PositiveIntegerField(default=0)),
+                ("perdidos", models.PositiveIntegerField(default=0)),
+                ("goles", models.PositiveIntegerField(default=0)),
+                ("tarjetas_amarillas", models.PositiveIntegerField(default=0)),
+                ("tarjetas_rojas", models.PositiveIntegerField(default=0)),
+                ("canastas", models.PositiveIntegerField(default=0)),
+                ("rebotes", models.PositiveIntegerField(default=0)),
+                ("asistencias", models.PositiveIntegerField(default=0)),
+                ("sets_ganados", models.PositiveIntegerField(default=0)),
+                ("sets_perdidos", models.PositiveIntegerField(default=0)),
+                (
+                    "campeonato",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="estadisticas",
+                        to="core.campeonato",
+                    ),
+                ),
+                (
+                    "jugador",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="estadisticas",
+                        to="core.jugador",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Estadística de jugador (todos los deportes)",
+                "verbose_name_plural": "Estadísticas de jugadores (todos los deportes)",
+                "unique_together": {("campeonato", "jugador")},
+            },
+        ),
+        migrations.RunPython(copiar_estadisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_estadisticajugador"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="suspension",
+            index=models.Index(
+                fields=["jugador", "fecha_inicio", "fecha_fin"],
+                name="suspension_vigente_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_suspension_vigente_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="suspension",
+            name="sanciones",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name="ReglaSuspension",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tarjeta",
+                    models.CharField(
+                        choices=[
+                            ("tarjetas_amarillas", "Tarjetas amarillas"),
+                            ("tarjetas_rojas", "Tarjetas rojas"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("cantidad", models.PositiveIntegerField(default=1)),
+                ("dias", models.PositiveIntegerField(default=7)),
+                ("activa", models.BooleanField(default=True)),
+                (
+                    "campeonato",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reglas_suspension",
+                        to="core.campeonato",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Regla de suspensión",
+                "verbose_name_plural": "Reglas de suspensión",
+                "unique_together": {("campeonato", "tarjeta", "cantidad")},
+            },
+        ),
+        migrations.AddField(
+            model_name="suspension",
+            name="regla",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="suspensiones",
+                to="core.reglasuspension",
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_reglasuspension"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrayectoriaUsuario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("campeonatos", models.PositiveIntegerField(default=0)),
+                ("titulos", models.PositiveIntegerField(default=0)),
+                ("campeonatos_ganados", models.JSONField(blank=True, default=list)),
+                ("jugados", models.PositiveIntegerField(default=0)),
+                ("ganados", models.PositiveIntegerField(default=0)),
+                ("goles", models.PositiveIntegerField(default=0)),
+                ("por_deporte", models.JSONField(blank=True, default=dict)),
+                ("por_anio", models.JSONField(blank=True, default=dict)),
+                ("actualizado", models.DateTimeField(auto_now=True)),
+                (
+                    "usuario",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trayectoria",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trayectoria de usuario",
+                "verbose_name_plural": "Trayectorias de usuarios",
+                "indexes": [
+                    models.Index(
+                        fields=["-titulos", "-ganados"], name="trayectoria_ranking_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_trayectoriausuario"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JornadaTabla",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fecha", models.DateField()),
+                ("filas", models.JSONField(default=list)),
+                (
+                    "campeonato",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="jornadas",
+                        to="core.campeonato",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tabla por jornada",
+                "verbose_name_plural": "Tablas por jornada",
+                "ordering": ("campeonato", "fecha"),
+                "unique_together": {("campeonato", "fecha")},
+            },
+        ),
+    ]
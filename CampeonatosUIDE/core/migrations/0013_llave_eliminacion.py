@@ -0,0 +1,102 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_jornadatabla"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="equipo",
+            name="grupo",
+            field=models.CharField(blank=True, default="", max_length=10),
+        ),
+        migrations.AddField(
+            model_name="tipocampeonato",
+            name="formato",
+            field=models.CharField(
+                choices=[
+                    ("LIGA", "Todos contra todos"),
+                    ("ELIMINACION", "Eliminación directa"),
+                    ("GRUPOS_ELIMINACION", "Fase de grupos y eliminación directa"),
+                ],
+                default="LIGA",
+                max_length=20,
+            ),
+        ),
+        migrations.CreateModel(
+            name="CruceLlave",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ronda", models.PositiveSmallIntegerField()),
+                ("posicion", models.PositiveSmallIntegerField()),
+                (
+                    "campeonato",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cruces",
+                        to="core.campeonato",
+                    ),
+                ),
+                (
+                    "equipo_local",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core.equipo",
+                    ),
+                ),
+                (
+                    "equipo_visitante",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core.equipo",
+                    ),
+                ),
+                (
+                    "ganador",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="core.equipo",
+                    ),
+                ),
+                (
+                    "partido",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="cruce",
+                        to="core.partido",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Cruce de llave",
+                "verbose_name_plural": "Cruces de llave",
+                "ordering": ("campeonato", "ronda", "posicion"),
+                "unique_together": {("campeonato", "ronda", "posicion")},
+            },
+        ),
+    ]
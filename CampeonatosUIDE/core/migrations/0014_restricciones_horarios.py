@@ -0,0 +1,142 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Cantidad máxima de choques que se listan en el error
+CHOQUES_LISTADOS = 20
+
+
+def _error_choques(titulo, choques):
+    lineas = "\n".join(f"  - {choque}" for choque in choques[:CHOQUES_LISTADOS])
+    if len(choques) > CHOQUES_LISTADOS:
+        lineas += f"\n  ... y {len(choques) - CHOQUES_LISTADOS} más"
+    return RuntimeError(
+        f"{titulo} Corrija la fecha, hora o lugar de estos partidos y vuelva a migrar:\n{lineas}"
+    )
+
+
+# Llena lugar_clave con la misma normalización que core.models.clave_lugar (sin espacios en los
+# extremos y con casefold). Si ya hay partidos en el mismo lugar, fecha y hora se listan para
+# corregirlos, en lugar de fallar con IntegrityError al crear partido_lugar_unico.
+def llenar_lugar_clave(apps, schema_editor):
+    Partido = apps.get_model("core", "Partido")
+    partidos = list(
+        Partido.objects.order_by("pk").only("campeonato_id", "fecha", "hora", "lugar")
+    )
+    ocupados, choques = {}, []
+    for partido in partidos:
+        partido.lugar_clave = partido.lugar.strip().casefold()
+        clave = (
+            partido.campeonato_id,
+            partido.fecha,
+            partido.hora,
+            partido.lugar_clave,
+        )
+        anterior = ocupados.setdefault(clave, partido.pk)
+        if anterior != partido.pk:
+            choques.append(
+                f"campeonato {partido.campeonato_id}, {partido.fecha} {partido.hora}, "
+                f"lugar '{partido.lugar.strip()}': partidos {anterior} y {partido.pk}"
+            )
+    if choques:
+        raise _error_choques("Hay partidos en el mismo lugar, fecha y hora.", choques)
+    Partido.objects.bulk_update(partidos, ["lugar_clave"], batch_size=1000)
+
+
+# Horarios ocupados por los equipos en los partidos que ya existen. Si un equipo ya tenía dos
+# partidos a la misma fecha y hora se listan todos los choques en lugar de omitirlos.
+def copiar_franjas(apps, schema_editor):
+    Partido = apps.get_model("core", "Partido")
+    FranjaEquipo = apps.get_model("core", "FranjaEquipo")
+    franjas, ocupadas, choques = [], {}, []
+    partidos = Partido.objects.order_by("pk").values_list(
+        "pk", "equipo_local_id", "equipo_visitante_id", "fecha", "hora"
+    )
+    for pk, local_id, visitante_id, fecha, hora in partidos.iterator(chunk_size=1000):
+        for equipo_id in {local_id, visitante_id}:
+            anterior = ocupadas.setdefault((equipo_id, fecha, hora), pk)
+            if anterior != pk:
+                choques.append(
+                    f"equipo {equipo_id}, {fecha} {hora}: partidos {anterior} y {pk}"
+                )
+                continue
+            franjas.append(
+                FranjaEquipo(partido_id=pk, equipo_id=equipo_id, fecha=fecha, hora=hora)
+            )
+    if choques:
+        raise _error_choques(
+            "Hay equipos con dos partidos a la misma fecha y hora.", choques
+        )
+    FranjaEquipo.objects.bulk_create(franjas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_llave_eliminacion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FranjaEquipo",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fecha", models.DateField()),
+                ("hora", models.TimeField()),
+            ],
+            options={
+                "verbose_name": "Horario de equipo",
+                "verbose_name_plural": "Horarios de equipos",
+            },
+        ),
+        migrations.AddField(
+            model_name="partido",
+            name="lugar_clave",
+            field=models.CharField(default="", editable=False, max_length=100),
+        ),
+        migrations.RunPython(llenar_lugar_clave, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="partido",
+            constraint=models.UniqueConstraint(
+                fields=("campeonato", "fecha", "hora", "lugar_clave"),
+                name="partido_lugar_unico",
+                violation_error_message="Ya hay un partido programado en este lugar, fecha y hora.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="franjaequipo",
+            name="equipo",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="franjas",
+                to="core.equipo",
+            ),
+        ),
+        migrations.AddField(
+            model_name="franjaequipo",
+            name="partido",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="franjas_equipos",
+                to="core.partido",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="franjaequipo",
+            constraint=models.UniqueConstraint(
+                fields=("equipo", "fecha", "hora"),
+                name="franja_equipo_unica",
+                violation_error_message="Alguno de los equipos ya tiene un partido programado en esta fecha y hora.",
+            ),
+        ),
+        migrations.RunPython(copiar_franjas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:57
+
+from django.db import migrations, models
+
+
+def numerar_jornadas(apps, schema_editor):
+    # Número de cada jornada guardada: lugar de su fecha entre las fechas con partidos del campeonato
+    JornadaTabla = apps.get_model("core", "JornadaTabla")
+    Partido = apps.get_model("core", "Partido")
+    jornadas = list(JornadaTabla.objects.order_by("campeonato_id", "fecha"))
+    numeros = {}
+    for campeonato_id in {jornada.campeonato_id for jornada in jornadas}:
+        fechas = (
+            Partido.objects.filter(campeonato_id=campeonato_id)
+            .order_by("fecha")
+            .values_list("fecha", flat=True)
+            .distinct()
+        )
+        for numero, fecha in enumerate(fechas, start=1):
+            numeros[(campeonato_id, fecha)] = numero
+    for jornada in jornadas:
+        jornada.numero = numeros.get((jornada.campeonato_id, jornada.fecha), 0)
+    JornadaTabla.objects.bulk_update(jornadas, ["numero"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_restricciones_horarios"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jornadatabla",
+            name="numero",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(numerar_jornadas, migrations.RunPython.noop),
+    ]
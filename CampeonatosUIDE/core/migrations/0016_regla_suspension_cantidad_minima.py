@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:04
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def borrar_reglas_sin_cantidad(apps, schema_editor):
+    # Una regla con cantidad 0 nunca se pudo aplicar (dividía por cero): no sirve de nada
+    ReglaSuspension = apps.get_model("core", "ReglaSuspension")
+    ReglaSuspension.objects.filter(cantidad=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_jornadatabla_numero"),
+    ]
+
+    operations = [
+        migrations.RunPython(borrar_reglas_sin_cantidad, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="reglasuspension",
+            name="cantidad",
+            field=models.PositiveIntegerField(
+                default=1, validators=[django.core.validators.MinValueValidator(1)]
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reglasuspension",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("cantidad__gte", 1)),
+                name="regla_suspension_cantidad_minima",
+                violation_error_message="La cantidad de tarjetas debe ser al menos 1.",
+            ),
+        ),
+    ]
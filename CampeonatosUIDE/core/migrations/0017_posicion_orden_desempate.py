@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_regla_suspension_cantidad_minima"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="posicion",
+            options={
+                "ordering": (
+                    "campeonato",
+                    "-puntos",
+                    "-diferencia_goles",
+                    "-goles_favor",
+                    "equipo__nombre",
+                    "pk",
+                ),
+                "verbose_name": "Posición",
+                "verbose_name_plural": "Tabla de posiciones",
+            },
+        ),
+    ]
@@ -1,12 +1,14 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from multiselectfield import MultiSelectField
 from django.core.exceptions import ValidationError
-from django.db.models.signals import post_save
+from django.core.validators import MinValueValidator
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.db.models import Q 
-from django.db.models import Sum
+from django.db.models import Sum, Case, When, Value, Exists, OuterRef
+import unicodedata
 
 
 # Modelo carrera
@@ -58,13 +60,30 @@ class Usuario(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.rol})"
 
+# Código estable de un deporte a partir de su nombre: "Fútbol" -> "FUTBOL", "Ping Pong" -> "PING_PONG"
+def codigo_deporte(nombre):
+    sin_tildes = unicodedata.normalize('NFKD', nombre).encode('ascii', 'ignore').decode('ascii')
+    return '_'.join(''.join(c if c.isalnum() else ' ' for c in sin_tildes).upper().split())
+
+# Clave con la que se comparan los lugares de los partidos: sin mayúsculas (casefold, también
+# para letras como "Ñ") ni espacios en los extremos. Se guarda en Partido.lugar_clave.
+def clave_lugar(lugar):
+    return lugar.strip().casefold()
+
 # Modelo de deporte
 class Deporte(models.Model):
     # Nombre único del deporte
     nombre = models.CharField(max_length=100, unique=True)
+    # Código estable usado para elegir la estrategia de puntuación (se genera del nombre si se deja vacío)
+    codigo = models.CharField(max_length=30, blank=True, db_index=True, help_text="Ej: FUTBOL, AJEDREZ, PING_PONG")
     # Descripción opcional del deporte
     descripcion = models.TextField(blank=True, null=True)
 
+    def save(self, *args, **kwargs):
+        if not self.codigo:
+            self.codigo = codigo_deporte(self.nombre)
+        super().save(*args, **kwargs)
+
     # Representación en texto del deporte
     def __str__(self):
         return self.nombre
@@ -100,10 +119,20 @@ class CodigoQR(models.Model):
 # Modelo para tipos de campeonatos
 # aqui eligen q tipo quieren si eliminatorias si fase de grupos etc y eligen en capeonato 
 class TipoCampeonato(models.Model):
+    # Formatos de competencia (los de eliminación usan la llave de core/llaves.py)
+    FORMATOS = [
+        ('LIGA', 'Todos contra todos'),
+        ('ELIMINACION', 'Eliminación directa'),
+        ('GRUPOS_ELIMINACION', 'Fase de grupos y eliminación directa'),
+    ]
+    FORMATOS_ELIMINACION = ('ELIMINACION', 'GRUPOS_ELIMINACION')
+
     # Nombre único del tipo de campeonato ( Fútbol, Básquet, etc.)
     nombre = models.CharField(max_length=30, unique=True)
     # Descripción opcional del tipo de campeonato
     descripcion = models.TextField(blank=True, null=True)
+    # Formato de competencia
+    formato = models.CharField(max_length=20, choices=FORMATOS, default='LIGA')
 
     def __str__(self):
         return self.nombre
@@ -169,6 +198,25 @@ class Campeonato(models.Model):
     def __str__(self):
         return f"{self.nombre} ({self.deporte.nombre}) - {self.estado}"
 
+# Consultas de equipos con los puntos calculados por la base de datos
+class EquipoQuerySet(models.QuerySet):
+    # Anota "puntos" según la estrategia de puntuación del deporte de cada equipo
+    # (ver core/puntuacion.py), para poder ordenar y limitar en SQL:
+    # Equipo.objects.with_puntos().order_by('-puntos')[:10]
+    def with_puntos(self):
+        from .puntuacion import ESTRATEGIAS
+        return self.annotate(
+            puntos=Case(
+                *[
+                    When(campeonato__deporte__codigo=codigo, then=estrategia.expresion_puntos())
+                    for codigo, estrategia in ESTRATEGIAS.items()
+                ],
+                default=Value(0),
+                output_field=models.DecimalField(max_digits=7, decimal_places=1),
+            )
+        )
+
+
 # Modelo equipo
 class Equipo(models.Model):
     # Campeonato al que pertenece el equipo (FK)
@@ -183,6 +231,11 @@ class Equipo(models.Model):
     aprobado = models.BooleanField(default=False)
     # Delegado que registró el equipo (debe ser rol DELEGADO)
     delegado = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, limit_choices_to={'rol': 'DELEGADO'})
+    # Grupo del equipo en los campeonatos con fase de grupos ("A", "B", ...), vacío si no tiene
+    grupo = models.CharField(max_length=10, blank=True, default='')
+
+    # Manager con consultas de puntos en la base (ver EquipoQuerySet.with_puntos)
+    objects = EquipoQuerySet.as_manager()
 
     def clean(self):
         # Validar que el nombre del equipo no esté vacío
@@ -225,81 +278,34 @@ class Equipo(models.Model):
         return pago_obj and pago_obj.estado == 'APROBADO'
 
 
+    # Totales del equipo guardados en TotalesEquipo (usar select_related('totales') en listas)
     @property
     def goles_totales(self):
-        from .models import EstadisticaJugadorFutbol
-        return sum(est.goles for est in EstadisticaJugadorFutbol.objects.filter(jugador__equipo=self))
+        totales = getattr(self, 'totales', None)
+        return totales.goles if totales else 0
 
     @property
     def tarjetas_totales(self):
-        from .models import EstadisticaJugadorFutbol
-        return sum(est.tarjetas_amarillas + est.tarjetas_rojas for est in EstadisticaJugadorFutbol.objects.filter(jugador__equipo=self))
+        totales = getattr(self, 'totales', None)
+        return totales.tarjetas_amarillas + totales.tarjetas_rojas if totales else 0
 
+    # Puntos del equipo según la estrategia de puntuación de su deporte (ver core/puntuacion.py).
+    # Para listas de equipos usar Equipo.objects.with_puntos() o la tabla de posiciones.
     @property
     def puntos_totales(self):
-        deporte = self.campeonato.deporte.nombre.upper()
-
-        if deporte == 'FUTBOL':
-            # Puntos por partidos ganados o empatados
-            partidos_local = self.partidos_locales.filter(estado='FINALIZADO')
-            partidos_visitante = self.partidos_visitantes.filter(estado='FINALIZADO')
-            puntos = 0
-
-            for p in partidos_local:
-                if p.resultado_local > p.resultado_visitante:
-                    puntos += 3
-                elif p.resultado_local == p.resultado_visitante:
-                    puntos += 1
-
-            for p in partidos_visitante:
-                if p.resultado_visitante > p.resultado_local:
-                    puntos += 3
-                elif p.resultado_visitante == p.resultado_local:
-                    puntos += 1
-
-            return puntos
-
-        elif deporte == 'AJEDREZ':
-            from .models import EstadisticaJugadorAjedrez
-            stats = EstadisticaJugadorAjedrez.objects.filter(jugador__equipo=self, campeonato=self.campeonato)
-            puntos = 0
-            for stat in stats:
-                puntos += stat.partidas_ganadas * 1
-                puntos += stat.partidas_empatadas * 0.5
-            return puntos
-
-        elif deporte == 'ECUABOLY':
-            # importar el modelo de estadísticas de Ecuaboly
-            from .models import EstadisticaJugadorEcuaboly
-            # Filtrar las estadísticas del jugador en el equipo y campeonato actual
-            stats = EstadisticaJugadorEcuaboly.objects.filter(jugador__equipo=self, campeonato=self.campeonato)
-            # 3 por cada partido ganado 
-            return stats.aggregate(total=models.Sum('sets_ganados'))['total'] or 0
-
-        elif deporte == 'PING PONG':
-            from .models import EstadisticaJugadorPingPong
-            stats = EstadisticaJugadorPingPong.objects.filter(jugador__equipo=self, campeonato=self.campeonato)
-            return stats.aggregate(total=models.Sum('partidos_ganados'))['total'] * 3 if stats.exists() else 0
-
-        elif deporte == 'TENIS':
-            from .models import EstadisticaJugadorTenis
-            stats = EstadisticaJugadorTenis.objects.filter(jugador__equipo=self, campeonato=self.campeonato)
-            return stats.aggregate(total=models.Sum('sets_ganados'))['total'] or 0
-
-        elif deporte == 'FUTBOLIN':
-            from .models import EstadisticaJugadorFutbolin
-            stats = EstadisticaJugadorFutbolin.objects.filter(jugador__equipo=self, campeonato=self.campeonato)
-            return stats.aggregate(total=models.Sum('partidos_ganados'))['total'] * 3 if stats.exists() else 0
-
-        elif deporte == 'VIDEOJUEGOS':
-            from .models import EstadisticaJugadorVideojuegos
-            stats = EstadisticaJugadorVideojuegos.objects.filter(jugador__equipo=self, campeonato=self.campeonato)
-            return stats.aggregate(total=models.Sum('partidas_ganadas'))['total'] * 3 if stats.exists() else 0
-        return 0  
+        from .puntuacion import estrategia_para
+        return estrategia_para(self.campeonato.deporte).puntos_equipo(self)
 
 
 
 # Modelo jugador
+class JugadorQuerySet(models.QuerySet):
+    # Anota "suspendido" (True si tiene una suspensión vigente en "fecha", hoy por defecto)
+    # con un EXISTS por fila que usa el índice (jugador, fecha_inicio, fecha_fin) de Suspension
+    def con_suspendido(self, fecha=None):
+        return self.annotate(suspendido=Exists(Suspension.objects.activas(fecha).filter(jugador=OuterRef('pk'))))
+
+
 class Jugador(models.Model):
     # Equipo al que pertenece el jugador (FK)
     equipo = models.ForeignKey(Equipo, on_delete=models.CASCADE, related_name='jugadores')
@@ -310,6 +316,9 @@ class Jugador(models.Model):
     # Edad del jugador
     edad = models.PositiveIntegerField()
 
+    # Manager con la anotación de suspensiones (ver JugadorQuerySet.con_suspendido)
+    objects = JugadorQuerySet.as_manager()
+
     # Restricción de número único en el equipo
     class Meta:
         unique_together = ('equipo', 'numero_camiseta')
@@ -343,12 +352,11 @@ class Jugador(models.Model):
     def __str__(self):
         return f"{self.usuario.username} ({self.equipo.nombre})"
 
-    #   Verificar si el jugador está suspendido
+    #   Verificar si el jugador está suspendido (sin consulta si viene anotado con con_suspendido())
     def esta_suspendido(self):
-        return self.suspensiones.filter(
-            fecha_inicio__lte=timezone.now().date(),
-            fecha_fin__gte=timezone.now().date()
-       ).exists()
+        if hasattr(self, 'suspendido'):
+            return self.suspendido
+        return self.suspensiones.activas().exists()
 
 # Modelo árbitro
 class Arbitro(models.Model):
@@ -368,6 +376,13 @@ class Arbitro(models.Model):
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
 
+MENSAJE_CHOQUE_LUGAR = "Ya hay un partido programado en este lugar, fecha y hora."
+
+# Choque de lugar o de horario de un equipo que rechazó la base al guardar un partido
+# (partido_lugar_unico o franja_equipo_unica); el mensaje es el que se muestra al usuario
+class ChoqueHorario(IntegrityError):
+    pass
+
 # Modelo partido
 class Partido(models.Model):
     # Campeonato (FK)
@@ -380,6 +395,8 @@ class Partido(models.Model):
     hora = models.TimeField()
     # Lugar donde se juega
     lugar = models.CharField(max_length=100)
+    # Lugar normalizado con clave_lugar (lo llena save); es la columna de partido_lugar_unico
+    lugar_clave = models.CharField(max_length=100, editable=False, default='')
     # Árbitro asignado (FK), opcional
     arbitro = models.ForeignKey(Arbitro, on_delete=models.SET_NULL, null=True, blank=True)
     # Resultados de goles pueden ser null si el partido no ha terminado
@@ -397,6 +414,26 @@ class Partido(models.Model):
     # Restricción única para evitar partidos duplicados en la misma fecha y hora con los mismos equipos
     class Meta:
         unique_together = ('campeonato', 'fecha', 'hora', 'equipo_local', 'equipo_visitante')
+        constraints = [
+            # Un lugar no puede tener dos partidos del campeonato a la misma hora (comparando
+            # lugar_clave, la misma normalización que usan el formulario y el fixture)
+            models.UniqueConstraint(
+                fields=['campeonato', 'fecha', 'hora', 'lugar_clave'], name='partido_lugar_unico',
+                violation_error_message=MENSAJE_CHOQUE_LUGAR,
+            ),
+        ]
+
+    # Campos cuyo valor anterior se lee antes de guardar para calcular diferencias
+    CAMPOS_SEGUIDOS = ('campeonato_id', 'equipo_local_id', 'equipo_visitante_id', 'estado', 'resultado_local', 'resultado_visitante', 'fecha')
+
+    # Campos que se ven en los calendarios .ics y definen en cuáles aparece (ver core/calendarios.py)
+    CAMPOS_CALENDARIO = CAMPOS_SEGUIDOS + ('hora', 'lugar', 'arbitro_id')
+
+    # Valores guardados en la base para este partido (None si todavía no existe)
+    def valores_guardados(self, campos=CAMPOS_SEGUIDOS):
+        if not self.pk:
+            return None
+        return Partido.objects.filter(pk=self.pk).values(*campos).first()
 
     # Validaciones para fecha y equipos
     def clean(self):
@@ -407,7 +444,7 @@ class Partido(models.Model):
             raise ValidationError("La fecha del partido debe estar dentro del rango del campeonato.")
         
         # Validar equipos diferentes
-        if self.equipo_local == self.equipo_visitante:
+        if self.equipo_local_id == self.equipo_visitante_id:
             raise ValidationError("El equipo local y visitante no pueden ser el mismo.")
         
         # Validar que el día del partido esté dentro de los días permitidos del campeonato
@@ -426,32 +463,218 @@ class Partido(models.Model):
         if dia_espanol not in self.campeonato.dias_partido:
             raise ValidationError(f"El día del partido ({dia_espanol}) no está permitido en el campeonato.")
 
-        # ya tiene un partido programado (como local o visitante) en la misma fecha y hora
-        conflictos = Partido.objects.filter(
-            campeonato=self.campeonato,
-            fecha=self.fecha,
-            hora=self.hora
-        ).filter(
-            Q(equipo_local=self.equipo_local) | Q(equipo_visitante=self.equipo_local) | 
-            Q(equipo_local=self.equipo_visitante) | Q(equipo_visitante=self.equipo_visitante)
-        ).exclude(pk=self.pk) # Excluir el partido actual si está siendo editado
-
-        if conflictos.exists():
-            raise ValidationError("Alguno de los equipos ya tiene un partido programado en esta fecha y hora.")
-        
-        conflicto_lugar = Partido.objects.filter(
-            campeonato=self.campeonato,
-            fecha=self.fecha,
-            hora=self.hora,
-            lugar__iexact=self.lugar
-        ).exclude(pk=self.pk)
-
-        if conflicto_lugar.exists():
-            raise ValidationError("Ya hay un partido programado en este lugar, fecha y hora.")
+        # Los choques de lugar y de horario de los equipos no se consultan aquí: los rechazan las
+        # restricciones partido_lugar_unico y franja_equipo_unica al guardar (ver save). Las
+        # reglas que siguen solo se revisan si cambió lo que validan, leyendo el partido guardado
+        # una vez.
+        anterior = self.valores_guardados(self.CAMPOS_CALENDARIO)
+
+        def cambio(*campos):
+            return anterior is None or any(anterior[campo] != getattr(self, campo) for campo in campos)
+
+        # Árbitro de un partido por jugar: activo, habilitado para el deporte y sin otro partido
+        # superpuesto ese día (ver core/arbitrajes.py)
+        if self.arbitro_id and self.estado == 'PROGRAMADO' and cambio('arbitro_id', 'fecha', 'hora', 'estado'):
+            from .arbitrajes import se_superponen
+            if not self.arbitro.estado:
+                raise ValidationError("El árbitro no está activo.")
+            if not self.arbitro.deportes.filter(pk=self.campeonato.deporte_id).exists():
+                raise ValidationError("El árbitro no está habilitado para el deporte del campeonato.")
+            horas = Partido.objects.filter(arbitro_id=self.arbitro_id, fecha=self.fecha).exclude(pk=self.pk).values_list('hora', flat=True)
+            if any(se_superponen(hora, self.hora) for hora in horas):
+                raise ValidationError("El árbitro ya tiene otro partido a esa hora.")
+
+        if anterior is None or not cambio('estado', 'resultado_local', 'resultado_visitante'):
+            return
+
+        # En la llave de eliminación directa alguien tiene que pasar de ronda
+        if (
+            self.estado == 'FINALIZADO' and self.resultado_local is not None
+            and self.resultado_local == self.resultado_visitante and CruceLlave.objects.filter(partido=self).exists()
+        ):
+            raise ValidationError("Un partido de eliminación directa no puede terminar empatado.")
+
+        # Una corrección no puede cambiar quién pasó de ronda si el partido siguiente ya empezó
+        if self.estado == 'FINALIZADO':
+            from .llaves import cruce_siguiente_jugado
+            if cruce_siguiente_jugado(self):
+                raise ValidationError(
+                    "El partido siguiente de la llave ya se empezó a jugar: no se puede cambiar el equipo que pasó de ronda."
+                )
+
+    # Campos que cambian los horarios ocupados por los equipos
+    CAMPOS_FRANJA = {'fecha', 'hora', 'equipo_local', 'equipo_visitante'}
+
+    # Horarios que ocupa el partido, sin guardar (uno por equipo)
+    def franjas(self):
+        return [
+            FranjaEquipo(partido=self, equipo_id=equipo_id, fecha=self.fecha, hora=self.hora)
+            for equipo_id in dict.fromkeys((self.equipo_local_id, self.equipo_visitante_id))
+        ]
+
+    # Si hay que escribir los horarios del partido: es nuevo o cambiaron la fecha, la hora o los
+    # equipos (comparando con los valores que leyó cargar_valores_partido antes de guardar)
+    def _cambiaron_franjas(self, campos):
+        if campos is not None and not self.CAMPOS_FRANJA & set(campos):
+            return False
+        anterior = self._original_calendario
+        return anterior is None or any(
+            anterior[campo] != getattr(self, campo) for campo in ('fecha', 'hora', 'equipo_local_id', 'equipo_visitante_id')
+        )
+
+    # Guarda el partido y sus horarios en la misma transacción. Si el lugar o el horario de un
+    # equipo ya está ocupado, las restricciones únicas lo rechazan, no se guarda nada y se lanza
+    # ChoqueHorario con el mensaje para el usuario.
+    def save(self, *args, **kwargs):
+        self.lugar_clave = clave_lugar(self.lugar)
+        campos = kwargs.get('update_fields')
+        if campos is not None and 'lugar' in campos:
+            kwargs['update_fields'] = campos = {*campos, 'lugar_clave'}
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                if self._cambiaron_franjas(campos):
+                    if self._original_calendario is not None:
+                        FranjaEquipo.objects.filter(partido=self).delete()
+                    FranjaEquipo.objects.bulk_create(self.franjas())
+        except IntegrityError as error:
+            # El mensaje de la base nombra la tabla o la restricción (core_franjaequipo o
+            # franja_equipo_unica; lugar_clave o partido_lugar_unico)
+            detalle = str(error).lower()
+            if 'franja' in detalle:
+                raise ChoqueHorario(MENSAJE_CHOQUE_EQUIPO) from error
+            if 'lugar' in detalle:
+                raise ChoqueHorario(MENSAJE_CHOQUE_LUGAR) from error
+            raise
+
+    # IDs de los jugadores de ambos equipos suspendidos en la fecha del partido (una consulta)
+    def jugadores_suspendidos(self):
+        return Suspension.objects.jugadores_suspendidos([self.equipo_local_id, self.equipo_visitante_id], self.fecha)
+
     # Representación en texto del partido
     def __str__(self):
         return f"{self.equipo_local} vs {self.equipo_visitante} - {self.fecha}"
 
+# Horario ocupado por un equipo: una fila por equipo de cada partido (ver Partido.save).
+# La restricción única impide en la base que un equipo tenga dos partidos a la misma hora.
+MENSAJE_CHOQUE_EQUIPO = "Alguno de los equipos ya tiene un partido programado en esta fecha y hora."
+
+class FranjaEquipo(models.Model):
+    partido = models.ForeignKey(Partido, on_delete=models.CASCADE, related_name='franjas_equipos')
+    equipo = models.ForeignKey(Equipo, on_delete=models.CASCADE, related_name='franjas')
+    fecha = models.DateField()
+    hora = models.TimeField()
+
+    class Meta:
+        verbose_name = "Horario de equipo"
+        verbose_name_plural = "Horarios de equipos"
+        constraints = [
+            models.UniqueConstraint(fields=['equipo', 'fecha', 'hora'], name='franja_equipo_unica', violation_error_message=MENSAJE_CHOQUE_EQUIPO),
+        ]
+
+    def __str__(self):
+        return f"{self.equipo} - {self.fecha} {self.hora}"
+
+
+# Tabla de posiciones materializada: una fila por equipo en su campeonato.
+# Se actualiza por diferencias al finalizar o corregir un partido (ver core/posiciones.py)
+# y se puede reconstruir con el comando "reconstruir_posiciones".
+class Posicion(models.Model):
+    # Campeonato y equipo de la fila
+    campeonato = models.ForeignKey(Campeonato, on_delete=models.CASCADE, related_name='posiciones')
+    equipo = models.OneToOneField(Equipo, on_delete=models.CASCADE, related_name='posicion')
+    # Puntos (decimal porque en ajedrez un empate vale medio punto)
+    puntos = models.DecimalField(max_digits=7, decimal_places=1, default=0)
+    # Resumen de partidos finalizados
+    partidos_jugados = models.PositiveIntegerField(default=0)
+    partidos_ganados = models.PositiveIntegerField(default=0)
+    partidos_empatados = models.PositiveIntegerField(default=0)
+    partidos_perdidos = models.PositiveIntegerField(default=0)
+    # Goles (o tantos) a favor, en contra y su diferencia
+    goles_favor = models.PositiveIntegerField(default=0)
+    goles_contra = models.PositiveIntegerField(default=0)
+    diferencia_goles = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Posición"
+        verbose_name_plural = "Tabla de posiciones"
+        unique_together = ('campeonato', 'equipo')
+        # El nombre y el id del equipo desempatan: sin un orden total la paginación de la tabla
+        # podría repetir u omitir equipos empatados entre páginas
+        ordering = ('campeonato', '-puntos', '-diferencia_goles', '-goles_favor', 'equipo__nombre', 'pk')
+        # Índice para leer la tabla de un campeonato ya ordenada
+        indexes = [
+            models.Index(fields=['campeonato', '-puntos', '-diferencia_goles', '-goles_favor'], name='posicion_tabla_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.equipo} - {self.puntos} pts"
+
+# Tabla de posiciones guardada al cerrar cada jornada (fecha con todos sus partidos finalizados),
+# en una sola fila por jornada: "filas" es la lista ordenada de
+# [equipo_id, puntos, jugados, ganados, empatados, perdidos, goles_favor, goles_contra, diferencia]
+# (ver core/jornadas.py)
+class JornadaTabla(models.Model):
+    campeonato = models.ForeignKey(Campeonato, on_delete=models.CASCADE, related_name='jornadas')
+    fecha = models.DateField()
+    # Número de la jornada: lugar de su fecha entre todas las fechas con partidos del campeonato
+    # (cerradas o no), así no cambia cuando se cierra antes una jornada posterior
+    numero = models.PositiveIntegerField(default=0)
+    filas = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name = "Tabla por jornada"
+        verbose_name_plural = "Tablas por jornada"
+        unique_together = ('campeonato', 'fecha')
+        ordering = ('campeonato', 'fecha')
+
+    def __str__(self):
+        return f"{self.campeonato.nombre} - {self.fecha}"
+
+
+# Cruce de la llave de eliminación directa de un campeonato (ver core/llaves.py). La ronda 1
+# es la primera; el ganador del cruce (ronda, posicion) pasa al cruce (ronda + 1, posicion // 2),
+# como local si "posicion" es par. Un cruce de la ronda 1 con un solo equipo es un pase libre.
+class CruceLlave(models.Model):
+    campeonato = models.ForeignKey(Campeonato, on_delete=models.CASCADE, related_name='cruces')
+    ronda = models.PositiveSmallIntegerField()
+    posicion = models.PositiveSmallIntegerField()
+    # Equipos del cruce (vacíos hasta que se conocen los ganadores de los cruces anteriores)
+    equipo_local = models.ForeignKey(Equipo, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    equipo_visitante = models.ForeignKey(Equipo, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    # Partido del cruce, creado cuando se conocen los dos equipos
+    partido = models.OneToOneField(Partido, on_delete=models.SET_NULL, null=True, blank=True, related_name='cruce')
+    ganador = models.ForeignKey(Equipo, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        verbose_name = "Cruce de llave"
+        verbose_name_plural = "Cruces de llave"
+        unique_together = ('campeonato', 'ronda', 'posicion')
+        ordering = ('campeonato', 'ronda', 'posicion')
+
+    def __str__(self):
+        return f"{self.campeonato.nombre} - ronda {self.ronda}, cruce {self.posicion + 1}"
+
+
+# Totales de estadísticas de cada equipo (suma de las filas de sus jugadores).
+# Se actualizan con F() en la misma transacción que cada cambio de estadísticas
+# (ver core/contadores.py) y se verifican con el comando "verificar_totales".
+class TotalesEquipo(models.Model):
+    equipo = models.OneToOneField(Equipo, on_delete=models.CASCADE, related_name='totales')
+    # Fútbol
+    goles = models.IntegerField(default=0)
+    tarjetas_amarillas = models.IntegerField(default=0)
+    tarjetas_rojas = models.IntegerField(default=0)
+    # Futbolín
+    goles_futbolin = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Totales del equipo"
+        verbose_name_plural = "Totales de equipos"
+
+    def __str__(self):
+        return f"Totales de {self.equipo}"
+
 # Modelo de transmisión en vivo
 class Transmision(models.Model):
     # Campeonato (FK)
@@ -547,25 +770,206 @@ def actualizar_estado_equipo(sender, instance, **kwargs):
         equipo.aprobado = False
         equipo.save()
 
+# Señal para crear la fila de la tabla de posiciones de cada equipo nuevo
+@receiver(post_save, sender=Equipo)
+def crear_posicion_equipo(sender, instance, created, **kwargs):
+    if created:
+        Posicion.objects.get_or_create(equipo=instance, defaults={'campeonato_id': instance.campeonato_id})
+
+# Señal para crear la fila de totales de cada equipo nuevo
+@receiver(post_save, sender=Equipo)
+def crear_totales_equipo(sender, instance, created, **kwargs):
+    if created:
+        TotalesEquipo.objects.get_or_create(equipo=instance)
+
+# Señales para recalcular los totales de los dos equipos cuando un jugador cambia de equipo
+# (sus estadísticas pasan a sumar en el equipo nuevo)
+@receiver(pre_save, sender=Jugador)
+def cargar_equipo_jugador(sender, instance, **kwargs):
+    instance._equipo_original = Jugador.objects.filter(pk=instance.pk).values_list('equipo_id', flat=True).first() if instance.pk else None
+
+@receiver(post_save, sender=Jugador)
+def mover_totales_jugador(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_equipo_original', None)
+    if not created and anterior and anterior != instance.equipo_id:
+        from .contadores import verificar_totales
+        verificar_totales([anterior, instance.equipo_id], reparar=True)
+
+# Señales para recalcular la trayectoria del usuario cuando cambia su jugador (equipo, alta o baja)
+@receiver(post_save, sender=Jugador)
+@receiver(post_delete, sender=Jugador)
+def actualizar_trayectoria_jugador(sender, instance, **kwargs):
+    from .trayectorias import actualizar_trayectorias
+    actualizar_trayectorias([instance.usuario_id])
+
+# Señales para recalcular los títulos de los jugadores cuando un campeonato se finaliza (o deja de estarlo)
+@receiver(pre_save, sender=Campeonato)
+def cargar_estado_campeonato(sender, instance, **kwargs):
+    instance._estado_original = Campeonato.objects.filter(pk=instance.pk).values_list('estado', flat=True).first() if instance.pk else None
+
+@receiver(post_save, sender=Campeonato)
+def actualizar_titulos_campeonato(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_estado_original', None)
+    if anterior != instance.estado and 'FINALIZADO' in (anterior, instance.estado):
+        from .trayectorias import actualizar_trayectorias_campeonatos
+        actualizar_trayectorias_campeonatos([instance.pk])
+
+# Señales para mantener la tabla de posiciones al guardar o borrar un partido.
+# Antes de escribir se leen los valores guardados para aplicar solo la diferencia.
+@receiver(pre_save, sender=Partido)
+@receiver(pre_delete, sender=Partido)
+def cargar_valores_partido(sender, instance, **kwargs):
+    guardados = instance.valores_guardados(Partido.CAMPOS_CALENDARIO)
+    instance._original = {campo: guardados[campo] for campo in Partido.CAMPOS_SEGUIDOS} if guardados else None
+    instance._original_calendario = guardados
+
+@receiver(post_save, sender=Partido)
+def actualizar_posiciones_partido(sender, instance, created, **kwargs):
+    from .calendarios import actualizar_calendarios_partido
+    from .en_vivo import publicar_cambio_partido
+    from .jornadas import actualizar_jornadas_partido
+    from .llaves import avanzar_llave
+    from .posiciones import aplicar_cambio_partido
+    from .trayectorias import actualizar_titulos_partido
+    anterior = None if created else instance._original
+    equipos_cambiados = aplicar_cambio_partido(anterior, instance)
+    # Tablas guardadas de las jornadas que el cambio cierra o modifica
+    actualizar_jornadas_partido(anterior, {campo: getattr(instance, campo) for campo in Partido.CAMPOS_SEGUIDOS})
+    # Pasa al ganador a la siguiente ronda si el partido es de una llave de eliminación
+    avanzar_llave(anterior, instance)
+    # Avisa a los clientes conectados en vivo (marcador y tabla)
+    publicar_cambio_partido(anterior, instance, equipos_cambiados)
+    # Calendarios .ics donde aparece el partido
+    actualizar_calendarios_partido(
+        None if created else instance._original_calendario,
+        {campo: getattr(instance, campo) for campo in Partido.CAMPOS_CALENDARIO},
+    )
+    # Títulos de los jugadores si el campeonato ya estaba finalizado
+    actualizar_titulos_partido(anterior, {campo: getattr(instance, campo) for campo in Partido.CAMPOS_SEGUIDOS})
+
+@receiver(post_delete, sender=Partido)
+def descontar_posiciones_partido(sender, instance, **kwargs):
+    from .calendarios import actualizar_calendarios_partido
+    from .jornadas import actualizar_jornadas_partido
+    from .posiciones import aplicar_cambio_partido
+    from .trayectorias import actualizar_titulos_partido
+    aplicar_cambio_partido(instance._original, None)
+    actualizar_jornadas_partido(instance._original, None)
+    actualizar_calendarios_partido(instance._original_calendario, None)
+    actualizar_titulos_partido(instance._original, None)
+
+# Nombres que se ven en los calendarios .ics: al cambiarlos se invalidan los calendarios de los
+# partidos del objeto (ver core/calendarios.py)
+CAMPOS_NOMBRE_CALENDARIO = {Campeonato: ('nombre',), Equipo: ('nombre',), Arbitro: ('nombre', 'apellido')}
+
+@receiver(pre_save, sender=Campeonato)
+@receiver(pre_save, sender=Equipo)
+@receiver(pre_save, sender=Arbitro)
+def cargar_nombre_calendario(sender, instance, **kwargs):
+    campos = CAMPOS_NOMBRE_CALENDARIO[sender]
+    instance._nombre_calendario = sender.objects.filter(pk=instance.pk).values_list(*campos).first() if instance.pk else None
+
+@receiver(post_save, sender=Campeonato)
+@receiver(post_save, sender=Equipo)
+@receiver(post_save, sender=Arbitro)
+def actualizar_calendarios_nombre(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_nombre_calendario', None)
+    if not created and anterior is not None and anterior != tuple(getattr(instance, campo) for campo in CAMPOS_NOMBRE_CALENDARIO[sender]):
+        from .calendarios import marcar_cambio_nombre
+        marcar_cambio_nombre(sender, instance.pk)
+
+class SuspensionQuerySet(models.QuerySet):
+    # Suspensiones vigentes en "fecha" (hoy por defecto)
+    def activas(self, fecha=None):
+        fecha = fecha or timezone.localdate()
+        return self.filter(fecha_inicio__lte=fecha, fecha_fin__gte=fecha)
+
+    # IDs de los jugadores suspendidos en "fecha" de uno o varios equipos, en una sola consulta:
+    # Suspension.objects.jugadores_suspendidos([equipo])
+    def jugadores_suspendidos(self, equipos, fecha=None):
+        return set(self.activas(fecha).filter(jugador__equipo__in=equipos).values_list('jugador_id', flat=True))
+
+
+# Regla de suspensión automática de un campeonato: cada "cantidad" tarjetas del tipo indicado
+# suspenden al jugador "dias" días (ver core/sanciones.py)
+class ReglaSuspension(models.Model):
+    TARJETAS = [
+        ('tarjetas_amarillas', 'Tarjetas amarillas'),
+        ('tarjetas_rojas', 'Tarjetas rojas'),
+    ]
+
+    campeonato = models.ForeignKey(Campeonato, on_delete=models.CASCADE, related_name='reglas_suspension')
+    # Columna de la tabla de estadísticas que se cuenta
+    tarjeta = models.CharField(max_length=20, choices=TARJETAS)
+    # Tarjetas acumuladas que generan una suspensión (divide las tarjetas del jugador: nunca 0)
+    cantidad = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
+    # Días de suspensión por cada vez que se alcanza la cantidad
+    dias = models.PositiveIntegerField(default=7)
+    activa = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = "Regla de suspensión"
+        verbose_name_plural = "Reglas de suspensión"
+        unique_together = ('campeonato', 'tarjeta', 'cantidad')
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(cantidad__gte=1), name='regla_suspension_cantidad_minima',
+                violation_error_message="La cantidad de tarjetas debe ser al menos 1.",
+            ),
+        ]
+
+    def clean(self):
+        if not self.dias:
+            raise ValidationError("La suspensión debe durar al menos un día.")
+
+    def __str__(self):
+        return f"{self.cantidad} {self.get_tarjeta_display().lower()}: {self.dias} días"
+
+
 class Suspension(models.Model):
     jugador = models.ForeignKey(Jugador, on_delete=models.CASCADE, related_name='suspensiones')
     fecha_inicio = models.DateField()
     fecha_fin = models.DateField()
     motivo = models.TextField()
+    # Regla que generó la suspensión (vacía si se creó a mano) y cuántas veces se
+    # alcanzó la regla en esta suspensión; así cada acumulación se sanciona una sola vez
+    regla = models.ForeignKey(ReglaSuspension, on_delete=models.SET_NULL, null=True, blank=True, related_name='suspensiones')
+    sanciones = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = SuspensionQuerySet.as_manager()
+
+    class Meta:
+        # Índice para saber si un jugador está suspendido en una fecha
+        indexes = [
+            models.Index(fields=['jugador', 'fecha_inicio', 'fecha_fin'], name='suspension_vigente_idx'),
+        ]
 
     def clean(self):
         if self.fecha_fin < self.fecha_inicio:
             raise ValidationError("La fecha fin debe ser posterior a la fecha inicio.")
 
     def esta_activa(self):
-        hoy = timezone.now().date()
+        hoy = timezone.localdate()
         return self.fecha_inicio <= hoy <= self.fecha_fin
 
     def __str__(self):
         return f"Suspensión de {self.jugador.usuario.username} desde {self.fecha_inicio} hasta {self.fecha_fin}"
 
 
-class EstadisticaJugadorFutbol(models.Model):
+# Guarda y borra dentro de una transacción: así las señales que actualizan datos derivados
+# (los totales del equipo) se aplican en la misma transacción que el cambio
+class GuardadoAtomico:
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+
+class EstadisticaJugadorFutbol(GuardadoAtomico, models.Model):
     # Relación con campeonato y jugador
     campeonato = models.ForeignKey(Campeonato, on_delete=models.CASCADE)
     # Relación con jugador
@@ -682,7 +1086,7 @@ class EstadisticaJugadorVideojuegos(models.Model):
     def __str__(self):
         return f"{self.jugador.usuario.username} - {self.campeonato.nombre}"
 
-class EstadisticaJugadorFutbolin(models.Model):
+class EstadisticaJugadorFutbolin(GuardadoAtomico, models.Model):
       # Relación con el campeonato
     campeonato = models.ForeignKey(Campeonato, on_delete=models.CASCADE)
     # Relación con el jugador
@@ -699,4 +1103,264 @@ class EstadisticaJugadorFutbolin(models.Model):
         unique_together = ('campeonato', 'jugador')
 
     def __str__(self):
-        return f"{self.jugador.usuario.username} - {self.campeonato.nombre}"
\ No newline at end of file
+        return f"{self.jugador.usuario.username} - {self.campeonato.nombre}"
+
+# Estadísticas de todos los deportes en una sola tabla, una fila por jugador y campeonato, con
+# columnas comunes (ver core/estadisticas.py). Las tablas de cada deporte siguen siendo las que
+# se editan; esta se mantiene a partir de ellas y sirve para consultas entre deportes
+# (todo lo de un jugador, totales por equipo o por carrera) sin recorrer ocho tablas.
+class EstadisticaJugador(models.Model):
+    campeonato = models.ForeignKey(Campeonato, on_delete=models.CASCADE, related_name='estadisticas')
+    jugador = models.ForeignKey(Jugador, on_delete=models.CASCADE, related_name='estadisticas')
+
+    # Partidos (o partidas) jugados, ganados, empatados y perdidos
+    jugados = models.PositiveIntegerField(default=0)
+    ganados = models.PositiveIntegerField(default=0)
+    empatados = models.PositiveIntegerField(default=0)
+    perdidos = models.PositiveIntegerField(default=0)
+    # Fútbol y futbolín
+    goles = models.PositiveIntegerField(default=0)
+    tarjetas_amarillas = models.PositiveIntegerField(default=0)
+    tarjetas_rojas = models.PositiveIntegerField(default=0)
+    # Básquet
+    canastas = models.PositiveIntegerField(default=0)
+    rebotes = models.PositiveIntegerField(default=0)
+    asistencias = models.PositiveIntegerField(default=0)
+    # Ecuaboly y tenis
+    sets_ganados = models.PositiveIntegerField(default=0)
+    sets_perdidos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Estadística de jugador (todos los deportes)"
+        verbose_name_plural = "Estadísticas de jugadores (todos los deportes)"
+        # El índice único también sirve para leer todo un campeonato
+        unique_together = ('campeonato', 'jugador')
+
+    def __str__(self):
+        return f"{self.jugador.usuario.username} - {self.campeonato.nombre}"
+
+# Resumen de la trayectoria deportiva de un usuario en todos sus campeonatos y deportes, en una
+# fila que se recalcula cuando cambian sus estadísticas (ver core/trayectorias.py)
+class TrayectoriaUsuario(models.Model):
+    usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, related_name='trayectoria')
+    # Campeonatos jugados y campeonatos finalizados ganados por su equipo
+    campeonatos = models.PositiveIntegerField(default=0)
+    titulos = models.PositiveIntegerField(default=0)
+    campeonatos_ganados = models.JSONField(default=list, blank=True)
+    # Totales de todos los deportes, para ordenar sin leer el detalle
+    jugados = models.PositiveIntegerField(default=0)
+    ganados = models.PositiveIntegerField(default=0)
+    goles = models.PositiveIntegerField(default=0)
+    # Totales por código de deporte y por año del campeonato:
+    # {"FUTBOL": {"campeonatos": 2, "goles": 7, ...}, ...} y {"anio_2025": {...}, ...}
+    por_deporte = models.JSONField(default=dict, blank=True)
+    por_anio = models.JSONField(default=dict, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Trayectoria de usuario"
+        verbose_name_plural = "Trayectorias de usuarios"
+        indexes = [
+            models.Index(fields=['-titulos', '-ganados'], name='trayectoria_ranking_idx'),
+        ]
+
+    def __str__(self):
+        return f"Trayectoria de {self.usuario.username}"
+
+# Registro de lo que pasa en un partido (gol, tarjeta, set ganado, ...), solo de inserción.
+# Cada evento se acumula una vez en la fila de estadísticas del jugador y en el marcador
+# del partido (ver core/eventos.py); para corregir se registra otro evento con valor negativo.
+class EventoPartido(models.Model):
+    TIPOS = [
+        ('GOL', 'Gol'),
+        ('AMARILLA', 'Tarjeta amarilla'),
+        ('ROJA', 'Tarjeta roja'),
+        ('CANASTA', 'Canasta'),
+        ('REBOTE', 'Rebote'),
+        ('ASISTENCIA', 'Asistencia'),
+        ('SET_GANADO', 'Set ganado'),
+        ('SET_PERDIDO', 'Set perdido'),
+        ('PARTIDA_GANADA', 'Partida ganada'),
+        ('PARTIDA_EMPATADA', 'Partida empatada'),
+        ('PARTIDA_PERDIDA', 'Partida perdida'),
+        ('PARTIDO_GANADO', 'Partido ganado'),
+        ('PARTIDO_PERDIDO', 'Partido perdido'),
+    ]
+
+    partido = models.ForeignKey(Partido, on_delete=models.CASCADE, related_name='eventos')
+    jugador = models.ForeignKey(Jugador, on_delete=models.CASCADE, related_name='eventos')
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    # Cantidad que suma el evento (p. ej. puntos de una canasta); negativa para anular otro evento
+    valor = models.IntegerField(default=1)
+    # Minuto del partido (opcional)
+    minuto = models.PositiveIntegerField(blank=True, null=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    # True cuando el evento ya se sumó a las estadísticas y al marcador
+    aplicado = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        verbose_name = "Evento de partido"
+        verbose_name_plural = "Eventos de partidos"
+        ordering = ('partido', 'creado', 'id')
+        indexes = [
+            # Eventos pendientes de acumular (índice parcial: solo las filas sin aplicar)
+            models.Index(fields=['partido'], condition=Q(aplicado=False), name='evento_pendiente_idx'),
+        ]
+
+    def clean(self):
+        from .eventos import columnas_deporte, validar_correccion
+        if not self.partido_id or not self.jugador_id:
+            return
+        if self.jugador.equipo_id not in (self.partido.equipo_local_id, self.partido.equipo_visitante_id):
+            raise ValidationError("El jugador no pertenece a ninguno de los equipos del partido.")
+        if self.jugador_id in self.partido.jugadores_suspendidos():
+            raise ValidationError("El jugador está suspendido en la fecha del partido.")
+        if self.tipo not in columnas_deporte(self.partido.campeonato.deporte):
+            raise ValidationError(f"El evento {self.get_tipo_display()} no aplica a {self.partido.campeonato.deporte}.")
+        validar_correccion(self)
+
+    # Los eventos no se editan ni se borran: se corrigen con un evento de valor negativo, que se
+    # valida de nuevo con el partido bloqueado (ver core/eventos.py validar_correccion)
+    def save(self, *args, **kwargs):
+        from .eventos import validar_correccion
+        if not self._state.adding:
+            raise ValidationError("Los eventos de un partido no se modifican; registra un evento de corrección.")
+        if self.valor >= 0:
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            validar_correccion(self, bloquear=True)
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Los eventos de un partido no se borran; registra un evento de corrección.")
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} ({self.valor:+d}) - {self.jugador} - {self.partido}"
+
+# Señal para anotar el partido en la cola de acumulación al confirmar la transacción en que se
+# registró el evento; la acumulación corre después, fuera de la petición (ver core/eventos.py)
+@receiver(post_save, sender=EventoPartido)
+def acumular_evento(sender, instance, created, **kwargs):
+    from .eventos import cola_acumulacion
+    if created:
+        partido_id = instance.partido_id
+        transaction.on_commit(lambda: cola_acumulacion.agregar(partido_id))
+
+# Señal para recalcular los puntos de un equipo cuando cambian las estadísticas de sus jugadores
+# (deportes que puntúan por estadísticas; se conecta en CoreConfig.ready según las estrategias registradas)
+def actualizar_puntos_por_estadistica(sender, instance, **kwargs):
+    from .posiciones import actualizar_puntos_equipo
+    equipo_id = Jugador.objects.filter(pk=instance.jugador_id).values_list('equipo_id', flat=True).first()
+    if equipo_id:
+        actualizar_puntos_equipo(equipo_id)
+
+# Todas las tablas de estadísticas por jugador
+MODELOS_ESTADISTICA = (
+    EstadisticaJugadorFutbol, EstadisticaJugadorBasquet, EstadisticaJugadorAjedrez, EstadisticaJugadorEcuaboly,
+    EstadisticaJugadorPingPong, EstadisticaJugadorTenis, EstadisticaJugadorVideojuegos, EstadisticaJugadorFutbolin,
+)
+
+# Tabla de estadísticas de cada deporte, por código (Deporte.codigo)
+ESTADISTICAS_POR_DEPORTE = {
+    'FUTBOL': EstadisticaJugadorFutbol,
+    'BASQUET': EstadisticaJugadorBasquet,
+    'AJEDREZ': EstadisticaJugadorAjedrez,
+    'ECUABOLY': EstadisticaJugadorEcuaboly,
+    'PING_PONG': EstadisticaJugadorPingPong,
+    'TENIS': EstadisticaJugadorTenis,
+    'VIDEOJUEGOS': EstadisticaJugadorVideojuegos,
+    'FUTBOLIN': EstadisticaJugadorFutbolin,
+}
+
+# Señales para mantener los totales del equipo (ver core/contadores.py).
+# Antes de escribir se leen (y bloquean) los valores guardados para aplicar solo la diferencia.
+@receiver(pre_save, sender=EstadisticaJugadorFutbol)
+@receiver(pre_save, sender=EstadisticaJugadorFutbolin)
+@receiver(pre_delete, sender=EstadisticaJugadorFutbol)
+@receiver(pre_delete, sender=EstadisticaJugadorFutbolin)
+def cargar_valores_contados(sender, instance, **kwargs):
+    from .contadores import valores_contados
+    instance._contados = valores_contados(sender, instance.pk)
+
+@receiver(post_save, sender=EstadisticaJugadorFutbol)
+@receiver(post_save, sender=EstadisticaJugadorFutbolin)
+def actualizar_totales_equipo(sender, instance, created, **kwargs):
+    from .contadores import aplicar_diferencia, valores_instancia
+    equipo_id = Jugador.objects.filter(pk=instance.jugador_id).values_list('equipo_id', flat=True).first()
+    aplicar_diferencia(sender, None if created else instance._contados, valores_instancia(instance, equipo_id))
+
+@receiver(post_delete, sender=EstadisticaJugadorFutbol)
+@receiver(post_delete, sender=EstadisticaJugadorFutbolin)
+def descontar_totales_equipo(sender, instance, **kwargs):
+    from .contadores import aplicar_diferencia
+    aplicar_diferencia(sender, instance._contados, None)
+
+# Señal para aplicar las reglas de suspensión cuando cambian las tarjetas de un jugador
+# (ver core/sanciones.py); corre en la misma transacción que el guardado
+@receiver(post_save, sender=EstadisticaJugadorFutbol)
+def evaluar_suspensiones_jugador(sender, instance, created, **kwargs):
+    from .sanciones import COLUMNAS_TARJETAS, cambiaron_tarjetas, evaluar_suspensiones
+    actual = {columna: getattr(instance, columna) for columna in COLUMNAS_TARJETAS}
+    if cambiaron_tarjetas(None if created else instance._contados, actual):
+        evaluar_suspensiones(instance.campeonato_id, [instance.jugador_id])
+
+# Señales para copiar cada fila de estadísticas de un deporte a la tabla común (ver core/estadisticas.py)
+# (y con ella la trayectoria del usuario, ver core/trayectorias.py)
+def copiar_estadistica(sender, instance, **kwargs):
+    from .estadisticas import copiar_fila
+    from .trayectorias import actualizar_trayectorias_jugadores
+    copiar_fila(instance)
+    actualizar_trayectorias_jugadores([instance.jugador_id])
+
+def borrar_estadistica(sender, instance, **kwargs):
+    from .trayectorias import actualizar_trayectorias_jugadores
+    EstadisticaJugador.objects.filter(campeonato_id=instance.campeonato_id, jugador_id=instance.jugador_id).delete()
+    actualizar_trayectorias_jugadores([instance.jugador_id])
+
+for modelo_estadistica in MODELOS_ESTADISTICA:
+    post_save.connect(copiar_estadistica, sender=modelo_estadistica)
+    post_delete.connect(borrar_estadistica, sender=modelo_estadistica)
+
+# Señal para invalidar las páginas en caché de un campeonato (ver core/versiones.py)
+# cuando cambia algo que se muestra en ellas
+def invalidar_cache_campeonato(sender, instance, update_fields=None, **kwargs):
+    from .versiones import marcar_cambio, marcar_cambio_campeonato
+    if sender is Campeonato:
+        campeonatos = [instance.pk]
+        # La portada pública lista los campeonatos en curso
+        marcar_cambio('campeonatos')
+    elif sender is Deporte:
+        campeonatos = Campeonato.objects.filter(deporte=instance).values_list('pk', flat=True)
+        marcar_cambio('campeonatos')
+    elif sender is Arbitro:
+        campeonatos = Partido.objects.filter(arbitro=instance).values_list('campeonato_id', flat=True).distinct()
+    elif sender is Carrera:
+        campeonatos = Equipo.objects.filter(carrera=instance).values_list('campeonato_id', flat=True).distinct()
+    elif sender is Usuario:
+        # Cada inicio de sesión guarda last_login, que no se muestra en ninguna página
+        if update_fields is not None and set(update_fields) <= {'last_login'}:
+            return
+        campeonatos = Campeonato.objects.filter(
+            Q(delegado=instance) | Q(equipos__delegado=instance) | Q(equipos__jugadores__usuario=instance)
+        ).values_list('pk', flat=True).distinct()
+    elif sender in (Pago, Jugador):
+        campeonatos = Equipo.objects.filter(pk=instance.equipo_id).values_list('campeonato_id', flat=True)
+    else:
+        campeonatos = [instance.campeonato_id]
+        # Un partido que cambió de campeonato invalida también el anterior
+        original = getattr(instance, '_original', None)
+        if original:
+            campeonatos.append(original['campeonato_id'])
+    marcar_cambio_campeonato(*campeonatos)
+
+for modelo_cacheado in (Campeonato, Equipo, Jugador, Partido, Pago) + MODELOS_ESTADISTICA:
+    post_save.connect(invalidar_cache_campeonato, sender=modelo_cacheado)
+    post_delete.connect(invalidar_cache_campeonato, sender=modelo_cacheado)
+
+# Modelos que se muestran en las páginas a través de otros (nombre del árbitro, del deporte, de
+# la carrera, de los jugadores y delegados). Al borrarlos se invalida antes (pre_delete): después
+# sus referencias ya se pusieron en NULL con update() y no se sabría qué campeonatos los mostraban.
+for modelo_cacheado in (Arbitro, Carrera, Deporte, Usuario):
+    post_save.connect(invalidar_cache_campeonato, sender=modelo_cacheado)
+    pre_delete.connect(invalidar_cache_campeonato, sender=modelo_cacheado)
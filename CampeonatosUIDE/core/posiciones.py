@@ -0,0 +1,149 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import Campeonato, Equipo, Partido, Posicion
+from .puntuacion import estrategia_campeonato, estrategia_para
+
+
+# Columnas numéricas de la tabla de posiciones
+CAMPOS_TABLA = (
+    'puntos', 'partidos_jugados', 'partidos_ganados', 'partidos_empatados',
+    'partidos_perdidos', 'goles_favor', 'goles_contra', 'diferencia_goles',
+)
+
+
+# Aporte de un partido a la tabla: {(campeonato_id, equipo_id): {campo: valor}}.
+# Solo cuentan los partidos finalizados con ambos resultados cargados; los puntos
+# se suman solo si la estrategia del deporte puntúa por resultados.
+def aporte_partido(valores, estrategia):
+    if not valores or valores['estado'] != 'FINALIZADO':
+        return {}
+    local, visitante = valores['resultado_local'], valores['resultado_visitante']
+    if local is None or visitante is None:
+        return {}
+
+    aporte = {}
+    for equipo_id, propios, rival in (
+        (valores['equipo_local_id'], local, visitante),
+        (valores['equipo_visitante_id'], visitante, local),
+    ):
+        fila = {
+            'partidos_jugados': 1,
+            'partidos_ganados': int(propios > rival),
+            'partidos_empatados': int(propios == rival),
+            'partidos_perdidos': int(propios < rival),
+            'goles_favor': propios,
+            'goles_contra': rival,
+            'diferencia_goles': propios - rival,
+        }
+        if estrategia.por_partidos:
+            fila['puntos'] = estrategia.puntos_resultado(propios, rival)
+        aporte[(valores['campeonato_id'], equipo_id)] = fila
+    return aporte
+
+
+# Aplica a la tabla la diferencia entre el estado anterior y el actual de un partido.
+# "anterior" es el diccionario de valores originales (None si el partido es nuevo)
+# y "partido" la instancia guardada (None si se borró).
+# Devuelve los IDs de los equipos cuya fila cambió.
+def aplicar_cambio_partido(anterior, partido):
+    actual = {campo: getattr(partido, campo) for campo in Partido.CAMPOS_SEGUIDOS} if partido else None
+    if anterior == actual:
+        return []
+
+    campeonatos = {valores['campeonato_id'] for valores in (anterior, actual) if valores and valores['estado'] == 'FINALIZADO'}
+    if not campeonatos:
+        return []
+    estrategias = {campeonato_id: estrategia_campeonato(campeonato_id) for campeonato_id in campeonatos}
+
+    diferencias = defaultdict(lambda: defaultdict(int))
+    for valores, signo in ((anterior, -1), (actual, 1)):
+        if not valores or valores['campeonato_id'] not in estrategias:
+            continue
+        for clave, fila in aporte_partido(valores, estrategias[valores['campeonato_id']]).items():
+            for campo, valor in fila.items():
+                diferencias[clave][campo] += signo * valor
+
+    equipos_cambiados = []
+    with transaction.atomic():
+        for (campeonato_id, equipo_id), fila in diferencias.items():
+            cambios = {campo: F(campo) + valor for campo, valor in fila.items() if valor}
+            if not cambios:
+                continue
+            # Si el equipo aún no tiene fila (datos anteriores a la tabla) se calcula completa.
+            # Al borrar no se recalcula: la fila falta porque el equipo se está borrando en cascada.
+            if not Posicion.objects.filter(equipo_id=equipo_id).update(**cambios) and partido is not None:
+                guardar_fila_equipo(equipo_id)
+            equipos_cambiados.append(equipo_id)
+    return equipos_cambiados
+
+
+# Calcula desde cero las filas de la tabla de un campeonato: {equipo_id: {campo: valor}}
+def calcular_tabla(campeonato, equipo_ids=None):
+    equipos = campeonato.equipos.all()
+    partidos = Partido.objects.filter(campeonato=campeonato, estado='FINALIZADO')
+    if equipo_ids is not None:
+        equipos = equipos.filter(pk__in=equipo_ids)
+        partidos = partidos.filter(Q(equipo_local_id__in=equipo_ids) | Q(equipo_visitante_id__in=equipo_ids))
+    equipos = list(equipos)
+    filas = {equipo.pk: dict.fromkeys(CAMPOS_TABLA, 0) for equipo in equipos}
+
+    estrategia = estrategia_para(campeonato.deporte)
+    for valores in partidos.values(*Partido.CAMPOS_SEGUIDOS):
+        for (_, equipo_id), aporte in aporte_partido(valores, estrategia).items():
+            if equipo_id in filas:
+                for campo, valor in aporte.items():
+                    filas[equipo_id][campo] += valor
+
+    # En los deportes que puntúan por estadísticas los puntos salen de los jugadores
+    if not estrategia.por_partidos:
+        for equipo_id, puntos in estrategia.puntos_campeonato(campeonato, list(filas)).items():
+            filas[equipo_id]['puntos'] = puntos
+    return filas
+
+
+# Calcula y guarda la fila completa de un equipo
+def guardar_fila_equipo(equipo_id):
+    equipo = Equipo.objects.select_related('campeonato__deporte').filter(pk=equipo_id).first()
+    if equipo is None:
+        return None
+    fila = calcular_tabla(equipo.campeonato, [equipo.pk])[equipo.pk]
+    posicion, _ = Posicion.objects.update_or_create(
+        equipo=equipo, defaults={'campeonato': equipo.campeonato, **fila}
+    )
+    return posicion
+
+
+# Recalcula los puntos de un equipo de un deporte que puntúa por estadísticas
+def actualizar_puntos_equipo(equipo_id):
+    equipo = Equipo.objects.select_related('campeonato__deporte').filter(pk=equipo_id).first()
+    if equipo is None:
+        return
+    estrategia = estrategia_para(equipo.campeonato.deporte)
+    if estrategia.por_partidos:
+        return
+    if not Posicion.objects.filter(equipo=equipo).update(puntos=estrategia.puntos_equipo(equipo)):
+        guardar_fila_equipo(equipo.pk)
+
+
+# Reconstruye desde cero la tabla de los campeonatos indicados (todos por defecto), junto con
+# las tablas guardadas por jornada. Devuelve la cantidad de filas escritas.
+def reconstruir_posiciones(campeonatos=None):
+    from .jornadas import reconstruir_jornadas
+    if campeonatos is None:
+        campeonatos = Campeonato.objects.select_related('deporte')
+    campeonatos = list(campeonatos)
+    total = 0
+    with transaction.atomic():
+        for campeonato in campeonatos:
+            filas = calcular_tabla(campeonato)
+            Posicion.objects.filter(Q(campeonato=campeonato) | Q(equipo_id__in=filas)).delete()
+            Posicion.objects.bulk_create([
+                Posicion(campeonato=campeonato, equipo_id=equipo_id, **fila)
+                for equipo_id, fila in filas.items()
+            ])
+            total += len(filas)
+        reconstruir_jornadas(campeonatos)
+    return total
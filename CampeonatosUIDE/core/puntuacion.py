@@ -0,0 +1,163 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import (
+    Campeonato, Partido,
+    EstadisticaJugadorAjedrez, EstadisticaJugadorEcuaboly, EstadisticaJugadorFutbolin,
+    EstadisticaJugadorPingPong, EstadisticaJugadorTenis, EstadisticaJugadorVideojuegos,
+)
+
+
+# Estrategias de puntuación registradas, por código de deporte (Deporte.codigo)
+ESTRATEGIAS = {}
+
+
+# Registra una estrategia bajo su código de deporte
+def registrar(estrategia):
+    ESTRATEGIAS[estrategia.codigo] = estrategia
+    return estrategia
+
+
+# Estrategia del deporte indicado (los deportes sin estrategia no suman puntos)
+def estrategia_para(deporte):
+    return ESTRATEGIAS.get(deporte.codigo, SIN_PUNTUACION)
+
+
+# Estrategia del campeonato indicado por su ID (una consulta)
+def estrategia_campeonato(campeonato_id):
+    codigo = Campeonato.objects.filter(pk=campeonato_id).values_list('deporte__codigo', flat=True).first()
+    return ESTRATEGIAS.get(codigo, SIN_PUNTUACION)
+
+
+# Suma de una expresión sobre las filas de "modelo" relacionadas con el equipo externo,
+# como subconsulta correlacionada (así no se multiplican filas al combinar varias tablas)
+def _subconsulta_suma(modelo, expresion, **filtros):
+    filas = modelo.objects.filter(**filtros).order_by().values(*filtros)
+    suma = filas.annotate(total=Sum(expresion)).values('total')
+    return Coalesce(Subquery(suma, output_field=DecimalField()), Value(0), output_field=DecimalField())
+
+
+# Estrategia base: cada deporte define cómo se calculan los puntos de todos los equipos
+# de un campeonato a la vez (puntos_campeonato) y su equivalente en SQL (expresion_puntos).
+class EstrategiaPuntuacion:
+    codigo = None
+    # True si los puntos salen de los resultados de los partidos
+    por_partidos = False
+
+    # Puntos de los equipos del campeonato: {equipo_id: Decimal}
+    def puntos_campeonato(self, campeonato, equipo_ids=None):
+        return {}
+
+    # Expresión SQL con los puntos del equipo de la consulta externa (OuterRef('pk'))
+    def expresion_puntos(self):
+        return Value(0)
+
+    # Puntos de un solo equipo
+    def puntos_equipo(self, equipo):
+        return self.puntos_campeonato(equipo.campeonato, [equipo.pk]).get(equipo.pk, Decimal(0))
+
+
+# Deportes que puntúan por resultado: puntos fijos por victoria, empate y derrota
+class PuntuacionPorResultados(EstrategiaPuntuacion):
+    por_partidos = True
+
+    def __init__(self, codigo, victoria, empate=0, derrota=0):
+        self.codigo = codigo
+        self.victoria = victoria
+        self.empate = empate
+        self.derrota = derrota
+
+    # Puntos que da un resultado a quien hizo "propios" contra "rival"
+    def puntos_resultado(self, propios, rival):
+        if propios > rival:
+            return self.victoria
+        if propios == rival:
+            return self.empate
+        return self.derrota
+
+    def puntos_campeonato(self, campeonato, equipo_ids=None):
+        puntos = defaultdict(Decimal)
+        if equipo_ids is not None:
+            for equipo_id in equipo_ids:
+                puntos[equipo_id] = Decimal(0)
+        partidos = Partido.objects.filter(
+            campeonato=campeonato, estado='FINALIZADO',
+            resultado_local__isnull=False, resultado_visitante__isnull=False,
+        ).values_list('equipo_local_id', 'equipo_visitante_id', 'resultado_local', 'resultado_visitante')
+        for local_id, visitante_id, goles_local, goles_visitante in partidos:
+            for equipo_id, propios, rival in ((local_id, goles_local, goles_visitante), (visitante_id, goles_visitante, goles_local)):
+                if equipo_ids is None or equipo_id in puntos:
+                    puntos[equipo_id] += self.puntos_resultado(propios, rival)
+        return dict(puntos)
+
+    def expresion_puntos(self):
+        finalizado = {'estado': 'FINALIZADO'}
+        # Igual que puntos_campeonato: un partido finalizado sin resultados no suma (ni la derrota)
+        sin_resultado = When(Q(resultado_local__isnull=True) | Q(resultado_visitante__isnull=True), then=Value(0))
+        return _subconsulta_suma(
+            Partido,
+            Case(
+                sin_resultado,
+                When(resultado_local__gt=F('resultado_visitante'), then=Value(self.victoria)),
+                When(resultado_local=F('resultado_visitante'), then=Value(self.empate)),
+                default=Value(self.derrota),
+            ),
+            equipo_local=OuterRef('pk'), **finalizado,
+        ) + _subconsulta_suma(
+            Partido,
+            Case(
+                sin_resultado,
+                When(resultado_visitante__gt=F('resultado_local'), then=Value(self.victoria)),
+                When(resultado_visitante=F('resultado_local'), then=Value(self.empate)),
+                default=Value(self.derrota),
+            ),
+            equipo_visitante=OuterRef('pk'), **finalizado,
+        )
+
+
+# Deportes que puntúan por estadísticas de jugadores: suma ponderada de columnas de "modelo"
+class PuntuacionPorEstadisticas(EstrategiaPuntuacion):
+
+    def __init__(self, codigo, modelo, factores):
+        self.codigo = codigo
+        self.modelo = modelo
+        # {columna: puntos por unidad}
+        self.factores = factores
+
+    def puntos_campeonato(self, campeonato, equipo_ids=None):
+        filas = self.modelo.objects.filter(campeonato=campeonato)
+        if equipo_ids is not None:
+            filas = filas.filter(jugador__equipo_id__in=equipo_ids)
+        puntos = defaultdict(Decimal)
+        for equipo_id in equipo_ids or ():
+            puntos[equipo_id] = Decimal(0)
+        columnas = list(self.factores)
+        # Una sola lectura de las filas del campeonato, acumulando por equipo
+        for equipo_id, *valores in filas.values_list('jugador__equipo_id', *columnas):
+            puntos[equipo_id] += sum(Decimal(str(self.factores[columna])) * valor for columna, valor in zip(columnas, valores))
+        return dict(puntos)
+
+    def expresion_puntos(self):
+        expresion = sum((F(columna) * Value(factor) for columna, factor in self.factores.items()), Value(0))
+        return _subconsulta_suma(
+            self.modelo, expresion, jugador__equipo=OuterRef('pk'), campeonato=OuterRef('campeonato'),
+        )
+
+
+# Deportes sin reglas de puntuación
+SIN_PUNTUACION = EstrategiaPuntuacion()
+
+
+# Deportes registrados
+registrar(PuntuacionPorResultados('FUTBOL', victoria=3, empate=1))
+# Básquet: 2 puntos por victoria y 1 por derrota (sistema FIBA), con los resultados de los partidos
+registrar(PuntuacionPorResultados('BASQUET', victoria=2, derrota=1))
+registrar(PuntuacionPorEstadisticas('AJEDREZ', EstadisticaJugadorAjedrez, {'partidas_ganadas': 1, 'partidas_empatadas': 0.5}))
+registrar(PuntuacionPorEstadisticas('ECUABOLY', EstadisticaJugadorEcuaboly, {'sets_ganados': 1}))
+registrar(PuntuacionPorEstadisticas('PING_PONG', EstadisticaJugadorPingPong, {'partidos_ganados': 3}))
+registrar(PuntuacionPorEstadisticas('TENIS', EstadisticaJugadorTenis, {'sets_ganados': 1}))
+registrar(PuntuacionPorEstadisticas('FUTBOLIN', EstadisticaJugadorFutbolin, {'partidos_ganados': 3}))
+registrar(PuntuacionPorEstadisticas('VIDEOJUEGOS', EstadisticaJugadorVideojuegos, {'partidas_ganadas': 3}))
@@ -0,0 +1,94 @@
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import ESTADISTICAS_POR_DEPORTE, Jugador, ReglaSuspension, Suspension
+
+
+# Columnas de estadísticas que pueden tener reglas de suspensión
+COLUMNAS_TARJETAS = tuple(columna for columna, _ in ReglaSuspension.TARJETAS)
+
+
+# True si entre los valores anteriores y los actuales de una fila de estadísticas cambió
+# alguna columna de tarjetas (anterior None: la fila es nueva)
+def cambiaron_tarjetas(anterior, actual):
+    return any(
+        (anterior or {}).get(columna, 0) != actual.get(columna, 0)
+        for columna in COLUMNAS_TARJETAS if columna in actual
+    )
+
+
+# Aplica las reglas de suspensión activas de un campeonato a los jugadores indicados (por
+# defecto, a todos los del campeonato). Por cada regla, un jugador con T tarjetas debe tener
+# T // cantidad sanciones; las que falten se agregan extendiendo la suspensión que la regla
+# tenga vigente o creando una nueva a partir de mañana (o del final de su última suspensión).
+# Las tarjetas que se corrigen hacia abajo no quitan suspensiones ya dadas.
+# Todo ocurre en una transacción con los jugadores bloqueados, así dos evaluaciones a la vez
+# no sancionan dos veces. Devuelve la cantidad de suspensiones creadas o extendidas.
+def evaluar_suspensiones(campeonato_id, jugador_ids=None):
+    reglas = list(ReglaSuspension.objects.filter(campeonato_id=campeonato_id, activa=True).select_related('campeonato__deporte'))
+    if not reglas:
+        return 0
+    modelo = ESTADISTICAS_POR_DEPORTE.get(reglas[0].campeonato.deporte.codigo)
+    columnas_modelo = {campo.name for campo in modelo._meta.concrete_fields} if modelo is not None else set()
+    reglas = [regla for regla in reglas if regla.tarjeta in columnas_modelo]
+    if not reglas:
+        return 0
+
+    hoy = timezone.localdate()
+    with transaction.atomic():
+        jugadores = Jugador.objects.filter(equipo__campeonato_id=campeonato_id)
+        if jugador_ids is not None:
+            jugadores = jugadores.filter(pk__in=list(jugador_ids))
+        ids = list(jugadores.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+        tarjetas = {
+            fila.pop('jugador_id'): fila
+            for fila in modelo.objects.filter(campeonato_id=campeonato_id, jugador_id__in=ids)
+            .values('jugador_id', *{regla.tarjeta for regla in reglas})
+        }
+        suspensiones = Suspension.objects.filter(jugador_id__in=list(tarjetas))
+        aplicadas = {
+            (fila['regla_id'], fila['jugador_id']): fila['total']
+            for fila in suspensiones.filter(regla__in=reglas).values('regla_id', 'jugador_id').order_by().annotate(total=Sum('sanciones'))
+        }
+        # Suspensión vigente o futura de cada regla por jugador (la que termina último)
+        abiertas = {
+            (suspension.regla_id, suspension.jugador_id): suspension
+            for suspension in suspensiones.filter(regla__in=reglas, fecha_fin__gte=hoy).order_by('fecha_fin', 'pk')
+        }
+        ultimo_fin = defaultdict(lambda: hoy, {
+            fila['jugador_id']: max(fila['fin'], hoy)
+            for fila in suspensiones.values('jugador_id').order_by().annotate(fin=Max('fecha_fin'))
+        })
+
+        nuevas, extendidas = [], []
+        for jugador_id, valores in tarjetas.items():
+            for regla in reglas:
+                faltan = valores[regla.tarjeta] // regla.cantidad - aplicadas.get((regla.pk, jugador_id), 0)
+                if faltan <= 0:
+                    continue
+                duracion = datetime.timedelta(days=faltan * regla.dias)
+                abierta = abiertas.get((regla.pk, jugador_id))
+                if abierta is not None:
+                    abierta.fecha_fin += duracion
+                    abierta.sanciones += faltan
+                    if abierta.pk:
+                        extendidas.append(abierta)
+                else:
+                    inicio = ultimo_fin[jugador_id] + datetime.timedelta(days=1)
+                    abierta = Suspension(
+                        jugador_id=jugador_id, regla=regla, sanciones=faltan,
+                        fecha_inicio=inicio, fecha_fin=inicio + duracion - datetime.timedelta(days=1),
+                        motivo=f"Automática: {valores[regla.tarjeta]} {regla.get_tarjeta_display().lower()} (regla {regla}).",
+                    )
+                    abiertas[(regla.pk, jugador_id)] = abierta
+                    nuevas.append(abierta)
+                ultimo_fin[jugador_id] = max(ultimo_fin[jugador_id], abierta.fecha_fin)
+
+        Suspension.objects.bulk_create(nuevas)
+        Suspension.objects.bulk_update(extendidas, ['fecha_fin', 'sanciones'])
+    return len(nuevas) + len(extendidas)
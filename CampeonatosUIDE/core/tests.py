@@ -1,3 +1,1324 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .models import Campeonato, Carrera, Deporte, Equipo, Partido, Posicion, Usuario
+from .posiciones import CAMPOS_TABLA, reconstruir_posiciones
+
+
+# Campeonato de prueba con "cantidad" equipos aprobados (E0, E1, ...) que juega sábados y domingos de 2025
+def crear_campeonato(deporte='FUTBOL', cantidad=4, **datos):
+    deporte, _ = Deporte.objects.get_or_create(nombre=deporte)
+    carrera, _ = Carrera.objects.get_or_create(nombre='TICS')
+    delegado, _ = Usuario.objects.get_or_create(username='delegado', defaults={'rol': 'DELEGADO'})
+    campeonato = Campeonato.objects.create(
+        nombre=f"Campeonato {Campeonato.objects.count() + 1}", descripcion='Prueba', deporte=deporte,
+        fecha_inicio=datetime.date(2025, 1, 1), fecha_fin=datetime.date(2025, 12, 31),
+        estado='EN_CURSO', dias_partido=['SABADO', 'DOMINGO'], **datos,
+    )
+    equipos = [
+        Equipo.objects.create(campeonato=campeonato, nombre=f"E{numero}", carrera=carrera, logo='logos_equipos/prueba.jpg', delegado=delegado)
+        for numero in range(cantidad)
+    ]
+    # Equipo.save deja sin aprobar a los equipos sin pago aprobado
+    Equipo.objects.filter(campeonato=campeonato).update(aprobado=True)
+    for equipo in equipos:
+        equipo.aprobado = True
+    return campeonato, equipos
+
+
+def crear_partido(campeonato, local, visitante, resultado_local=None, resultado_visitante=None, estado='PROGRAMADO',
+                  fecha=datetime.date(2025, 1, 4), hora=datetime.time(10), lugar='Cancha 1'):
+    return Partido.objects.create(
+        campeonato=campeonato, equipo_local=local, equipo_visitante=visitante, fecha=fecha, hora=hora, lugar=lugar,
+        resultado_local=resultado_local, resultado_visitante=resultado_visitante, estado=estado,
+    )
+
+
+def crear_jugador(equipo, usuario, numero_camiseta=None):
+    from .models import Jugador
+    return Jugador.objects.create(
+        equipo=equipo, usuario=Usuario.objects.create(username=usuario, rol='JUGADOR'),
+        numero_camiseta=numero_camiseta or Jugador.objects.filter(equipo=equipo).count() + 1, edad=20,
+    )
+
+
+# La tabla que mantienen las señales (sumando diferencias con F()) tiene que ser siempre igual
+# a la que se calcula desde cero con reconstruir_posiciones
+class PosicionesIncrementalesTest(TestCase):
+    def setUp(self):
+        self.campeonato, self.equipos = crear_campeonato()
+
+    def tabla(self):
+        return {
+            fila['equipo_id']: {campo: float(fila[campo]) for campo in CAMPOS_TABLA}
+            for fila in Posicion.objects.filter(campeonato=self.campeonato).values('equipo_id', *CAMPOS_TABLA)
+        }
+
+    def assertTablaIgualReconstruida(self):
+        incremental = self.tabla()
+        reconstruir_posiciones(Campeonato.objects.filter(pk=self.campeonato.pk).select_related('deporte'))
+        self.assertEqual(incremental, self.tabla())
+        return incremental
+
+    def test_crear_partido_finalizado(self):
+        local, visitante = self.equipos[:2]
+        crear_partido(self.campeonato, local, visitante, 2, 1, 'FINALIZADO')
+        tabla = self.assertTablaIgualReconstruida()
+        self.assertEqual(tabla[local.pk]['puntos'], 3)
+        self.assertEqual(tabla[visitante.pk]['partidos_perdidos'], 1)
+
+    def test_corregir_resultado(self):
+        local, visitante = self.equipos[:2]
+        partido = crear_partido(self.campeonato, local, visitante, 2, 1, 'FINALIZADO')
+        partido.resultado_local, partido.resultado_visitante = 1, 1
+        partido.save()
+        tabla = self.assertTablaIgualReconstruida()
+        self.assertEqual(tabla[local.pk]['puntos'], 1)
+        self.assertEqual(tabla[local.pk]['partidos_ganados'], 0)
+        self.assertEqual(tabla[visitante.pk]['partidos_empatados'], 1)
+
+    def test_volver_a_en_curso(self):
+        local, visitante = self.equipos[:2]
+        partido = crear_partido(self.campeonato, local, visitante, 3, 0, 'FINALIZADO')
+        partido.estado = 'EN_CURSO'
+        partido.save()
+        tabla = self.assertTablaIgualReconstruida()
+        self.assertEqual(tabla[local.pk]['partidos_jugados'], 0)
+        self.assertEqual(tabla[local.pk]['puntos'], 0)
+
+    def test_borrar_partido(self):
+        local, visitante = self.equipos[:2]
+        crear_partido(self.campeonato, local, visitante, 0, 2, 'FINALIZADO', lugar='Cancha 2')
+        partido = crear_partido(self.campeonato, self.equipos[2], self.equipos[3], 1, 0, 'FINALIZADO')
+        partido.delete()
+        tabla = self.assertTablaIgualReconstruida()
+        self.assertEqual(tabla[self.equipos[2].pk]['partidos_jugados'], 0)
+        self.assertEqual(tabla[visitante.pk]['puntos'], 3)
+
+    def test_cambiar_equipo_de_partido_finalizado(self):
+        local, visitante, otro = self.equipos[:3]
+        partido = crear_partido(self.campeonato, local, visitante, 2, 0, 'FINALIZADO')
+        partido.equipo_visitante = otro
+        partido.save()
+        tabla = self.assertTablaIgualReconstruida()
+        self.assertEqual(tabla[visitante.pk]['partidos_jugados'], 0)
+        self.assertEqual(tabla[otro.pk]['goles_contra'], 2)
+
+
+# Con equipos empatados la tabla desempata por nombre: las páginas no repiten ni omiten equipos
+# y la tabla guardada de cada jornada sale en el mismo orden
+class OrdenTablaTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.campeonato, self.equipos = crear_campeonato(cantidad=25)
+        Equipo.objects.filter(pk=self.equipos[0].pk).update(nombre='Zeta')
+        Equipo.objects.filter(pk=self.equipos[24].pk).update(nombre='Alfa')
+        self.nombres = sorted(Equipo.objects.filter(campeonato=self.campeonato).values_list('nombre', flat=True))
+
+    def test_paginas_con_empates(self):
+        vistos = []
+        for pagina in (1, 2):
+            respuesta = self.client.get(f"/campeonato/{self.campeonato.pk}/tabla/?pagina={pagina}")
+            vistos += [posicion.equipo.nombre for posicion in respuesta.context['pagina']]
+        self.assertEqual(vistos, self.nombres)
+
+    def test_jornada_con_empates(self):
+        crear_partido(self.campeonato, self.equipos[1], self.equipos[2], 1, 1, 'FINALIZADO')
+        filas = self.client.get(f"/api/campeonato/{self.campeonato.pk}/jornada/1/").json()['posiciones']
+        self.assertEqual([fila['equipo']['nombre'] for fila in filas], ['E1', 'E2'] + [n for n in self.nombres if n not in ('E1', 'E2')])
+
+
+# Los puntos calculados en SQL (Equipo.objects.with_puntos) y en Python (puntos_totales)
+# tienen que coincidir, también con partidos finalizados sin resultado
+class PuntuacionTest(TestCase):
+    def test_partido_finalizado_sin_resultado_no_suma_derrota(self):
+        campeonato, equipos = crear_campeonato('BASQUET', 3)
+        crear_partido(campeonato, equipos[0], equipos[1], 80, 70, 'FINALIZADO')
+        crear_partido(campeonato, equipos[0], equipos[2], 60, 75, 'FINALIZADO', hora=datetime.time(12))
+        crear_partido(campeonato, equipos[2], equipos[1], estado='FINALIZADO', fecha=datetime.date(2025, 1, 5))
+        for equipo in Equipo.objects.filter(campeonato=campeonato).with_puntos():
+            self.assertEqual(equipo.puntos, equipo.puntos_totales, equipo.nombre)
+        self.assertEqual(Equipo.objects.with_puntos().get(pk=equipos[1].pk).puntos, 1)
+
+
+class CachePorCampeonatoTest(TestCase):
+    def test_acierto_responde_igual_que_la_vista(self):
+        from django.core.cache import cache
+        cache.clear()
+        campeonato, _ = crear_campeonato()
+        url = f"/campeonato/{campeonato.pk}/tabla/"
+        primera = self.client.get(url)
+        with self.assertNumQueries(0):
+            segunda = self.client.get(url)
+        self.assertEqual(segunda.status_code, primera.status_code)
+        self.assertEqual(segunda['Content-Type'], primera['Content-Type'])
+        self.assertEqual(segunda.content, primera.content)
+
+    def test_nombres_mostrados_desde_otros_modelos(self):
+        from django.utils import timezone
+        from .models import Arbitro
+        from .versiones import version_campeonato
+        campeonato, equipos = crear_campeonato()
+        arbitro = Arbitro.objects.create(nombre='Ana', apellido='Paz', experiencia='-', contacto='-')
+        crear_partido(campeonato, equipos[0], equipos[1])
+        Partido.objects.update(arbitro=arbitro)
+        usuario = crear_jugador(equipos[0], 'jugadora').usuario
+        cambios = [
+            (arbitro, 'nombre', 'Ana María'),
+            (campeonato.deporte, 'nombre', 'Fútbol 7'),
+            (usuario, 'first_name', 'Juana'),
+            (equipos[0].carrera, 'nombre', 'Software'),
+        ]
+        for objeto, campo, valor in cambios:
+            antes = version_campeonato(campeonato.pk)
+            setattr(objeto, campo, valor)
+            with self.captureOnCommitCallbacks(execute=True):
+                objeto.save()
+            self.assertNotEqual(version_campeonato(campeonato.pk), antes, type(objeto).__name__)
+
+        # Iniciar sesión no cambia nada de lo que se muestra
+        antes = version_campeonato(campeonato.pk)
+        usuario.last_login = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.save(update_fields=['last_login'])
+        self.assertEqual(version_campeonato(campeonato.pk), antes)
+
+
+# Prueba de humo de los comandos de datos de prueba y medición, a escala chica
+class PoblarYMedirTest(TestCase):
+    # Nombre de cada caso de medir_rendimiento en settings.PRESUPUESTO_CONSULTAS
+    PRESUPUESTOS = {
+        'vista_inicio': 'inicio', 'vista_inicio_publico': 'inicio_publico', 'tabla_campeonato': 'tabla_campeonato',
+        'clasificaciones': 'clasificaciones', 'detalle_equipo': 'detalle_equipo',
+    }
+
+    def test_poblar_datos_y_medir_rendimiento(self):
+        import json
+        import tempfile
+        from io import StringIO
+
+        from django.conf import settings
+        from django.core.management import call_command
+
+        from .models import Jugador
+
+        call_command('poblar_datos', campeonatos=2, equipos=4, jugadores=3, prefijo='prueba', stdout=StringIO())
+        self.assertEqual(Campeonato.objects.count(), 2)
+        self.assertEqual(Equipo.objects.count(), 8)
+        self.assertEqual(Jugador.objects.count(), 24)
+        # Todos contra todos de 4 equipos: 6 partidos por campeonato
+        self.assertEqual(Partido.objects.count(), 12)
+        self.assertEqual(Posicion.objects.count(), 8)
+
+        with tempfile.NamedTemporaryFile(suffix='.json') as salida:
+            call_command('medir_rendimiento', repeticiones=2, salida=salida.name, stdout=StringIO())
+            with open(salida.name, encoding='utf-8') as archivo:
+                datos = json.load(archivo)
+        self.assertEqual(datos['escala'], {'campeonatos': 2, 'equipos': 8, 'jugadores': 24, 'partidos': 12})
+        for caso, vista in self.PRESUPUESTOS.items():
+            resultado = datos['resultados'][caso]
+            self.assertLessEqual(resultado['consultas_primera'], settings.PRESUPUESTO_CONSULTAS[vista], caso)
+            self.assertEqual(resultado['repetidas'], 0, caso)
+
+
+def finalizar(partido, resultado_local, resultado_visitante):
+    partido.resultado_local, partido.resultado_visitante, partido.estado = resultado_local, resultado_visitante, 'FINALIZADO'
+    partido.save()
+
+
+class LlaveTest(TestCase):
+    def setUp(self):
+        from .models import TipoCampeonato
+        tipo = TipoCampeonato.objects.create(nombre='Eliminación', formato='ELIMINACION')
+        self.campeonato, self.equipos = crear_campeonato(cantidad=4, tipo_campeonato=tipo)
+
+    def armar(self):
+        from .llaves import generar_llave, guardar_llave
+        cruces, partidos = generar_llave(self.campeonato, self.equipos, ['Cancha 1', 'Cancha 2'], [datetime.time(10)])
+        guardar_llave(self.campeonato, cruces, partidos)
+        return list(Partido.objects.order_by('pk'))
+
+    def test_corregir_resultado_con_el_siguiente_partido_jugado(self):
+        from django.core.exceptions import ValidationError
+
+        from .models import CruceLlave
+        semifinal, otra = self.armar()
+        finalizar(semifinal, 2, 0)
+        finalizar(otra, 1, 0)
+        final = Partido.objects.get(cruce__ronda=2)
+        final.estado = 'EN_CURSO'
+        final.save()
+        finalistas = (final.equipo_local_id, final.equipo_visitante_id)
+
+        # El formulario rechaza la corrección que cambia al ganador
+        semifinal.resultado_local, semifinal.resultado_visitante = 0, 3
+        with self.assertRaises(ValidationError):
+            semifinal.full_clean()
+        # Guardando sin validar la llave no cambia: sigue igual al partido que se está jugando
+        semifinal.save()
+        cruce = CruceLlave.objects.get(partido=semifinal)
+        self.assertEqual(cruce.ganador_id, semifinal.equipo_local_id)
+        final.refresh_from_db()
+        self.assertEqual((final.equipo_local_id, final.equipo_visitante_id), finalistas)
+        self.assertEqual(
+            CruceLlave.objects.filter(ronda=2).values_list('equipo_local_id', 'equipo_visitante_id').get(), finalistas,
+        )
+
+    def test_corregir_resultado_antes_del_siguiente_partido(self):
+        semifinal, otra = self.armar()
+        finalizar(semifinal, 2, 0)
+        finalizar(otra, 1, 0)
+        semifinal.resultado_local, semifinal.resultado_visitante = 0, 3
+        semifinal.full_clean()
+        semifinal.save()
+        final = Partido.objects.get(cruce__ronda=2)
+        self.assertIn(semifinal.equipo_visitante_id, (final.equipo_local_id, final.equipo_visitante_id))
+
+    def test_pases_libres_con_cantidad_que_no_es_potencia_de_dos(self):
+        from .llaves import armar_llave, orden_siembra
+        self.assertEqual(orden_siembra(8), [1, 8, 4, 5, 2, 7, 3, 6])
+        _, equipos = crear_campeonato(cantidad=6)
+        cruces = armar_llave(self.campeonato, equipos)
+        self.assertEqual(len(cruces), 7)
+        primera = [cruces[(1, posicion)] for posicion in range(4)]
+        # Los cabezas de serie 1 y 2 pasan libres y ya están en semifinales, en lados opuestos
+        libres = [cruce for cruce in primera if cruce.equipo_visitante is None]
+        self.assertEqual([cruce.ganador for cruce in libres], [equipos[0], equipos[1]])
+        self.assertEqual(cruces[(2, 0)].equipo_local, equipos[0])
+        self.assertEqual(cruces[(2, 1)].equipo_local, equipos[1])
+        self.assertEqual(sum(cruce.equipo_visitante is not None for cruce in primera), 2)
+
+    def test_llave_de_tres_equipos_solo_juega_un_partido_de_entrada(self):
+        from .llaves import generar_llave
+        cruces, partidos = generar_llave(self.campeonato, self.equipos[:3], ['Cancha 1'], [datetime.time(10)])
+        self.assertEqual(len(cruces), 3)
+        self.assertEqual([(partido.equipo_local, partido.equipo_visitante) for partido in partidos], [(self.equipos[1], self.equipos[2])])
+
+
+class SorteoGruposTest(TestCase):
+    def setUp(self):
+        self.campeonato, self.equipos = crear_campeonato(cantidad=8)
+        # Dos equipos por carrera: E0 y E1 de la carrera 0, E2 y E3 de la 1, ...
+        for numero, equipo in enumerate(self.equipos):
+            equipo.carrera = Carrera.objects.get_or_create(nombre=f"Carrera {numero // 2}")[0]
+        Equipo.objects.bulk_update(self.equipos, ['carrera'])
+
+    def test_un_equipo_de_cada_bombo_y_carreras_separadas(self):
+        from .grupos import sortear_grupos
+        bombos = [self.equipos[:4], self.equipos[4:]]
+        grupos = sortear_grupos(bombos, 4, semilla=7)
+        self.assertEqual(sorted(grupos), ['A', 'B', 'C', 'D'])
+        for integrantes in grupos.values():
+            self.assertEqual(len(integrantes), 2)
+            self.assertEqual(sum(equipo in bombos[0] for equipo in integrantes), 1)
+            self.assertNotEqual(integrantes[0].carrera_id, integrantes[1].carrera_id)
+        # Con la misma semilla sale el mismo sorteo
+        self.assertEqual(grupos, sortear_grupos(bombos, 4, semilla=7))
+
+    def test_sorteo_imposible(self):
+        from .grupos import ErrorSorteo, sortear_grupos
+        # Ocho equipos no entran en dos grupos de tres
+        with self.assertRaises(ErrorSorteo):
+            sortear_grupos([self.equipos], 2, tamanio_maximo=3)
+        # Más grupos que equipos
+        with self.assertRaises(ErrorSorteo):
+            sortear_grupos([self.equipos[:2]], 3)
+
+    def test_sin_reparto_separado_se_permite_repetir_carrera(self):
+        from .grupos import sortear_grupos
+        # E0 y E1 (misma carrera) son los únicos equipos de sus bombos y tienen que ir juntos
+        grupos = sortear_grupos([[self.equipos[0]], [self.equipos[1]]], 1, semilla=1)
+        self.assertEqual(sorted(equipo.nombre for equipo in grupos['A']), ['E0', 'E1'])
+
+
+class FixtureTest(TestCase):
+    def setUp(self):
+        self.campeonato, self.equipos = crear_campeonato(cantidad=5)
+
+    def test_todos_contra_todos(self):
+        from collections import Counter
+
+        from .fixture import rondas_todos_contra_todos
+        rondas = rondas_todos_contra_todos(self.equipos)
+        self.assertEqual(len(rondas), 5)
+        cruces = [frozenset(cruce) for ronda in rondas for cruce in ronda]
+        self.assertEqual(len(cruces), 10)
+        self.assertEqual(len(set(cruces)), 10)
+        # Con cantidad impar cada equipo descansa una vez y es local dos veces
+        for ronda in rondas:
+            self.assertEqual(len(ronda), 2)
+        self.assertEqual(set(Counter(local for ronda in rondas for local, _ in ronda).values()), {2})
+
+    def test_no_usa_horarios_ocupados(self):
+        from .fixture import generar_fixture
+        # El primer sábado ya tiene ocupados la Cancha 1 a las 10 y al equipo E2 a las 12
+        crear_partido(self.campeonato, self.equipos[0], self.equipos[1], lugar='cancha 1 ')
+        crear_partido(self.campeonato, self.equipos[2], self.equipos[3], hora=datetime.time(12), lugar='Coliseo')
+        partidos = generar_fixture(self.campeonato, ['Cancha 1', 'Cancha 2'], [datetime.time(10), datetime.time(12)])
+        self.assertEqual(len(partidos), 10)
+        horarios = set()
+        for partido in partidos:
+            self.assertNotEqual((partido.fecha, partido.hora, partido.lugar), (datetime.date(2025, 1, 4), datetime.time(10), 'Cancha 1'))
+            for equipo in (partido.equipo_local, partido.equipo_visitante):
+                # Un equipo juega una vez por día, contando los partidos que ya tenía
+                self.assertNotIn((equipo.pk, partido.fecha), horarios)
+                horarios.add((equipo.pk, partido.fecha))
+        for equipo in self.equipos[:4]:
+            self.assertNotIn((equipo.pk, datetime.date(2025, 1, 4)), horarios)
+
+    def test_sin_fechas_suficientes(self):
+        from .fixture import ErrorFixture, generar_fixture
+        self.campeonato.fecha_fin = datetime.date(2025, 1, 5)
+        with self.assertRaises(ErrorFixture):
+            generar_fixture(self.campeonato, ['Cancha 1'], [datetime.time(10)])
+
+    def test_horario_ocupado_mientras_tanto_rechaza_el_lote(self):
+        from .fixture import ErrorFixture, generar_fixture, guardar_fixture
+        partidos = generar_fixture(self.campeonato, ['Cancha 1'], [datetime.time(10), datetime.time(12)])
+        primero = partidos[0]
+        # Otro partido ocupa el mismo lugar y horario antes de guardar el fixture
+        otros = [equipo for equipo in self.equipos if equipo not in (primero.equipo_local, primero.equipo_visitante)]
+        crear_partido(self.campeonato, otros[0], otros[1], fecha=primero.fecha, hora=primero.hora, lugar=' CANCHA 1')
+        with self.assertRaises(ErrorFixture):
+            guardar_fixture(self.campeonato, partidos)
+        self.assertEqual(Partido.objects.count(), 1)
+
+
+class AsignacionArbitrosTest(TestCase):
+    def setUp(self):
+        from .models import Arbitro
+        self.campeonato, self.equipos = crear_campeonato(cantidad=6)
+        self.futbol = self.campeonato.deporte
+        ajedrez, _ = Deporte.objects.get_or_create(nombre='AJEDREZ')
+
+        def arbitro(nombre, deportes, estado=True):
+            nuevo = Arbitro.objects.create(nombre=nombre, apellido='Prueba', experiencia='', contacto='', estado=estado)
+            nuevo.deportes.set(deportes)
+            return nuevo
+
+        self.primero = arbitro('Primero', [self.futbol])
+        self.segundo = arbitro('Segundo', [self.futbol, ajedrez])
+        arbitro('Inactivo', [self.futbol], estado=False)
+        arbitro('Ajedrez', [ajedrez])
+        e = self.equipos
+        self.partidos = [
+            crear_partido(self.campeonato, e[0], e[1], hora=datetime.time(10), lugar='Cancha 1'),
+            crear_partido(self.campeonato, e[2], e[3], hora=datetime.time(10), lugar='Cancha 2'),
+            crear_partido(self.campeonato, e[4], e[5], hora=datetime.time(11), lugar='Cancha 1'),
+        ]
+
+    def test_reparte_sin_superponer(self):
+        from .arbitrajes import asignar_arbitros, guardar_arbitros
+        asignados, sin_asignar = asignar_arbitros(Partido.objects.all())
+        # A las 10 hay dos partidos y dos árbitros habilitados; el de las 11 se superpone con ambos
+        self.assertEqual([partido.pk for partido in sin_asignar], [self.partidos[2].pk])
+        self.assertEqual({partido.arbitro for partido in asignados}, {self.primero, self.segundo})
+        self.assertEqual(len(guardar_arbitros(asignados)), 2)
+
+    def test_sin_arbitros_habilitados(self):
+        from .arbitrajes import asignar_arbitros
+        self.primero.deportes.clear()
+        self.segundo.estado = False
+        self.segundo.save()
+        asignados, sin_asignar = asignar_arbitros(Partido.objects.all())
+        self.assertEqual(asignados, [])
+        self.assertEqual(len(sin_asignar), 3)
+
+    def test_carga_pareja(self):
+        from collections import Counter
+
+        from .arbitrajes import asignar_arbitros
+        for numero, partido in enumerate(self.partidos):
+            partido.fecha = datetime.date(2025, 1, 4) + datetime.timedelta(weeks=numero)
+            partido.save()
+        crear_partido(self.campeonato, self.equipos[0], self.equipos[2], fecha=datetime.date(2025, 2, 1))
+        asignados, _ = asignar_arbitros(Partido.objects.all())
+        self.assertEqual(sorted(Counter(partido.arbitro_id for partido in asignados).values()), [2, 2])
+
+    def test_no_pisa_asignaciones_hechas_mientras_tanto(self):
+        from .arbitrajes import asignar_arbitros, guardar_arbitros
+        asignados, _ = asignar_arbitros(Partido.objects.all())
+        # Mientras tanto alguien asigna a mano un partido y ocupa al otro árbitro a esa hora
+        manual, otro = asignados
+        Partido.objects.filter(pk=manual.pk).update(arbitro=self.primero)
+        Partido.objects.filter(pk=self.partidos[2].pk).update(arbitro=otro.arbitro)
+        self.assertEqual(guardar_arbitros(asignados), [])
+        self.assertEqual(Partido.objects.get(pk=manual.pk).arbitro, self.primero)
+        self.assertIsNone(Partido.objects.get(pk=otro.pk).arbitro)
+
+
+# La migración que crea la tabla de posiciones la llena con los partidos y estadísticas que ya había
+class MigracionPosicionesTest(TransactionTestCase):
+    anterior = [('core', '0003_alter_estadisticabasquet_unique_together_and_more')]
+    posiciones = [('core', '0004_posicion')]
+
+    def test_llenar_tabla_de_equipos_existentes(self):
+        from django.db import connection
+        from django.db.migrations.executor import MigrationExecutor
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.anterior)
+        apps = executor.loader.project_state(self.anterior).apps
+        modelo = lambda nombre: apps.get_model('core', nombre)
+        carrera = modelo('Carrera').objects.create(nombre='TICS')
+        datos = {'descripcion': '', 'estado': 'EN_CURSO', 'dias_partido': 'SABADO', 'fecha_inicio': datetime.date(2025, 1, 1), 'fecha_fin': datetime.date(2025, 12, 31)}
+        futbol = modelo('Campeonato').objects.create(nombre='Fútbol', deporte=modelo('Deporte').objects.create(nombre='Fútbol'), **datos)
+        ajedrez = modelo('Campeonato').objects.create(nombre='Ajedrez', deporte=modelo('Deporte').objects.create(nombre='Ajedrez'), **datos)
+        e = [modelo('Equipo').objects.create(campeonato=futbol, nombre=f"E{numero}", carrera=carrera, logo='x.jpg') for numero in range(3)]
+        torre = modelo('Equipo').objects.create(campeonato=ajedrez, nombre='Torre', carrera=carrera, logo='x.jpg')
+        partido = {'campeonato': futbol, 'fecha': datetime.date(2025, 1, 4), 'hora': datetime.time(10), 'lugar': 'Cancha'}
+        modelo('Partido').objects.create(equipo_local=e[0], equipo_visitante=e[1], resultado_local=2, resultado_visitante=0, estado='FINALIZADO', **partido)
+        modelo('Partido').objects.create(equipo_local=e[1], equipo_visitante=e[2], resultado_local=1, resultado_visitante=1, estado='FINALIZADO', **partido)
+        modelo('Partido').objects.create(equipo_local=e[0], equipo_visitante=e[2], **partido)
+        jugador = modelo('Jugador').objects.create(equipo=torre, usuario=modelo('Usuario').objects.create(username='j1'), numero_camiseta=1, edad=20)
+        modelo('EstadisticaJugadorAjedrez').objects.create(campeonato=ajedrez, jugador=jugador, partidas_ganadas=2, partidas_empatadas=1)
+
+        try:
+            executor = MigrationExecutor(connection)
+            executor.migrate(self.posiciones)
+            Posicion = executor.loader.project_state(self.posiciones).apps.get_model('core', 'Posicion')
+            tabla = {
+                fila['equipo_id']: (float(fila['puntos']), fila['partidos_jugados'], fila['goles_favor'], fila['diferencia_goles'])
+                for fila in Posicion.objects.values('equipo_id', 'puntos', 'partidos_jugados', 'goles_favor', 'diferencia_goles')
+            }
+            self.assertEqual(tabla, {e[0].pk: (3, 1, 2, 2), e[1].pk: (1, 2, 1, -2), e[2].pk: (1, 1, 1, 0), torre.pk: (2.5, 0, 0, 0)})
+        finally:
+            # Los datos se borran con los modelos de 0003, antes de migrar hasta el final
+            MigrationExecutor(connection).migrate(self.anterior)
+            for nombre in ('EstadisticaJugadorAjedrez', 'Jugador', 'Partido', 'Equipo', 'Campeonato', 'Deporte', 'Carrera', 'Usuario'):
+                modelo(nombre).objects.all().delete()
+            executor = MigrationExecutor(connection)
+            executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+# La migración que agrega las restricciones de horarios tiene que listar los choques que ya existen
+class MigracionHorariosTest(TransactionTestCase):
+    anterior = [('core', '0013_llave_eliminacion')]
+    restricciones = [('core', '0014_restricciones_horarios')]
+
+    def setUp(self):
+        from django.db import connection
+        from django.db.migrations.executor import MigrationExecutor
+        self.connection = connection
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.anterior)
+        apps = executor.loader.project_state(self.anterior).apps
+        Partido = apps.get_model('core', 'Partido')
+        deporte = apps.get_model('core', 'Deporte').objects.create(nombre='Fútbol', codigo='FUTBOL')
+        carrera = apps.get_model('core', 'Carrera').objects.create(nombre='TICS')
+        campeonato = apps.get_model('core', 'Campeonato').objects.create(
+            nombre='Histórico', descripcion='', deporte=deporte, estado='EN_CURSO', dias_partido='SABADO',
+            fecha_inicio=datetime.date(2025, 1, 1), fecha_fin=datetime.date(2025, 12, 31),
+        )
+        equipos = [
+            apps.get_model('core', 'Equipo').objects.create(campeonato=campeonato, nombre=f"E{numero}", carrera=carrera, logo='x.jpg')
+            for numero in range(4)
+        ]
+        self.datos = {'campeonato': campeonato, 'fecha': datetime.date(2025, 1, 4), 'hora': datetime.time(10)}
+        self.Partido, self.equipos = Partido, equipos
+
+    # Vuelve a 0013 para borrar los partidos con los modelos de ese momento y migra hasta el final
+    def tearDown(self):
+        from django.db.migrations.executor import MigrationExecutor
+        MigrationExecutor(self.connection).migrate(self.anterior)
+        self.Partido.objects.all().delete()
+        executor = MigrationExecutor(self.connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrar(self):
+        from django.db.migrations.executor import MigrationExecutor
+        executor = MigrationExecutor(self.connection)
+        executor.migrate(self.restricciones)
+
+    def test_lugar_repetido(self):
+        e = self.equipos
+        uno = self.Partido.objects.create(equipo_local=e[0], equipo_visitante=e[1], lugar='Coliseo', **self.datos)
+        otro = self.Partido.objects.create(equipo_local=e[2], equipo_visitante=e[3], lugar=' coliseo', **self.datos)
+        with self.assertRaisesMessage(RuntimeError, f"lugar 'coliseo': partidos {uno.pk} y {otro.pk}"):
+            self.migrar()
+
+    def test_lugar_repetido_con_letras_no_ascii(self):
+        e = self.equipos
+        uno = self.Partido.objects.create(equipo_local=e[0], equipo_visitante=e[1], lugar='Coliseo Ñ', **self.datos)
+        otro = self.Partido.objects.create(equipo_local=e[2], equipo_visitante=e[3], lugar='coliseo ñ', **self.datos)
+        with self.assertRaisesMessage(RuntimeError, f"partidos {uno.pk} y {otro.pk}"):
+            self.migrar()
+
+    def test_equipo_con_dos_partidos_a_la_vez(self):
+        e = self.equipos
+        uno = self.Partido.objects.create(equipo_local=e[0], equipo_visitante=e[1], lugar='Cancha 1', **self.datos)
+        otro = self.Partido.objects.create(equipo_local=e[0], equipo_visitante=e[2], lugar='Cancha 2', **self.datos)
+        with self.assertRaisesMessage(RuntimeError, f"equipo {e[0].pk}, 2025-01-04 10:00:00: partidos {uno.pk} y {otro.pk}"):
+            self.migrar()
+
+    def test_sin_choques(self):
+        e = self.equipos
+        self.Partido.objects.create(equipo_local=e[0], equipo_visitante=e[1], lugar='Cancha 1', **self.datos)
+        self.Partido.objects.create(equipo_local=e[2], equipo_visitante=e[3], lugar=' Coliseo Ñ', **self.datos)
+        self.migrar()
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM core_franjaequipo')
+            self.assertEqual(cursor.fetchone()[0], 4)
+            cursor.execute('SELECT lugar_clave FROM core_partido ORDER BY id')
+            self.assertEqual([fila[0] for fila in cursor.fetchall()], ['cancha 1', 'coliseo ñ'])
+
+
+class ChoqueLugarTest(TestCase):
+    def setUp(self):
+        self.campeonato, self.equipos = crear_campeonato()
+        crear_partido(self.campeonato, self.equipos[0], self.equipos[1], lugar='Coliseo Ñ')
+
+    def test_mismo_lugar_con_letras_no_ascii(self):
+        from .models import MENSAJE_CHOQUE_LUGAR, ChoqueHorario
+        otro = Partido(
+            campeonato=self.campeonato, equipo_local=self.equipos[2], equipo_visitante=self.equipos[3],
+            fecha=datetime.date(2025, 1, 4), hora=datetime.time(10), lugar=' coliseo ñ',
+        )
+        with self.assertRaisesMessage(ChoqueHorario, MENSAJE_CHOQUE_LUGAR):
+            otro.save()
+        self.assertEqual(Partido.objects.count(), 1)
+
+    def test_equipo_con_otro_partido_a_esa_hora(self):
+        from .models import MENSAJE_CHOQUE_EQUIPO, ChoqueHorario
+        otro = Partido(
+            campeonato=self.campeonato, equipo_local=self.equipos[0], equipo_visitante=self.equipos[2],
+            fecha=datetime.date(2025, 1, 4), hora=datetime.time(10), lugar='Cancha 2',
+        )
+        with self.assertRaisesMessage(ChoqueHorario, MENSAJE_CHOQUE_EQUIPO):
+            otro.save()
+        self.assertEqual(Partido.objects.count(), 1)
+
+    def test_editar_el_resultado_no_reescribe_los_horarios(self):
+        from .models import FranjaEquipo
+        partido = Partido.objects.get()
+        franjas = sorted(FranjaEquipo.objects.values_list('pk', flat=True))
+        partido.resultado_local, partido.resultado_visitante, partido.estado = 1, 0, 'FINALIZADO'
+        partido.full_clean()
+        partido.save()
+        self.assertEqual(sorted(FranjaEquipo.objects.values_list('pk', flat=True)), franjas)
+        partido.hora = datetime.time(12)
+        partido.save()
+        self.assertEqual(set(FranjaEquipo.objects.values_list('hora', flat=True)), {datetime.time(12)})
+
+    def test_validar_sin_cambios_hace_una_consulta(self):
+        partido = Partido.objects.select_related('campeonato').get()
+        with self.assertNumQueries(1):
+            partido.clean()
+
+    def test_cambiar_solo_el_lugar_actualiza_la_clave(self):
+        partido = Partido.objects.get()
+        partido.lugar = 'Cancha Ñandú'
+        partido.save(update_fields=['lugar'])
+        self.assertEqual(Partido.objects.values_list('lugar_clave', flat=True).get(), 'cancha ñandú')
+
+    def test_fixture_no_usa_el_lugar_ocupado(self):
+        from .fixture import generar_fixture
+        partidos = generar_fixture(self.campeonato, ['COLISEO ñ'], [datetime.time(10)], equipos=self.equipos[2:])
+        self.assertNotEqual(partidos[0].fecha, datetime.date(2025, 1, 4))
+
+
+# Los calendarios .ics responden con la versión de caché como ETag: tiene que cambiar cuando
+# cambia algo que se ve en el archivo
+class CalendarioTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.campeonato, self.equipos = crear_campeonato()
+        self.partido = crear_partido(self.campeonato, self.equipos[0], self.equipos[1], lugar='Coliseo Ñ')
+
+    def etag(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta['ETag'], respuesta.content.decode()
+
+    def test_lugar_con_letras_no_ascii(self):
+        url = '/calendario/lugar/ COLISEO ñ.ics'
+        antes, contenido = self.etag(url)
+        self.assertIn(f"UID:partido-{self.partido.pk}@", contenido)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.partido.hora = datetime.time(12)
+            self.partido.save()
+        self.assertNotEqual(self.etag(url)[0], antes)
+
+    def test_cambio_de_nombre(self):
+        urls = [
+            f"/calendario/equipo/{self.equipos[1].pk}.ics",
+            f"/calendario/campeonato/{self.campeonato.pk}.ics",
+            '/calendario/lugar/Coliseo Ñ.ics',
+        ]
+        antes = [self.etag(url)[0] for url in urls]
+        with self.captureOnCommitCallbacks(execute=True):
+            equipo = Equipo.objects.get(pk=self.equipos[0].pk)
+            equipo.nombre = 'Los Renombrados'
+            equipo.save()
+        for url, etag in zip(urls, antes):
+            despues, contenido = self.etag(url)
+            self.assertNotEqual(etag, despues, url)
+            self.assertIn('Los Renombrados', contenido, url)
+
+    def test_lo_que_no_existe_no_crea_versiones(self):
+        from django.core.cache import cache
+        urls = [
+            '/calendario/campeonato/999.ics', '/calendario/equipo/999.ics', '/calendario/arbitro/999.ics',
+            '/calendario/lugar/Cancha inventada.ics', '/api/campeonato/999/tabla/',
+        ]
+        claves = set(cache._cache)
+        for url in urls:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 404, url)
+            self.assertNotIn('ETag', respuesta, url)
+        self.assertEqual(set(cache._cache), claves)
+
+    def test_guardar_sin_cambiar_el_nombre(self):
+        url = f"/calendario/campeonato/{self.campeonato.pk}.ics"
+        antes, _ = self.etag(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Campeonato.objects.get(pk=self.campeonato.pk).save()
+        self.assertEqual(self.etag(url)[0], antes)
+
+
+class ExportacionTest(TestCase):
+    def setUp(self):
+        self.campeonato, self.equipos = crear_campeonato()
+        Equipo.objects.filter(pk=self.equipos[0].pk).update(nombre='=HIPERVINCULO("http://x")')
+        crear_jugador(self.equipos[1], '@raro')
+        self.staff = Usuario.objects.create(username='staff', is_staff=True)
+
+    def test_celdas_con_formula_y_numeros_negativos(self):
+        from .exportacion import lineas_csv
+        crear_partido(self.campeonato, self.equipos[0], self.equipos[1], 0, 3, 'FINALIZADO')
+        posiciones = ''.join(lineas_csv(self.campeonato, 'posiciones'))
+        self.assertIn("'=HIPERVINCULO", posiciones)
+        self.assertIn(',-3\r\n', posiciones)
+        self.assertIn("'@raro", ''.join(lineas_csv(self.campeonato, 'jugadores')))
+
+    def test_version_asincrona_genera_lo_mismo(self):
+        from asgiref.sync import async_to_sync
+        from .exportacion import lineas_csv, lineas_csv_async
+
+        async def leer():
+            return [bloque async for bloque in lineas_csv_async(self.campeonato, 'equipos')]
+
+        self.assertEqual(''.join(async_to_sync(leer)()), ''.join(lineas_csv(self.campeonato, 'equipos')))
+
+    def test_asgi_responde_con_iterador_asincrono(self):
+        from asgiref.sync import async_to_sync
+
+        async def descargar():
+            await self.async_client.aforce_login(self.staff)
+            respuesta = await self.async_client.get(f"/campeonato/{self.campeonato.pk}/exportar/equipos.csv")
+            return respuesta, b''.join([parte async for parte in respuesta])
+
+        respuesta, contenido = async_to_sync(descargar)()
+        self.assertTrue(respuesta.is_async)
+        self.assertIn("'=HIPERVINCULO".encode(), contenido)
+
+    def test_reimportar_usuario_exportado(self):
+        import io
+        from .exportacion import lineas_csv
+        from .importacion import importar_estadisticas, leer_filas
+        from .models import EstadisticaJugadorFutbol
+        # Mismos encabezados que el archivo exportado, con el usuario como lo escribe la exportación
+        encabezados = ''.join(lineas_csv(self.campeonato, 'estadisticas')).lstrip('\ufeff').splitlines()[0].split(',')
+        fila = {columna: '' for columna in encabezados}
+        fila.update({'campeonato': str(self.campeonato.pk), 'jugador': "'@raro", 'equipo': 'E1', 'goles': '2'})
+        archivo = io.BytesIO((','.join(encabezados) + '\r\n' + ','.join(fila.values()) + '\r\n').encode())
+        resultado = importar_estadisticas(leer_filas(archivo, 'estadisticas.csv'))
+        self.assertEqual(resultado.errores, [])
+        self.assertEqual(EstadisticaJugadorFutbol.objects.get(jugador__usuario__username='@raro').goles, 2)
+
+
+# Las filas de un mismo jugador se juntan aunque traigan columnas distintas y las columnas
+# ausentes no se tocan; las filas inválidas se informan por línea sin detener la importación
+class ImportacionTest(TestCase):
+    def setUp(self):
+        from .models import EstadisticaJugadorFutbol
+        self.campeonato, self.equipos = crear_campeonato()
+        self.j1, self.j2 = crear_jugador(self.equipos[0], 'j1'), crear_jugador(self.equipos[1], 'j2')
+        EstadisticaJugadorFutbol.objects.create(campeonato=self.campeonato, jugador=self.j1, partidos_jugados=5, goles=1, tarjetas_rojas=1)
+
+    def importar(self):
+        from .importacion import importar_estadisticas
+        filas = [
+            {'jugador': 'j1', 'goles': '3'},
+            {'jugador': 'J2 ', 'goles': 1.0, 'tarjetas_amarillas': '2'},
+            {'jugador': 'j1', 'tarjetas_amarillas': '1'},
+            {'jugador': 'j1', 'goles': '4', 'tarjetas_amarillas': ''},
+            {'jugador': 'nadie', 'goles': '1'},
+            {'jugador': 'j2', 'goles': 'x'},
+            {'jugador_id': str(self.j2.pk), 'goles': '-1'},
+            {'jugador': 'j2', 'equipo': 'E1'},
+        ]
+        return importar_estadisticas(list(enumerate(filas, start=2)), self.campeonato)
+
+    def test_filas_repetidas_y_errores(self):
+        from unittest import mock
+        from .models import EstadisticaJugadorFutbol
+        # Con lotes de una fila cada jugador se escribe varias veces dentro de la transacción
+        for lote in (1000, 1):
+            with self.subTest(lote=lote), mock.patch('core.importacion.LOTE_IMPORTACION', lote):
+                resultado = self.importar()
+                self.assertEqual((resultado.filas, resultado.guardadas, resultado.cantidad_errores), (8, 4, 4))
+                self.assertEqual([linea for linea, _ in resultado.errores], [6, 7, 8, 9])
+                self.assertIn("'nadie'", resultado.errores[0][1])
+                filas = EstadisticaJugadorFutbol.objects.filter(campeonato=self.campeonato)
+                self.assertEqual(
+                    {fila.jugador_id: (fila.partidos_jugados, fila.goles, fila.tarjetas_amarillas, fila.tarjetas_rojas) for fila in filas},
+                    {self.j1.pk: (5, 4, 1, 1), self.j2.pk: (0, 1, 2, 0)},
+                )
+
+
+# La acumulación de eventos y la reconstrucción desde el registro tienen que dar lo mismo,
+# también con correcciones (eventos de valor negativo)
+@override_settings(ACUMULAR_EVENTOS_EN_SEGUNDO_PLANO=False)
+class EventosTest(TestCase):
+    def setUp(self):
+        self.campeonato, self.equipos = crear_campeonato()
+        self.partido = crear_partido(self.campeonato, self.equipos[0], self.equipos[1], estado='EN_CURSO')
+        self.jugador = crear_jugador(self.equipos[0], 'goleador')
+        self.rival = crear_jugador(self.equipos[1], 'rival')
+
+    def registrar(self, *eventos, partido=None):
+        from .models import EventoPartido
+        with self.captureOnCommitCallbacks(execute=True):
+            for jugador, tipo, valor in eventos:
+                EventoPartido.objects.create(partido=partido or self.partido, jugador=jugador, tipo=tipo, valor=valor)
+
+    def estado(self, modelo, *columnas):
+        from .models import TotalesEquipo
+        return (
+            sorted(modelo.objects.values_list('jugador_id', *columnas)),
+            list(Partido.objects.order_by('pk').values_list('resultado_local', 'resultado_visitante')),
+            sorted(TotalesEquipo.objects.values_list('equipo_id', 'goles', 'tarjetas_amarillas')),
+        )
+
+    def assert_reconstruccion_igual(self, modelo, *columnas):
+        from .contadores import verificar_totales
+        from .eventos import reconstruir_desde_eventos
+        self.assertEqual(verificar_totales(), {})
+        acumulado = self.estado(modelo, *columnas)
+        reconstruir_desde_eventos()
+        self.assertEqual(self.estado(modelo, *columnas), acumulado)
+        return acumulado
+
+    def test_goles_y_correcciones(self):
+        from .models import EstadisticaJugadorFutbol, EventoPartido
+        self.registrar((self.jugador, 'GOL', 1), (self.jugador, 'GOL', 1), (self.rival, 'AMARILLA', 1))
+        self.registrar((self.jugador, 'GOL', -1))
+        jugadores, marcadores, totales = self.assert_reconstruccion_igual(
+            EstadisticaJugadorFutbol, 'partidos_jugados', 'goles', 'tarjetas_amarillas',
+        )
+        self.assertEqual(jugadores, [(self.jugador.pk, 1, 1, 0), (self.rival.pk, 1, 0, 1)])
+        self.assertEqual(marcadores, [(1, 0)])
+        self.assertIn((self.equipos[0].pk, 1, 0), totales)
+        self.assertFalse(EventoPartido.objects.filter(aplicado=False).exists())
+
+    def test_correccion_que_deja_en_negativo(self):
+        from django.core.exceptions import ValidationError
+        from .models import EventoPartido
+        evento = EventoPartido(partido=self.partido, jugador=self.jugador, tipo='GOL', valor=-1)
+        with self.assertRaises(ValidationError):
+            evento.full_clean()
+        with self.assertRaises(ValidationError):
+            evento.save()
+        # El gol de otro partido no se puede anular desde este
+        otro = crear_partido(self.campeonato, self.equipos[0], self.equipos[2], fecha=datetime.date(2025, 1, 5))
+        self.registrar((self.jugador, 'GOL', 1), partido=otro)
+        with self.assertRaises(ValidationError):
+            evento.save()
+
+    def test_fila_editada_a_mano(self):
+        from .models import EstadisticaJugadorFutbol, TotalesEquipo
+        from .contadores import verificar_totales
+        self.registrar((self.jugador, 'GOL', 1))
+        # Con update() no corren las señales: los totales se reparan como lo haría el admin
+        EstadisticaJugadorFutbol.objects.filter(jugador=self.jugador).update(goles=0)
+        verificar_totales(reparar=True)
+        self.registrar((self.jugador, 'GOL', -1))
+        self.assertEqual(EstadisticaJugadorFutbol.objects.get(jugador=self.jugador).goles, 0)
+        self.assertEqual(TotalesEquipo.objects.get(equipo=self.equipos[0]).goles, 0)
+        self.assertEqual(verificar_totales(), {})
+
+    def test_reconstruir_no_borra_filas_sin_eventos(self):
+        from .eventos import reconstruir_desde_eventos
+        from .models import EstadisticaJugadorFutbol
+        cargado = crear_jugador(self.equipos[2], 'cargado_a_mano')
+        EstadisticaJugadorFutbol.objects.create(campeonato=self.campeonato, jugador=cargado, goles=5, partidos_jugados=3)
+        self.registrar((self.jugador, 'GOL', 1))
+        reconstruir_desde_eventos([self.campeonato.pk])
+        self.assertEqual(EstadisticaJugadorFutbol.objects.values_list('goles', 'partidos_jugados').get(jugador=cargado), (5, 3))
+        self.assertEqual(EstadisticaJugadorFutbol.objects.get(jugador=self.jugador).goles, 1)
+
+    def test_canasta_cuenta_una_y_suma_sus_puntos(self):
+        from .models import EstadisticaJugadorBasquet
+        campeonato, equipos = crear_campeonato('BASQUET', 2)
+        partido = crear_partido(campeonato, equipos[0], equipos[1], estado='EN_CURSO', lugar='Coliseo')
+        jugador = crear_jugador(equipos[0], 'tirador')
+        self.registrar((jugador, 'CANASTA', 3), (jugador, 'CANASTA', 2), partido=partido)
+        self.registrar((jugador, 'CANASTA', -3), partido=partido)
+        jugadores, marcadores, _ = self.assert_reconstruccion_igual(EstadisticaJugadorBasquet, 'canastas')
+        self.assertEqual(jugadores, [(jugador.pk, 1)])
+        self.assertIn((2, 0), marcadores)
+
+
+class ColaAcumulacionTest(TransactionTestCase):
+    def test_acumula_en_segundo_plano(self):
+        from .eventos import cola_acumulacion
+        from .models import EstadisticaJugadorFutbol, EventoPartido
+        campeonato, equipos = crear_campeonato(cantidad=2)
+        partido = crear_partido(campeonato, equipos[0], equipos[1], estado='EN_CURSO')
+        jugador = crear_jugador(equipos[0], 'goleador')
+        EventoPartido.objects.create(partido=partido, jugador=jugador, tipo='GOL')
+        cola_acumulacion.esperar(10)
+        self.assertTrue(EventoPartido.objects.get().aplicado)
+        self.assertEqual(EstadisticaJugadorFutbol.objects.get().goles, 1)
+        self.assertEqual(Partido.objects.values_list('resultado_local', flat=True).get(), 1)
+
+
+# El stream de Server-Sent Events se prueba con el cliente ASGI de Django. TransactionTestCase:
+# la publicación espera a que se confirme la transacción del guardado.
+class EnVivoTest(TransactionTestCase):
+    async def test_recibe_el_cambio_de_un_partido(self):
+        import asyncio
+        import json
+        from asgiref.sync import sync_to_async
+        from .en_vivo import canal
+
+        campeonato, equipos = await sync_to_async(crear_campeonato)(cantidad=2)
+        partido = await sync_to_async(crear_partido)(campeonato, equipos[0], equipos[1], 0, 0, 'EN_CURSO')
+        respuesta = await self.async_client.get(f"/campeonato/{campeonato.pk}/en-vivo/")
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        frames = respuesta.streaming_content.__aiter__()
+
+        async def siguiente():
+            frame = await asyncio.wait_for(frames.__anext__(), 5)
+            return frame.decode() if isinstance(frame, bytes) else frame
+
+        self.assertTrue((await siguiente()).startswith('retry: '))
+        # Estado inicial: el partido en curso
+        self.assertIn(f'"id": {partido.pk}', await siguiente())
+
+        def anotar():
+            partido.resultado_local = 1
+            partido.save()
+        await sync_to_async(anotar)()
+
+        evento, datos = (await siguiente()).strip().split('\n')
+        self.assertEqual(evento, 'event: partido')
+        datos = json.loads(datos.removeprefix('data: '))
+        self.assertEqual((datos['id'], datos['resultado_local'], datos['estado']), (partido.pk, 1, 'EN_CURSO'))
+
+        # Si el cliente se desconecta mientras espera (se cancela la lectura) deja de estar suscrito
+        lectura = asyncio.ensure_future(frames.__anext__())
+        await asyncio.sleep(0.05)
+        lectura.cancel()
+        await asyncio.sleep(0.05)
+        self.assertEqual(canal.cantidad_suscriptores(campeonato.pk), 0)
+
+    async def test_campeonato_inexistente(self):
+        respuesta = await self.async_client.get('/campeonato/999/en-vivo/')
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class JornadasTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.campeonato, self.equipos = crear_campeonato()
+        e = self.equipos
+        self.sabado = [crear_partido(self.campeonato, e[0], e[1]), crear_partido(self.campeonato, e[2], e[3], lugar='Cancha 2')]
+        self.domingo = [
+            crear_partido(self.campeonato, e[0], e[2], fecha=datetime.date(2025, 1, 5)),
+            crear_partido(self.campeonato, e[1], e[3], fecha=datetime.date(2025, 1, 5), lugar='Cancha 2'),
+        ]
+
+    def api(self, ruta):
+        return self.client.get(f"/api/campeonato/{self.campeonato.pk}/{ruta}")
+
+    def test_el_numero_no_cambia_al_cerrar_una_jornada_anterior(self):
+        for partido in self.domingo:
+            finalizar(partido, 1, 0)
+        finalizar(self.sabado[0], 2, 0)
+        self.assertEqual(self.api('jornada/1/').status_code, 404)
+        domingo = self.api('jornada/2/').json()
+        self.assertEqual(domingo['jornada'], {'numero': 2, 'fecha': '2025-01-05'})
+
+        # El partido atrasado del sábado cierra la jornada 1; la 2 sigue siendo el domingo
+        finalizar(self.sabado[1], 0, 0)
+        self.assertEqual(self.api('jornada/1/').json()['jornada'], {'numero': 1, 'fecha': '2025-01-04'})
+        domingo = self.api('jornada/2/').json()
+        self.assertEqual(domingo['jornada'], {'numero': 2, 'fecha': '2025-01-05'})
+        # E0 ganó sus dos partidos
+        self.assertEqual(domingo['posiciones'][0]['equipo']['id'], self.equipos[0].pk)
+        self.assertEqual(domingo['posiciones'][0]['puntos'], 6)
+        self.assertEqual(
+            [jornada['numero'] for jornada in self.api('jornadas/').json()['jornadas']], [1, 2],
+        )
+
+    def test_enlace_por_fecha(self):
+        for partido in self.sabado:
+            finalizar(partido, 1, 0)
+        self.assertEqual(self.api('jornada/2025-01-04/').json()['jornada']['numero'], 1)
+        # Un día sin jornada devuelve la última cerrada hasta ese día
+        self.assertEqual(self.api('jornada/2025-01-06/').json()['jornada']['fecha'], '2025-01-04')
+        self.assertEqual(self.api('jornada/2025-01-03/').status_code, 404)
+        self.assertEqual(self.api('jornada/2025-02-30/').status_code, 404)
+
+    def test_evolucion(self):
+        from .jornadas import evolucion_posiciones
+        for partido in self.sabado + self.domingo:
+            finalizar(partido, 1, 0)
+        evolucion = evolucion_posiciones(self.campeonato.pk)
+        self.assertEqual(
+            [(punto['numero'], punto['posicion'], punto['puntos']) for punto in evolucion[self.equipos[0].pk]],
+            [(1, 1, 3), (2, 1, 6)],
+        )
+
+
+class TrayectoriasTest(TestCase):
+    def titulos(self, *jugadores):
+        from .models import TrayectoriaUsuario
+        return [TrayectoriaUsuario.objects.get(usuario=jugador.usuario).titulos for jugador in jugadores]
+
+    def test_campeon_de_llave_es_el_ganador_de_la_final(self):
+        from .llaves import generar_llave, guardar_llave
+        from .models import TipoCampeonato
+        tipo = TipoCampeonato.objects.create(nombre='Eliminación', formato='ELIMINACION')
+        campeonato, e = crear_campeonato(tipo_campeonato=tipo)
+        jugadores = [crear_jugador(e[0], 'j0'), crear_jugador(e[1], 'j1')]
+        cruces, partidos = generar_llave(campeonato, e, ['Cancha 1', 'Cancha 2'], [datetime.time(10)])
+        guardar_llave(campeonato, cruces, partidos)
+        semifinal, otra = Partido.objects.filter(cruce__ronda=1).order_by('cruce__posicion')
+        self.assertEqual((semifinal.equipo_local, otra.equipo_local), (e[0], e[1]))
+        finalizar(semifinal, 9, 0)
+        finalizar(otra, 1, 0)
+        # Partido fuera de la llave: E0 termina primero en la tabla aunque pierde la final
+        finalizar(crear_partido(campeonato, e[0], e[2], fecha=datetime.date(2025, 3, 1)), 1, 0)
+        final = Partido.objects.get(cruce__ronda=2)
+        finalizar(final, *((0, 1) if final.equipo_local == e[0] else (1, 0)))
+        self.assertEqual(Posicion.objects.filter(campeonato=campeonato).first().equipo, e[0])
+
+        campeonato.estado = 'FINALIZADO'
+        campeonato.save()
+        self.assertEqual(self.titulos(*jugadores), [0, 1])
+
+    def test_corregir_un_resultado_despues_de_finalizar(self):
+        campeonato, e = crear_campeonato(cantidad=2)
+        jugadores = [crear_jugador(e[0], 'j0'), crear_jugador(e[1], 'j1')]
+        partido = crear_partido(campeonato, e[0], e[1], 2, 0, 'FINALIZADO')
+        campeonato.estado = 'FINALIZADO'
+        campeonato.save()
+        self.assertEqual(self.titulos(*jugadores), [1, 0])
+
+        partido.resultado_local, partido.resultado_visitante = 0, 2
+        partido.save()
+        self.assertEqual(self.titulos(*jugadores), [0, 1])
+        partido.delete()
+        self.assertEqual(self.titulos(*jugadores), [1, 0])
+
+    def test_mejores_deportistas_ordena_por_valor_numerico_del_anio(self):
+        from .models import TrayectoriaUsuario
+        from .trayectorias import mejores_deportistas
+        datos = {'a': ({'anio_2024': {'ganados': 5}}, 30), 'b': ({'anio_2024': {'ganados': 12}}, 12), 'c': ({'anio_2025': {'ganados': 20}}, 20)}
+        for username, (por_anio, ganados) in datos.items():
+            TrayectoriaUsuario.objects.create(usuario=Usuario.objects.create(username=username), por_anio=por_anio, ganados=ganados)
+        # 12 antes que 5 (no como texto) y sin los que no jugaron ese año
+        self.assertEqual([t.usuario.username for t in mejores_deportistas(2024)], ['b', 'a'])
+        self.assertEqual([t.usuario.username for t in mejores_deportistas()], ['a', 'c', 'b'])
+
+
+# Las reglas de suspensión se aplican una sola vez por cada acumulación: evaluar de nuevo no
+# cambia nada y una nueva acumulación extiende la suspensión vigente de la regla
+class SuspensionesTest(TestCase):
+    def setUp(self):
+        from .models import EstadisticaJugadorFutbol, ReglaSuspension
+        self.campeonato, self.equipos = crear_campeonato()
+        self.jugador = crear_jugador(self.equipos[0], 'j1')
+        self.amarillas = ReglaSuspension.objects.create(campeonato=self.campeonato, tarjeta='tarjetas_amarillas', cantidad=2, dias=7)
+        EstadisticaJugadorFutbol.objects.create(campeonato=self.campeonato, jugador=self.jugador)
+
+    def tarjetas(self, **valores):
+        from .models import EstadisticaJugadorFutbol
+        from .sanciones import evaluar_suspensiones
+        # update() no dispara señales: la evaluación se llama a mano
+        EstadisticaJugadorFutbol.objects.filter(jugador=self.jugador).update(**valores)
+        return evaluar_suspensiones(self.campeonato.pk)
+
+    def suspensiones(self):
+        from .models import Suspension
+        return list(Suspension.objects.filter(jugador=self.jugador).order_by('pk').values_list('regla_id', 'sanciones', 'fecha_inicio', 'fecha_fin'))
+
+    def test_extender_o_crear_sin_repetir(self):
+        from django.utils import timezone
+        from .models import ReglaSuspension
+        manana = timezone.localdate() + datetime.timedelta(days=1)
+        semana = datetime.timedelta(days=7)
+        self.assertEqual(self.tarjetas(tarjetas_amarillas=3), 1)
+        self.assertEqual(self.suspensiones(), [(self.amarillas.pk, 1, manana, manana + semana - datetime.timedelta(days=1))])
+        self.assertEqual(self.tarjetas(tarjetas_amarillas=3), 0)
+
+        # La segunda acumulación extiende la misma suspensión
+        self.assertEqual(self.tarjetas(tarjetas_amarillas=4), 1)
+        self.assertEqual(self.suspensiones(), [(self.amarillas.pk, 2, manana, manana + 2 * semana - datetime.timedelta(days=1))])
+        # Corregir hacia abajo no quita lo ya dado
+        self.assertEqual(self.tarjetas(tarjetas_amarillas=1), 0)
+        self.assertEqual(len(self.suspensiones()), 1)
+
+        # Otra regla empieza después de la última suspensión del jugador
+        rojas = ReglaSuspension.objects.create(campeonato=self.campeonato, tarjeta='tarjetas_rojas', cantidad=1, dias=3)
+        self.assertEqual(self.tarjetas(tarjetas_rojas=1), 1)
+        inicio = manana + 2 * semana
+        self.assertEqual(self.suspensiones()[-1], (rojas.pk, 1, inicio, inicio + datetime.timedelta(days=2)))
+        self.assertEqual(self.tarjetas(tarjetas_rojas=1), 0)
+
+    def test_cantidad_cero(self):
+        from django.core.exceptions import ValidationError
+        from django.db import IntegrityError, transaction
+        from .models import ReglaSuspension
+        regla = ReglaSuspension(campeonato=self.campeonato, tarjeta='tarjetas_rojas', cantidad=0, dias=3)
+        with self.assertRaises(ValidationError):
+            regla.full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            regla.save()
+
+
+# Server-Timing solo para el staff (o con DEBUG) y las métricas escritas en el log
+class InstrumentacionTest(TestCase):
+    def setUp(self):
+        self.campeonato, _ = crear_campeonato()
+        self.url = f"/campeonato/{self.campeonato.pk}/tabla/"
+        self.staff = Usuario.objects.create(username='staff', is_staff=True)
+
+    def test_server_timing_solo_para_el_staff(self):
+        self.assertNotIn('Server-Timing', self.client.get(self.url))
+        with override_settings(DEBUG=True):
+            self.assertIn('db;dur', self.client.get(self.url)['Server-Timing'])
+        self.client.force_login(self.staff)
+        self.assertIn('db;dur', self.client.get(self.url)['Server-Timing'])
+
+    def test_server_timing_con_asgi(self):
+        from asgiref.sync import async_to_sync
+
+        async def pedir():
+            anonima = await self.async_client.get(self.url)
+            await self.async_client.aforce_login(self.staff)
+            return anonima, await self.async_client.get(self.url)
+
+        anonima, staff = async_to_sync(pedir)()
+        self.assertNotIn('Server-Timing', anonima)
+        self.assertIn('db;dur', staff['Server-Timing'])
+
+    def test_el_log_muestra_las_metricas(self):
+        import json
+        import logging
+        from .instrumentacion import FormatoInstrumentacion
+        logger = logging.getLogger('core.instrumentacion')
+        formatos = [manejador.formatter for manejador in logger.handlers if isinstance(manejador.formatter, FormatoInstrumentacion)]
+        self.assertTrue(formatos)
+
+        with self.assertLogs(logger, 'INFO') as registro:
+            self.client.get(self.url)
+        linea = formatos[0].format(registro.records[0])
+        self.assertIn('tabla_campeonato: ', linea)
+        self.assertEqual(json.loads(linea[linea.index('{'):])['vista'], 'tabla_campeonato')
+        # Los mensajes sin métricas salen igual que con el formato normal
+        self.assertEqual(formatos[0].format(logging.makeLogRecord({'msg': 'hola', 'levelname': 'INFO', 'name': 'x'})), 'INFO x hola')
+
+
+# Los totales de cada equipo se mantienen sumando la diferencia de cada fila de estadísticas
+# y tienen que coincidir con los que calcula verificar_totales desde cero
+class TotalesEquipoTest(TestCase):
+    def setUp(self):
+        self.campeonato, self.equipos = crear_campeonato(cantidad=2)
+        self.j1, self.j2 = crear_jugador(self.equipos[0], 'j1'), crear_jugador(self.equipos[0], 'j2')
+
+    def totales(self, equipo):
+        from .models import TotalesEquipo
+        return TotalesEquipo.objects.values_list('goles', 'tarjetas_amarillas', 'tarjetas_rojas', 'goles_futbolin').get(equipo=equipo)
+
+    def test_editar_mover_y_borrar(self):
+        from .contadores import verificar_totales
+        from .models import EstadisticaJugadorFutbol
+        primera = EstadisticaJugadorFutbol.objects.create(campeonato=self.campeonato, jugador=self.j1, goles=2, tarjetas_amarillas=1)
+        EstadisticaJugadorFutbol.objects.create(campeonato=self.campeonato, jugador=self.j2, goles=3, tarjetas_rojas=1)
+        self.assertEqual(self.totales(self.equipos[0]), (5, 1, 1, 0))
+
+        primera.goles = 4
+        primera.save()
+        self.assertEqual(self.totales(self.equipos[0]), (7, 1, 1, 0))
+        equipo = Equipo.objects.select_related('totales').get(pk=self.equipos[0].pk)
+        self.assertEqual((equipo.goles_totales, equipo.tarjetas_totales), (7, 2))
+
+        # Un jugador que cambia de equipo se lleva sus estadísticas
+        self.j2.equipo = self.equipos[1]
+        self.j2.save()
+        self.assertEqual(self.totales(self.equipos[0]), (4, 1, 0, 0))
+        self.assertEqual(self.totales(self.equipos[1]), (3, 0, 1, 0))
+
+        primera.delete()
+        self.assertEqual(self.totales(self.equipos[0]), (0, 0, 0, 0))
+        self.assertEqual(verificar_totales(), {})
+
+    def test_goles_de_futbolin_en_su_columna(self):
+        from .models import EstadisticaJugadorFutbolin
+        EstadisticaJugadorFutbolin.objects.create(campeonato=self.campeonato, jugador=self.j1, goles=6)
+        self.assertEqual(self.totales(self.equipos[0]), (0, 0, 0, 6))
+
+    def test_verificar_y_reparar(self):
+        from .contadores import verificar_totales
+        from .models import EstadisticaJugadorFutbol, TotalesEquipo
+        EstadisticaJugadorFutbol.objects.create(campeonato=self.campeonato, jugador=self.j1, goles=2)
+        TotalesEquipo.objects.filter(equipo=self.equipos[0]).update(goles=9)
+        TotalesEquipo.objects.filter(equipo=self.equipos[1]).delete()
+        diferencias = verificar_totales()
+        self.assertEqual(diferencias[self.equipos[0].pk], {'goles': (9, 2)})
+        self.assertIn(None, diferencias[self.equipos[1].pk])
+
+        verificar_totales(reparar=True)
+        self.assertEqual(verificar_totales(), {})
+        self.assertEqual(self.totales(self.equipos[0]), (2, 0, 0, 0))
+        self.assertEqual(self.totales(self.equipos[1]), (0, 0, 0, 0))
+
+
+# Cada fila de las tablas por deporte se copia a la tabla común con sus columnas compartidas,
+# y las consultas entre deportes leen solo esa tabla
+class EstadisticaComunTest(TestCase):
+    def setUp(self):
+        self.futbol, futbol = crear_campeonato('FUTBOL', cantidad=2)
+        self.basquet, basquet = crear_campeonato('BASQUET', cantidad=2)
+        self.goleador = crear_jugador(futbol[0], 'ana')
+        self.otro = crear_jugador(futbol[1], 'beto')
+        self.canastero = crear_jugador(basquet[0], 'carla')
+
+    def comun(self, jugador):
+        from .models import EstadisticaJugador
+        return EstadisticaJugador.objects.values('jugados', 'goles', 'canastas', 'rebotes').get(jugador=jugador)
+
+    def test_copiar_editar_y_borrar(self):
+        from .models import EstadisticaJugador, EstadisticaJugadorFutbol
+        fila = EstadisticaJugadorFutbol.objects.create(campeonato=self.futbol, jugador=self.goleador, partidos_jugados=2, goles=3)
+        self.assertEqual(self.comun(self.goleador), {'jugados': 2, 'goles': 3, 'canastas': 0, 'rebotes': 0})
+        fila.goles = 5
+        fila.save()
+        self.assertEqual(self.comun(self.goleador)['goles'], 5)
+        fila.delete()
+        self.assertFalse(EstadisticaJugador.objects.filter(jugador=self.goleador).exists())
+
+    def test_consultas_entre_deportes(self):
+        from .estadisticas import estadisticas_jugador, totales_estadisticas
+        from .models import EstadisticaJugadorBasquet, EstadisticaJugadorFutbol
+        EstadisticaJugadorFutbol.objects.create(campeonato=self.futbol, jugador=self.goleador, partidos_jugados=2, goles=3)
+        EstadisticaJugadorFutbol.objects.create(campeonato=self.futbol, jugador=self.otro, partidos_jugados=1, goles=1)
+        EstadisticaJugadorBasquet.objects.create(campeonato=self.basquet, jugador=self.canastero, partidos_jugados=4, canastas=10, rebotes=2)
+
+        self.assertEqual([fila['campeonato_id'] for fila in estadisticas_jugador(self.canastero.pk)], [self.basquet.pk])
+        self.assertEqual(estadisticas_jugador(self.canastero.pk)[0]['canastas'], 10)
+        por_jugador = totales_estadisticas('jugador', metricas=('jugados', 'goles'), orden='jugados')
+        self.assertEqual([(fila['nombre'], fila['jugados'], fila['goles']) for fila in por_jugador], [('carla', 4, 0), ('ana', 2, 3), ('beto', 1, 1)])
+        por_campeonato = totales_estadisticas('campeonato', metricas=('goles',), orden='goles', limite=1)
+        self.assertEqual([(fila['id'], fila['goles'], fila['campeonatos']) for fila in por_campeonato], [(self.futbol.pk, 4, 1)])
+        futbol = totales_estadisticas('equipo', metricas=('goles',), campeonato__deporte__codigo='FUTBOL')
+        self.assertEqual([fila['goles'] for fila in futbol], [3, 1])
+        with self.assertRaises(ValueError):
+            totales_estadisticas('deporte')
+
+    def test_sincronizar_despues_de_update(self):
+        from .estadisticas import sincronizar_estadisticas
+        from .models import EstadisticaJugador, EstadisticaJugadorFutbol
+        EstadisticaJugadorFutbol.objects.create(campeonato=self.futbol, jugador=self.goleador, goles=3)
+        # update() no dispara señales: la tabla común queda vieja hasta sincronizar
+        EstadisticaJugadorFutbol.objects.update(goles=7)
+        EstadisticaJugador.objects.create(campeonato=self.basquet, jugador=self.canastero, canastas=99)
+        self.assertEqual(self.comun(self.goleador)['goles'], 3)
+        self.assertEqual(sincronizar_estadisticas([self.futbol.pk]), 1)
+        self.assertEqual(self.comun(self.goleador)['goles'], 7)
+        # Los campeonatos no indicados no se tocan; sin campeonatos se arma todo desde cero
+        self.assertEqual(self.comun(self.canastero)['canastas'], 99)
+        sincronizar_estadisticas()
+        self.assertFalse(EstadisticaJugador.objects.filter(jugador=self.canastero).exists())
+
+
+# Una suspensión cuenta solo entre su primer y su último día (ambos incluidos); la anotación
+# con_suspendido y jugadores_suspendidos responden lo mismo que esta_suspendido
+class JugadoresSuspendidosTest(TestCase):
+    def setUp(self):
+        from .models import Suspension
+        self.campeonato, self.equipos = crear_campeonato(cantidad=2)
+        self.j1, self.j2 = crear_jugador(self.equipos[0], 'j1'), crear_jugador(self.equipos[0], 'j2')
+        self.j3 = crear_jugador(self.equipos[1], 'j3')
+        self.dia = datetime.date(2025, 3, 10)
+        Suspension.objects.create(jugador=self.j1, fecha_inicio=self.dia, fecha_fin=self.dia + datetime.timedelta(days=6), motivo='Roja')
+        Suspension.objects.create(jugador=self.j3, fecha_inicio=self.dia, fecha_fin=self.dia, motivo='Amarillas')
+
+    def test_por_fecha(self):
+        from .models import Jugador, Suspension
+        casos = [(self.dia - datetime.timedelta(days=1), set()), (self.dia, {self.j1.pk, self.j3.pk}), (self.dia + datetime.timedelta(days=6), {self.j1.pk})]
+        for fecha, suspendidos in casos:
+            with self.subTest(fecha=fecha):
+                anotados = {jugador.pk for jugador in Jugador.objects.con_suspendido(fecha) if jugador.suspendido}
+                self.assertEqual(anotados, suspendidos)
+                self.assertEqual(Suspension.objects.jugadores_suspendidos(self.equipos, fecha), suspendidos)
+                self.assertEqual(Suspension.objects.jugadores_suspendidos([self.equipos[0]], fecha), suspendidos - {self.j3.pk})
+
+    def test_anotado_sin_consultas(self):
+        from unittest import mock
+        from .models import Jugador
+        with mock.patch('django.utils.timezone.localdate', return_value=self.dia):
+            jugadores = list(Jugador.objects.filter(equipo=self.equipos[0]).con_suspendido().order_by('pk'))
+            with self.assertNumQueries(0):
+                self.assertEqual([jugador.esta_suspendido() for jugador in jugadores], [True, False])
+            # Sin la anotación consulta la base y responde lo mismo
+            self.assertTrue(Jugador.objects.get(pk=self.j1.pk).esta_suspendido())
+
+
+# Las clasificaciones de jugadores salen de una consulta agrupada por clasificación, guardada
+# en caché bajo la versión del campeonato
+class ClasificacionesTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import EstadisticaJugadorFutbol
+        cache.clear()
+        self.campeonato, equipos = crear_campeonato(cantidad=2)
+        jugadores = [crear_jugador(equipos[numero % 2], f"j{numero}") for numero in range(4)]
+        Usuario.objects.filter(username='j1').update(first_name='Ana', last_name='Paz')
+        for jugador, goles, amarillas, rojas in zip(jugadores, (3, 5, 3, 0), (0, 1, 2, 0), (1, 0, 0, 0)):
+            EstadisticaJugadorFutbol.objects.create(
+                campeonato=self.campeonato, jugador=jugador, goles=goles, tarjetas_amarillas=amarillas, tarjetas_rojas=rojas,
+            )
+        self.jugadores = jugadores
+
+    def filas(self, nombre, limite=10):
+        from .clasificaciones import clasificaciones_para, filas_clasificacion
+        clasificacion = next(c for c in clasificaciones_para(self.campeonato.deporte) if c.nombre == nombre)
+        return filas_clasificacion(self.campeonato.pk, clasificacion, limite)
+
+    def test_orden_limite_y_ceros(self):
+        goles = self.filas('goles')
+        # Empates por nombre de usuario; el jugador sin goles no aparece
+        self.assertEqual([(fila['jugador'], fila['valor']) for fila in goles], [('Ana Paz', 5), ('j0', 3), ('j2', 3)])
+        self.assertEqual(goles[0]['equipo_id'], self.jugadores[1].equipo_id)
+        self.assertEqual([fila['valor'] for fila in self.filas('tarjetas')], [2, 1, 1])
+        self.assertEqual(len(self.filas('goles', limite=2)), 2)
+
+    def test_cache_por_version(self):
+        from .models import EstadisticaJugadorFutbol
+        self.filas('goles')
+        with self.assertNumQueries(0):
+            self.filas('goles')
+        with self.captureOnCommitCallbacks(execute=True):
+            fila = EstadisticaJugadorFutbol.objects.get(jugador=self.jugadores[3])
+            fila.goles = 9
+            fila.save()
+        self.assertEqual(self.filas('goles')[0]['jugador'], 'j3')
+
+    def test_ajedrez_cuenta_medio_punto_por_empate(self):
+        from .clasificaciones import clasificaciones_campeonato
+        from .models import EstadisticaJugadorAjedrez
+        campeonato, equipos = crear_campeonato('AJEDREZ', cantidad=1)
+        EstadisticaJugadorAjedrez.objects.create(campeonato=campeonato, jugador=crear_jugador(equipos[0], 'alfil'), partidas_ganadas=2, partidas_empatadas=1)
+        (clasificacion, filas), = clasificaciones_campeonato(Campeonato.objects.select_related('deporte').get(pk=campeonato.pk))
+        self.assertEqual(clasificacion.nombre, 'puntaje')
+        self.assertEqual(float(filas[0]['valor']), 2.5)
+        otro, _ = crear_campeonato('NATACION', cantidad=1)
+        self.assertEqual(clasificaciones_campeonato(otro), [])
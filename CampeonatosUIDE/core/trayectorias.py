@@ -0,0 +1,138 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Subquery, Sum, When
+
+from .models import Campeonato, CruceLlave, EstadisticaJugador, Jugador, Posicion, TrayectoriaUsuario
+
+
+# Usuarios que se recalculan por lote
+LOTE_TRAYECTORIAS = 500
+
+# Métricas de la tabla común que se guardan en la trayectoria (ver core/estadisticas.py)
+METRICAS_TRAYECTORIA = (
+    'jugados', 'ganados', 'empatados', 'perdidos', 'goles', 'tarjetas_amarillas', 'tarjetas_rojas',
+    'canastas', 'rebotes', 'asistencias', 'sets_ganados', 'sets_perdidos',
+)
+
+
+# Clave de un año en TrayectoriaUsuario.por_anio. No es solo el número porque en las consultas
+# sobre JSON una clave numérica se interpreta como posición de una lista.
+def clave_anio(anio):
+    return f'anio_{anio}'
+
+
+# Campeonatos finalizados ganados por el equipo actual de cada jugador: {usuario_id: [campeonato_id, ...]}.
+# Si el campeonato tiene llave de eliminación el campeón es el ganador del cruce de la última
+# ronda (la final); si no, la primera fila de la tabla (mismo orden que Posicion.Meta.ordering).
+def _titulos(usuario_ids):
+    cruces = CruceLlave.objects.filter(campeonato=OuterRef('equipo__campeonato'))
+    final = cruces.order_by('-ronda').values('ganador_id')[:1]
+    primero = Posicion.objects.filter(campeonato=OuterRef('equipo__campeonato')).order_by(
+        '-puntos', '-diferencia_goles', '-goles_favor', 'equipo__nombre', 'pk'
+    ).values('equipo_id')[:1]
+    campeones = (
+        Jugador.objects.filter(usuario_id__in=usuario_ids, equipo__campeonato__estado='FINALIZADO')
+        .annotate(campeon=Case(When(Exists(cruces), then=Subquery(final)), default=Subquery(primero), output_field=IntegerField()))
+        .filter(equipo_id=F('campeon'))
+        .values_list('usuario_id', 'equipo__campeonato_id')
+    )
+    titulos = defaultdict(list)
+    for usuario_id, campeonato_id in campeones:
+        titulos[usuario_id].append(campeonato_id)
+    return titulos
+
+
+# Calcula la trayectoria de los usuarios indicados con una consulta agrupada sobre la tabla
+# común de estadísticas: {usuario_id: TrayectoriaUsuario sin guardar}
+def calcular_trayectorias(usuario_ids):
+    jugadores = dict(Jugador.objects.filter(usuario_id__in=usuario_ids).values_list('usuario_id', 'equipo__campeonato_id'))
+    trayectorias = {usuario_id: TrayectoriaUsuario(usuario_id=usuario_id, por_deporte={}, por_anio={}) for usuario_id in jugadores}
+    campeonatos = {usuario_id: {campeonato_id} for usuario_id, campeonato_id in jugadores.items()}
+
+    filas = (
+        EstadisticaJugador.objects.filter(jugador__usuario_id__in=list(jugadores))
+        .values(
+            usuario_id=F('jugador__usuario_id'), campeonato_pk=F('campeonato_id'),
+            deporte=F('campeonato__deporte__codigo'), anio=F('campeonato__fecha_inicio__year'),
+        )
+        .order_by()
+        .annotate(**{metrica: Sum(metrica) for metrica in METRICAS_TRAYECTORIA})
+    )
+    for fila in filas:
+        trayectoria = trayectorias[fila['usuario_id']]
+        campeonatos[fila['usuario_id']].add(fila['campeonato_pk'])
+        for grupo, clave in ((trayectoria.por_deporte, fila['deporte']), (trayectoria.por_anio, clave_anio(fila['anio']))):
+            totales = grupo.setdefault(clave, {'campeonatos': 0})
+            totales['campeonatos'] += 1
+            for metrica in METRICAS_TRAYECTORIA:
+                if fila[metrica]:
+                    totales[metrica] = totales.get(metrica, 0) + fila[metrica]
+        for metrica in ('jugados', 'ganados', 'goles'):
+            setattr(trayectoria, metrica, getattr(trayectoria, metrica) + (fila[metrica] or 0))
+
+    for usuario_id, ganados in _titulos(list(jugadores)).items():
+        trayectorias[usuario_id].titulos = len(ganados)
+        trayectorias[usuario_id].campeonatos_ganados = sorted(ganados)
+    for usuario_id, trayectoria in trayectorias.items():
+        trayectoria.campeonatos = len(campeonatos[usuario_id])
+    return trayectorias
+
+
+# Recalcula y guarda la trayectoria de los usuarios indicados (por defecto, de todos los que son
+# jugadores). Los usuarios que ya no tienen jugador pierden su fila. Devuelve las filas guardadas.
+def actualizar_trayectorias(usuario_ids=None):
+    if usuario_ids is None:
+        usuario_ids = Jugador.objects.order_by('usuario_id').values_list('usuario_id', flat=True)
+        TrayectoriaUsuario.objects.exclude(usuario__jugador__isnull=False).delete()
+    usuario_ids = list(usuario_ids)
+    guardadas = 0
+    for inicio in range(0, len(usuario_ids), LOTE_TRAYECTORIAS):
+        lote = usuario_ids[inicio:inicio + LOTE_TRAYECTORIAS]
+        trayectorias = calcular_trayectorias(lote)
+        with transaction.atomic():
+            TrayectoriaUsuario.objects.filter(usuario_id__in=set(lote) - set(trayectorias)).delete()
+            TrayectoriaUsuario.objects.bulk_create(
+                trayectorias.values(), update_conflicts=True, unique_fields=['usuario'],
+                update_fields=[
+                    'campeonatos', 'titulos', 'campeonatos_ganados', 'jugados', 'ganados', 'goles',
+                    'por_deporte', 'por_anio', 'actualizado',
+                ],
+            )
+        guardadas += len(trayectorias)
+    return guardadas
+
+
+# Igual que actualizar_trayectorias, a partir de jugadores o de campeonatos
+def actualizar_trayectorias_jugadores(jugador_ids):
+    return actualizar_trayectorias(Jugador.objects.filter(pk__in=list(jugador_ids)).values_list('usuario_id', flat=True))
+
+
+def actualizar_trayectorias_campeonatos(campeonato_ids):
+    usuarios = Jugador.objects.filter(equipo__campeonato_id__in=list(campeonato_ids)).values_list('usuario_id', flat=True)
+    con_estadisticas = EstadisticaJugador.objects.filter(campeonato_id__in=list(campeonato_ids)).values_list('jugador__usuario_id', flat=True)
+    return actualizar_trayectorias(set(usuarios) | set(con_estadisticas))
+
+
+# Al corregir un partido de un campeonato ya finalizado puede cambiar el campeón (la tabla o la
+# final de la llave): se recalculan las trayectorias del campeonato. "anterior" y "actual" son
+# los valores de Partido.CAMPOS_SEGUIDOS antes y después (None si el partido no existía o se borró).
+def actualizar_titulos_partido(anterior, actual):
+    def resultado(valores):
+        return valores and {campo: valor for campo, valor in valores.items() if campo != 'fecha'}
+    if resultado(anterior) == resultado(actual):
+        return
+    campeonato_ids = {valores['campeonato_id'] for valores in (anterior, actual) if valores}
+    finalizados = list(Campeonato.objects.filter(pk__in=campeonato_ids, estado='FINALIZADO').values_list('pk', flat=True))
+    if finalizados:
+        actualizar_trayectorias_campeonatos(finalizados)
+
+
+# Mejores deportistas de un año (o de todos los tiempos si anio es None) según una métrica
+# de la trayectoria, leyendo solo la tabla de trayectorias
+def mejores_deportistas(anio=None, metrica='ganados', limite=10):
+    orden = f'por_anio__{clave_anio(anio)}__{metrica}' if anio else metrica
+    trayectorias = TrayectoriaUsuario.objects.select_related('usuario')
+    if anio:
+        trayectorias = trayectorias.filter(**{f'{orden}__gt': 0})
+    return list(trayectorias.order_by(F(orden).desc(nulls_last=True), '-titulos', 'usuario__username')[:limite])
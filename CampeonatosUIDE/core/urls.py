@@ -1,5 +1,24 @@
-from django.urls import path
-from .views import vista_inicio, vista_login, vista_logout, vista_registro, vista_inicio_publico, detalle_equipo
+import datetime
+
+from django.urls import path, register_converter
+from .api import api_tabla, api_partidos, api_goleadores, api_clasificaciones, api_jornadas, api_tabla_jornada, api_llave, api_grupos
+from .calendarios import calendario_arbitro, calendario_campeonato, calendario_equipo, calendario_lugar
+from .en_vivo import stream_campeonato
+from .views import vista_inicio, vista_login, vista_logout, vista_registro, vista_inicio_publico, detalle_equipo, tabla_campeonato, clasificaciones, exportar_csv, exportar_xlsx
+
+
+# Fecha AAAA-MM-DD en la URL (una fecha inválida no coincide con la ruta y da 404)
+class FechaConverter:
+    regex = r'\d{4}-\d{2}-\d{2}'
+
+    def to_python(self, valor):
+        return datetime.date.fromisoformat(valor)
+
+    def to_url(self, fecha):
+        return fecha.isoformat()
+
+
+register_converter(FechaConverter, 'fecha')
 
 urlpatterns = [
     path('', vista_inicio_publico, name='inicio_publico'),
@@ -8,4 +27,26 @@ urlpatterns = [
     path('logout/', vista_logout, name='logout'),
     path('registro/', vista_registro, name='registro'),
     path('equipo/<int:id>/', detalle_equipo, name='detalle_equipo'),
+    path('campeonato/<int:id>/tabla/', tabla_campeonato, name='tabla_campeonato'),
+    path('campeonato/<int:id>/estadisticas/', clasificaciones, name='clasificaciones'),
+    # Exportaciones completas para coordinadores (solo staff)
+    path('campeonato/<int:id>/exportar/<slug:tabla>.csv', exportar_csv, name='exportar_csv'),
+    path('campeonato/<int:id>/exportar.xlsx', exportar_xlsx, name='exportar_xlsx'),
+    # Cambios en vivo (Server-Sent Events, servir con ASGI)
+    path('campeonato/<int:id>/en-vivo/', stream_campeonato, name='stream_campeonato'),
+    # API JSON de solo lectura (con ETag / Last-Modified)
+    path('api/campeonato/<int:id>/tabla/', api_tabla, name='api_tabla'),
+    path('api/campeonato/<int:id>/partidos/', api_partidos, name='api_partidos'),
+    path('api/campeonato/<int:id>/goleadores/', api_goleadores, name='api_goleadores'),
+    path('api/campeonato/<int:id>/clasificaciones/', api_clasificaciones, name='api_clasificaciones'),
+    path('api/campeonato/<int:id>/jornadas/', api_jornadas, name='api_jornadas'),
+    path('api/campeonato/<int:id>/jornada/<int:numero>/', api_tabla_jornada, name='api_tabla_jornada'),
+    path('api/campeonato/<int:id>/jornada/<fecha:fecha>/', api_tabla_jornada, name='api_tabla_jornada_fecha'),
+    path('api/campeonato/<int:id>/llave/', api_llave, name='api_llave'),
+    path('api/campeonato/<int:id>/grupos/', api_grupos, name='api_grupos'),
+    # Calendarios iCalendar para suscribirse desde el celular (con ETag / Last-Modified)
+    path('calendario/campeonato/<int:id>.ics', calendario_campeonato, name='calendario_campeonato'),
+    path('calendario/equipo/<int:id>.ics', calendario_equipo, name='calendario_equipo'),
+    path('calendario/arbitro/<int:id>.ics', calendario_arbitro, name='calendario_arbitro'),
+    path('calendario/lugar/<str:lugar>.ics', calendario_lugar, name='calendario_lugar'),
 ]
@@ -0,0 +1,85 @@
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from .models import Campeonato
+
+
+# Tiempo que se guardan las páginas en caché. Como la clave incluye la versión,
+# una página nunca queda desactualizada: este tiempo solo libera memoria.
+DURACION_CACHE = 24 * 60 * 60
+
+
+def _clave(*partes):
+    return ':'.join(['version', *map(str, partes)])
+
+
+# Versión actual de un recurso, p. ej. version('campeonato', 3).
+# Es la marca de tiempo (en nanosegundos) de su último cambio; si la caché
+# no la tiene (reinicio, expulsión) se crea una nueva para no repetir versiones viejas.
+# "existe" (opcional) se llama solo en ese caso: si el recurso no existe devuelve None
+# sin crear la clave, para que las URL inventadas no llenen la caché de versiones.
+def version(*partes, existe=None):
+    clave = _clave(*partes)
+    valor = cache.get(clave)
+    if valor is None:
+        if existe is not None and not existe():
+            return None
+        cache.add(clave, time.time_ns(), None)
+        valor = cache.get(clave)
+    return valor
+
+
+# Marca que un recurso cambió. Se hace al confirmar la transacción: si se hiciera antes,
+# una lectura concurrente podría guardar datos viejos bajo la versión nueva.
+def marcar_cambio(*partes):
+    clave = _clave(*partes)
+
+    def incrementar():
+        anterior = cache.get(clave) or 0
+        cache.set(clave, max(time.time_ns(), anterior + 1), None)
+
+    transaction.on_commit(incrementar)
+
+
+# None si el campeonato no existe
+def version_campeonato(campeonato_id):
+    return version('campeonato', campeonato_id, existe=Campeonato.objects.filter(pk=campeonato_id).exists)
+
+
+def marcar_cambio_campeonato(*campeonato_ids):
+    for campeonato_id in set(campeonato_ids):
+        if campeonato_id:
+            marcar_cambio('campeonato', campeonato_id)
+
+
+# Decorador para vistas públicas de un campeonato (con parámetro "id" en la URL):
+# para visitantes anónimos guarda el HTML bajo la versión del campeonato, así que
+# un acierto no hace ninguna consulta y cualquier cambio invalida la página al instante.
+def cache_por_campeonato(vista):
+    @wraps(vista)
+    def envoltura(request, id, *args, **kwargs):
+        pagina = request.GET.get('pagina', '1')
+        if request.method != 'GET' or request.user.is_authenticated or not pagina.isdigit():
+            return vista(request, id, *args, **kwargs)
+
+        version_actual = version_campeonato(id)
+        if version_actual is None:
+            return vista(request, id, *args, **kwargs)
+        clave = f"pagina:{vista.__name__}:{id}:{version_actual}:{pagina}"
+        guardada = cache.get(clave)
+        if guardada is not None:
+            contenido, estado, cabeceras = guardada
+            return HttpResponse(contenido, status=estado, headers=cabeceras)
+
+        respuesta = vista(request, id, *args, **kwargs)
+        # Se guarda con su estado y cabeceras (Content-Type, etc.) para que un acierto responda
+        # lo mismo que la vista; las respuestas que ponen cookies no se comparten
+        if respuesta.status_code == 200 and not respuesta.cookies and not getattr(respuesta, 'streaming', False):
+            cache.set(clave, (respuesta.content, respuesta.status_code, dict(respuesta.items())), DURACION_CACHE)
+        return respuesta
+
+    return envoltura
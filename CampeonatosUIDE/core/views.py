@@ -1,7 +1,21 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
-from .models import Equipo
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.text import slugify
+from .clasificaciones import clasificaciones_campeonato
+from .exportacion import EXPORTACIONES, ErrorExportacion, archivo_xlsx, lineas_csv, lineas_csv_async
+from .models import Campeonato, Equipo, Partido, Posicion
+from .versiones import cache_por_campeonato, version
+
+
+# Cantidad de filas por página en las tablas y listados
+POSICIONES_POR_PAGINA = 20
+CAMPEONATOS_POR_PAGINA = 20
 
 
 def vista_registro(request):
@@ -19,9 +33,10 @@ def vista_registro(request):
 
 
 def vista_inicio(request):
-    equipos = list(Equipo.objects.all())
-    equipos.sort(key=lambda e: e.puntos_totales, reverse=True)  # ordena por puntos_totales
-    return render(request, 'inicio/inicio.html', {'equipos': equipos})
+    # Panel: todos los campeonatos (también los pasados), paginados en la base
+    campeonatos = Campeonato.objects.select_related('deporte').order_by('-fecha_inicio', 'nombre')
+    pagina = Paginator(campeonatos, CAMPEONATOS_POR_PAGINA).get_page(request.GET.get('pagina'))
+    return render(request, 'inicio/inicio.html', {'pagina': pagina})
 
 
 def vista_login(request):
@@ -43,11 +58,70 @@ def vista_logout(request):
 
 
 def detalle_equipo(request, id):
-    equipo = get_object_or_404(Equipo, id=id)
-    return render(request, 'equipo/detalle.html', {'equipo': equipo})
+    # Equipo con su campeonato, carrera, fila de la tabla y totales en una sola consulta
+    equipo = get_object_or_404(Equipo.objects.select_related('campeonato__deporte', 'carrera', 'posicion', 'totales'), id=id)
+    jugadores = equipo.jugadores.select_related('usuario').con_suspendido().order_by('numero_camiseta')
+    partidos = (
+        Partido.objects.filter(Q(equipo_local=equipo) | Q(equipo_visitante=equipo))
+        .select_related('equipo_local', 'equipo_visitante')
+        .order_by('fecha', 'hora')
+    )
+    return render(request, 'equipo/detalle.html', {
+        'equipo': equipo,
+        'posicion': getattr(equipo, 'posicion', None),
+        'jugadores': jugadores,
+        'partidos': partidos,
+    })
 
 
 def vista_inicio_publico(request):
-    equipos = list(Equipo.objects.all())
-    equipos.sort(key=lambda e: e.puntos_totales, reverse=True)  # igual que en vista_inicio
-    return render(request, 'inicio/inicio_publico.html', {'equipos': equipos})
+    # Portada pública: solo los campeonatos que se están jugando
+    # (la consulta es perezosa: si el fragmento está en caché no se ejecuta)
+    campeonatos = Campeonato.objects.filter(estado='EN_CURSO').select_related('deporte').order_by('nombre')
+    return render(request, 'inicio/inicio_publico.html', {'campeonatos': campeonatos, 'version': version('campeonatos')})
+
+
+@cache_por_campeonato
+def tabla_campeonato(request, id):
+    # Tabla de posiciones de un campeonato, ya ordenada en la base y paginada con LIMIT/OFFSET
+    campeonato = get_object_or_404(Campeonato.objects.select_related('deporte'), id=id)
+    posiciones = Posicion.objects.filter(campeonato=campeonato).select_related('equipo')
+    pagina = Paginator(posiciones, POSICIONES_POR_PAGINA).get_page(request.GET.get('pagina'))
+    return render(request, 'campeonato/tabla.html', {'campeonato': campeonato, 'pagina': pagina})
+
+
+@cache_por_campeonato
+def clasificaciones(request, id):
+    # Mejores jugadores del campeonato en cada estadística de su deporte (una consulta por clasificación)
+    campeonato = get_object_or_404(Campeonato.objects.select_related('deporte'), id=id)
+    return render(request, 'campeonato/clasificaciones.html', {
+        'campeonato': campeonato,
+        'clasificaciones': clasificaciones_campeonato(campeonato),
+    })
+
+
+@staff_member_required
+def exportar_csv(request, id, tabla):
+    # Una tabla del campeonato en CSV; las filas se envían a medida que se leen de la base.
+    # Con ASGI el contenido tiene que ser un iterador asíncrono para no armarse entero en memoria.
+    if tabla not in EXPORTACIONES:
+        raise Http404("Tabla desconocida.")
+    campeonato = get_object_or_404(Campeonato.objects.select_related('deporte'), id=id)
+    lineas = lineas_csv_async if isinstance(request, ASGIRequest) else lineas_csv
+    respuesta = StreamingHttpResponse(lineas(campeonato, tabla), content_type='text/csv; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="{slugify(campeonato.nombre)}-{tabla}.csv"'
+    return respuesta
+
+
+@staff_member_required
+def exportar_xlsx(request, id):
+    # Libro de Excel con una hoja por tabla (posiciones, equipos, jugadores, partidos, estadísticas)
+    campeonato = get_object_or_404(Campeonato.objects.select_related('deporte'), id=id)
+    try:
+        archivo = archivo_xlsx(campeonato)
+    except ErrorExportacion as error:
+        return HttpResponse(str(error), status=501, content_type='text/plain; charset=utf-8')
+    return FileResponse(
+        archivo, as_attachment=True, filename=f"{slugify(campeonato.nombre)}.xlsx",
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )